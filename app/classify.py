@@ -1,19 +1,121 @@
+import sys
+import threading
+from collections import deque
+
 from app.db import SessionLocal
 from app.models.Rule import Rule
 
+NO_MATCH = sys.maxsize
 
-def classify_merchant(merchant: str | None) -> int | None:
-    """Match a merchant against rule keywords (case-insensitive), return the rule's category_id."""
-    if not merchant:
-        return None
-    needle = merchant.lower()
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over one user's rule keywords (case-insensitive).
+
+    Each keyword remembers the position of its rule, so one pass over the merchant
+    finds the earliest matching rule: first-match-wins, whatever the rule count.
+    """
+
+    def __init__(self, rules: list[tuple[str, int | None]]):
+        self.goto: list[dict[str, int]] = [{}]  # state -> {char: next state}
+        self.fail: list[int] = [0]
+        self.best: list[int] = [NO_MATCH]        # state -> lowest rule position matched here
+        self.category_ids: list[int | None] = []
+        for pos, (keywords, category_id) in enumerate(rules):
+            self.category_ids.append(category_id)
+            for kw in (keywords or "").split(","):
+                kw = kw.strip().lower()
+                if kw:
+                    self._add(kw, pos)
+        self._link()
+
+    def _add(self, keyword: str, pos: int) -> None:
+        state = 0
+        for ch in keyword:
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.best.append(NO_MATCH)
+            state = nxt
+        self.best[state] = min(self.best[state], pos)
+
+    def _link(self) -> None:
+        """BFS the trie to set failure links; a state also matches whatever its fail state does."""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.best[nxt] = min(self.best[nxt], self.best[self.fail[nxt]])
+
+    def match(self, text: str) -> int | None:
+        """Position of the first rule with a keyword inside `text`, or None."""
+        state, best = 0, NO_MATCH
+        for ch in text.lower():
+            while state and ch not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(ch, 0)
+            if self.best[state] < best:
+                best = self.best[state]
+                if best == 0:
+                    break
+        return None if best == NO_MATCH else best
+
+    def classify(self, merchant: str | None) -> int | None:
+        if not merchant:
+            return None
+        pos = self.match(merchant)
+        return None if pos is None else self.category_ids[pos]
+
+
+# user_id -> compiled matcher. Built lazily, dropped by invalidate_rules() after
+# any commit that touches that user's rules. Per-process: every worker keeps its own.
+_matchers: dict[int, KeywordMatcher] = {}
+_generation: dict[int, int] = {}
+_lock = threading.Lock()
+
+
+def load_matcher(db, user_id: int) -> KeywordMatcher:
+    """Compile a user's rules, in rule order, straight from the DB (no caching)."""
+    rows = db.query(Rule.merchant_keywords, Rule.category_id).filter(
+        Rule.user_id == user_id
+    ).order_by(Rule.id).all()
+    return KeywordMatcher([(r.merchant_keywords, r.category_id) for r in rows])
+
+
+def get_matcher(user_id: int) -> KeywordMatcher:
+    matcher = _matchers.get(user_id)
+    if matcher is not None:
+        return matcher
+    with _lock:
+        generation = _generation.get(user_id, 0)
     db = SessionLocal()
     try:
-        for rule in db.query(Rule).all():
-            for kw in rule.merchant_keywords.split(","):
-                kw = kw.strip().lower()
-                if kw and kw in needle:
-                    return rule.category_id
-        return None
+        matcher = load_matcher(db, user_id)
     finally:
         db.close()
+    with _lock:
+        # rules changed while we were compiling -> serve this one, but don't keep it
+        if _generation.get(user_id, 0) == generation:
+            _matchers[user_id] = matcher
+    return matcher
+
+
+def invalidate_rules(user_id: int) -> None:
+    """Forget a user's compiled matcher; call after committing a rule change."""
+    with _lock:
+        _generation[user_id] = _generation.get(user_id, 0) + 1
+        _matchers.pop(user_id, None)
+
+
+def classify_merchant(merchant: str | None, user_id: int) -> int | None:
+    """Match a merchant against the user's rule keywords (case-insensitive), return the rule's category_id."""
+    if not merchant:
+        return None
+    return get_matcher(user_id).classify(merchant)
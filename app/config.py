@@ -4,3 +4,19 @@ import os
 load_dotenv("settings.env")
 SECRET_KEY = os.environ["JWT_SECRET_KEY"]
 ALGORITHM = os.environ.get("JWT_ALGORITHM", "HS256")
+
+# API-key / JWT -> user lookups (app.deps). TTL 0 turns the cache off.
+AUTH_CACHE_TTL = float(os.environ.get("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_SIZE = int(os.environ.get("AUTH_CACHE_SIZE", "1024"))
+
+# Per-request SQL accounting (app.metrics). A statement shape repeated more than the
+# threshold in one request is logged as a likely N+1; N_PLUS_ONE_RAISE=1 also answers 500 when
+# the handler's own queries repeat (checked before the response starts; for test runs).
+# DB_DEBUG_HEADERS=1 adds X-DB-Queries / X-DB-Time to responses.
+N_PLUS_ONE_THRESHOLD = int(os.environ.get("N_PLUS_ONE_THRESHOLD", "10"))
+N_PLUS_ONE_RAISE = os.environ.get("N_PLUS_ONE_RAISE", "0") == "1"
+DB_DEBUG_HEADERS = os.environ.get("DB_DEBUG_HEADERS", "0") == "1"
+
+# Uploaded statements (POST /imports/) are kept here until their import finishes,
+# so an interrupted import can be resumed from the same bytes.
+IMPORT_DIR = os.environ.get("IMPORT_DIR", "imports")
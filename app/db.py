@@ -1,11 +1,72 @@
 import os
 from datetime import datetime
 
-from sqlalchemy import DateTime, Float, ForeignKey, String, func, create_engine
+from sqlalchemy import DateTime, Float, ForeignKey, String, func, create_engine, event
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, sessionmaker
+from sqlalchemy.pool import StaticPool
 
 DB_PATH = os.environ.get("SQLITE_PATH", "invoices.db")
-engine = create_engine(f"sqlite+pysqlite:///{DB_PATH}", echo=False, future=True)
+
+# Per-connection PRAGMAs. "wal" lets dashboard reads run alongside ingestion writes;
+# "legacy" is plain SQLite (rollback journal, no busy wait) for comparison.
+PROFILES = {
+    "legacy": {},
+    "wal": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",   # WAL stays consistent; only the last commits can be lost on power cut
+        "busy_timeout": 5000,      # ms to wait on a locked DB before raising
+        "mmap_size": 268435456,    # 256 MiB
+        "cache_size": -65536,      # negative = KiB, so 64 MiB
+        "temp_store": "MEMORY",
+    },
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "busy_timeout": 5000,
+        "mmap_size": 268435456,
+        "cache_size": -65536,
+        "temp_store": "MEMORY",
+    },
+}
+PRAGMA_NAMES = ("journal_mode", "synchronous", "busy_timeout", "mmap_size", "cache_size", "temp_store")
+
+
+def engine_settings(env=os.environ) -> tuple[dict, dict]:
+    """(pragmas, pool kwargs) from SQLITE_PROFILE plus per-pragma SQLITE_<NAME> overrides."""
+    profile = env.get("SQLITE_PROFILE", "wal")
+    if profile not in PROFILES:
+        raise ValueError(f"SQLITE_PROFILE must be one of {sorted(PROFILES)}, got {profile!r}")
+    pragmas = dict(PROFILES[profile])
+    for name in PRAGMA_NAMES:
+        value = env.get(f"SQLITE_{name.upper()}")
+        if value:
+            pragmas[name] = value
+    pool = {
+        "pool_size": int(env.get("SQLITE_POOL_SIZE", "10")),
+        "max_overflow": int(env.get("SQLITE_MAX_OVERFLOW", "20")),
+        "pool_timeout": float(env.get("SQLITE_POOL_TIMEOUT", "30")),
+    }
+    return pragmas, pool
+
+
+def make_engine(path: str, pragmas: dict, pool: dict):
+    if path == ":memory:":
+        # every connection would be its own empty DB: share one, and drop the QueuePool sizing
+        pool = {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+    eng = create_engine(f"sqlite+pysqlite:///{path}", echo=False, future=True, **pool)
+
+    @event.listens_for(eng, "connect")
+    def apply_pragmas(dbapi_con, _record):
+        cur = dbapi_con.cursor()
+        for name, value in pragmas.items():
+            cur.execute(f"PRAGMA {name} = {value}")
+        cur.close()
+
+    return eng
+
+
+SQLITE_PRAGMAS, SQLITE_POOL = engine_settings()
+engine = make_engine(DB_PATH, SQLITE_PRAGMAS, SQLITE_POOL)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
 class Base(DeclarativeBase):
@@ -1,16 +1,29 @@
 import hashlib
 import os
+from datetime import datetime
 from typing import Annotated, Optional
-from fastapi import APIRouter, Depends, HTTPException, Security
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, Security
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel
 from fastapi.security import APIKeyHeader
+from app.cache import TTLCache
+from app.config import AUTH_CACHE_SIZE, AUTH_CACHE_TTL
 from app.db import get_db_session
-from app.models import User, APIKey
+from app.models import User, APIKey, DataVersion
 from user_session import decode_token
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
 api_key_header = APIKeyHeader(name="X-API-KEY", auto_error=False)
 
+# ("api_key", sha256) / ("user", id) -> detached User. Per-process; writes that change
+# who a key belongs to must call forget_user() after committing.
+auth_cache = TTLCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+
+
+def forget_user(user_id: int) -> None:
+    """Drop every cached auth entry that resolves to this user."""
+    auth_cache.invalidate(lambda key, user: user.id == user_id)
+
+
 def get_current_user_or_apikey(
     token: Annotated[Optional[str], Depends(oauth2_scheme)],
     user_api_key: Annotated[Optional[str], Depends(api_key_header)],
@@ -18,6 +31,9 @@ def get_current_user_or_apikey(
 ) -> User:
     if user_api_key:
         key_hash = hashlib.sha256(user_api_key.encode()).hexdigest()
+        user, generation = auth_cache.get(("api_key", key_hash)), auth_cache.generation
+        if user is not None:
+            return user
         api_key = db.query(APIKey).filter(
             APIKey.key_hash == key_hash, APIKey.revoked == False
         ).first()
@@ -27,15 +43,45 @@ def get_current_user_or_apikey(
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
         db.expunge(user)
+        auth_cache.set(("api_key", key_hash), user, generation)
         return user
 
     # Fall back to JWT
     if token:
         user_id = decode_token(token)
+        user, generation = auth_cache.get(("user", user_id)), auth_cache.generation
+        if user is not None:
+            return user
         user = db.query(User).filter(User.id == user_id).first()
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
         db.expunge(user)
+        auth_cache.set(("user", user_id), user, generation)
         return user
 
     raise HTTPException(status_code=401, detail="Not authenticated")
+
+
+def _etags(header: str) -> set[str]:
+    # weak comparison (RFC 9110 8.8.3.2): W/"x" matches "x"
+    return {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+
+def data_etag(hourly: bool = False):
+    """Dependency for read routes that only change when the user's data does.
+
+    Tags the response with the user's data_versions counter (one primary-key
+    lookup) and answers a matching If-None-Match with 304 before the route body
+    runs. `hourly` also folds in the current hour, for responses that move with
+    the clock (days elapsed, an open cycle ending "now").
+    """
+    def check(request: Request, response: Response,
+              user=Depends(get_current_user_or_apikey), db=Depends(get_db_session)):
+        version = db.query(DataVersion.version).filter(DataVersion.user_id == user.id).scalar() or 0
+        tag = f"{user.id}.{version}" + (f".{datetime.now():%Y%m%d%H}" if hourly else "")
+        headers = {"ETag": f'W/"{tag}"', "Cache-Control": "private, no-cache"}
+        wanted = request.headers.get("if-none-match")
+        if wanted and (wanted.strip() == "*" or f'"{tag}"' in _etags(wanted)):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+    return check
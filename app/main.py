@@ -1,11 +1,27 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 
-from .routes import invoices, sms, rules, cycles, categories, auth,analytics
-from .db import init_db
+from .routes import invoices, sms, rules, cycles, categories, auth, analytics, api_keys, metrics, imports
+from .db import engine, init_db
+from .metrics import MetricsMiddleware, instrument_engine
+from .services.ingest_queue import ASYNC_INGEST, ingest_queue
 init_db()
-app = FastAPI()
+instrument_engine(engine)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if ASYNC_INGEST:
+        ingest_queue.start()
+    yield
+    await asyncio.to_thread(ingest_queue.stop)  # drains: every message that got a 202 is stored before exit
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,6 +30,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)  # added last = outermost, so CORS preflights are timed too
 app.include_router(auth.router)
 app.include_router(sms.router)
 app.include_router(invoices.router)
@@ -21,3 +38,6 @@ app.include_router(rules.router)
 app.include_router(cycles.router)
 app.include_router(categories.router)
 app.include_router(analytics.router)
+app.include_router(api_keys.router)
+app.include_router(imports.router)
+app.include_router(metrics.router)
@@ -0,0 +1,275 @@
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+
+from sqlalchemy import event
+
+from app.config import DB_DEBUG_HEADERS, N_PLUS_ONE_RAISE, N_PLUS_ONE_THRESHOLD
+
+log = logging.getLogger(__name__)
+
+# seconds; Prometheus histogram_quantile() interpolates inside these
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+QUANTILES = (0.5, 0.95, 0.99)
+WINDOW = 1024  # most recent requests per route behind the p50/p95/p99 summary
+UNMATCHED = "<unmatched>"  # 404s etc.: one label, not one series per probed URL
+
+
+class Histogram:
+    """Cumulative-bucket histogram in Prometheus' shape (buckets, _sum, _count)."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RouteStats:
+    def __init__(self):
+        self.statuses: dict[int, int] = {}
+        self.errors = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.recent: deque[float] = deque(maxlen=WINDOW)
+        self.db_seconds = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.n_plus_one = 0
+
+
+_PARAM_RUN = re.compile(r"\?(?:\s*,\s*\?)+")
+
+
+@lru_cache(maxsize=2048)
+def statement_shape(statement: str) -> str:
+    """SQL with whitespace collapsed and IN (?, ?, ...) lists of any length folded together."""
+    return _PARAM_RUN.sub("?...", " ".join(statement.split()))
+
+
+class NPlusOneError(AssertionError):
+    """A request ran one statement shape more than N_PLUS_ONE_THRESHOLD times (N_PLUS_ONE_RAISE=1)."""
+
+
+class RequestContext:
+    """DB work done on behalf of the current request, filled in by the engine hooks."""
+    __slots__ = ("queries", "db_seconds", "shapes")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.shapes: dict[str, int] = {}
+
+    def repeated(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> list[tuple[int, str]]:
+        """[(times, shape)] of statements run more than `threshold` times, most repeated first."""
+        return sorted(((n, shape) for shape, n in self.shapes.items() if n > threshold), reverse=True)
+
+    def assert_no_n_plus_one(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> None:
+        hits = self.repeated(threshold)
+        if hits:
+            n, shape = hits[0]
+            raise NPlusOneError(f"{n} x {shape[:300]}")
+
+
+# set by MetricsMiddleware; copied into the threadpool for sync routes
+current_request: ContextVar[RequestContext | None] = ContextVar("current_request", default=None)
+
+
+def _label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _quantile(samples: list[float], q: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+class Metrics:
+    """Per-route request, error, latency and DB counters, rendered as Prometheus text."""
+
+    def __init__(self):
+        self._routes: dict[tuple[str, str], RouteStats] = {}
+        self._lock = threading.Lock()
+        self.collectors = []  # () -> [(name, type, help, [(labels dict, value)])], rendered after routes
+
+    def observe(self, method: str, route: str, status: int, seconds: float, ctx: RequestContext) -> None:
+        with self._lock:
+            stats = self._routes.get((method, route))
+            if stats is None:
+                stats = self._routes[(method, route)] = RouteStats()
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            if status >= 500:
+                stats.errors += 1
+            stats.latency.observe(seconds)
+            stats.recent.append(seconds)
+            stats.db_seconds.observe(ctx.db_seconds)
+            stats.queries.observe(ctx.queries)
+
+    def count_n_plus_one(self, method: str, route: str) -> None:
+        with self._lock:
+            stats = self._routes.get((method, route))
+            if stats is not None:  # None only if reset() ran mid-request
+                stats.n_plus_one += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+    def render(self) -> str:
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = []
+
+            def family(name, kind, help_):
+                lines.append(f"# HELP {name} {help_}")
+                lines.append(f"# TYPE {name} {kind}")
+
+            def histogram(name, get):
+                for (method, route), stats in routes:
+                    h = get(stats)
+                    base = f'method="{_label(method)}",route="{_label(route)}"'
+                    cumulative = 0
+                    for bound, n in zip((*h.buckets, "+Inf"), h.counts):
+                        cumulative += n
+                        lines.append(f'{name}_bucket{{{base},le="{bound}"}} {cumulative}')
+                    lines.append(f"{name}_sum{{{base}}} {h.sum:.6f}")
+                    lines.append(f"{name}_count{{{base}}} {h.count}")
+
+            family("http_requests_total", "counter", "Requests handled, by route template and status.")
+            for (method, route), stats in routes:
+                for status, n in sorted(stats.statuses.items()):
+                    lines.append(f'http_requests_total{{method="{_label(method)}",route="{_label(route)}",'
+                                 f'status="{status}"}} {n}')
+            family("http_request_errors_total", "counter", "Requests that ended in a 5xx or an unhandled exception.")
+            for (method, route), stats in routes:
+                lines.append(f'http_request_errors_total{{method="{_label(method)}",route="{_label(route)}"}} '
+                             f"{stats.errors}")
+            family("http_request_n_plus_one_total", "counter",
+                   f"Requests that repeated one SQL statement shape more than {N_PLUS_ONE_THRESHOLD} times.")
+            for (method, route), stats in routes:
+                lines.append(f'http_request_n_plus_one_total{{method="{_label(method)}",route="{_label(route)}"}} '
+                             f"{stats.n_plus_one}")
+            family("http_request_duration_seconds", "histogram", "Wall time from request start to last body byte.")
+            histogram("http_request_duration_seconds", lambda s: s.latency)
+            family("http_request_latency_seconds", "summary",
+                   f"p50/p95/p99 wall time over the last {WINDOW} requests per route.")
+            for (method, route), stats in routes:
+                recent = sorted(stats.recent)
+                base = f'method="{_label(method)}",route="{_label(route)}"'
+                for q in QUANTILES:
+                    lines.append(f'http_request_latency_seconds{{{base},quantile="{q}"}} {_quantile(recent, q):.6f}')
+                lines.append(f"http_request_latency_seconds_sum{{{base}}} {sum(recent):.6f}")
+                lines.append(f"http_request_latency_seconds_count{{{base}}} {len(recent)}")
+            family("http_request_db_seconds", "histogram", "Time spent executing SQL per request.")
+            histogram("http_request_db_seconds", lambda s: s.db_seconds)
+            family("http_request_db_queries", "histogram", "SQL statements executed per request.")
+            histogram("http_request_db_queries", lambda s: s.queries)
+
+        for collect in self.collectors:
+            for name, kind, help_, samples in collect():
+                family(name, kind, help_)
+                for labels, value in samples:
+                    rendered = ",".join(f'{k}="{_label(v)}"' for k, v in labels.items())
+                    lines.append(f"{name}{{{rendered}}} {value}" if rendered else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def instrument_engine(engine) -> None:
+    """Count statements and SQL time against whichever request is running them."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start"].pop()
+        ctx = current_request.get()
+        if ctx is not None:
+            ctx.queries += 1
+            ctx.db_seconds += time.perf_counter() - started
+            shape = statement_shape(statement)
+            ctx.shapes[shape] = ctx.shapes.get(shape, 0) + 1
+
+    @event.listens_for(engine, "handle_error")
+    def _failed(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
+
+
+@contextmanager
+def track_queries():
+    """Account the statements run inside the block (same thread/task), e.g. in a test:
+
+        with track_queries() as q:
+            cycle_analysis(cycle_id, user)
+        q.assert_no_n_plus_one()
+    """
+    ctx = RequestContext()
+    token = current_request.set(ctx)
+    try:
+        yield ctx
+    finally:
+        current_request.reset(token)
+
+
+class MetricsMiddleware:
+    """ASGI middleware: times each request and files it under its route template (/cycles/{cycle_id}/...)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        ctx = RequestContext()
+        token = current_request.set(ctx)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                if N_PLUS_ONE_RAISE:  # before any byte goes out, so the client gets the 500
+                    ctx.assert_no_n_plus_one()
+                status = message["status"]
+                if DB_DEBUG_HEADERS:  # DB work done by the time the handler returned
+                    message["headers"] = [*message.get("headers", []),
+                                          (b"x-db-queries", str(ctx.queries).encode()),
+                                          (b"x-db-time", f"{ctx.db_seconds * 1000:.2f}ms".encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            status = 500
+            raise
+        finally:
+            current_request.reset(token)
+            route = getattr(scope.get("route"), "path", UNMATCHED)
+            metrics.observe(scope["method"], route, status, time.perf_counter() - started, ctx)
+            self.check_repeats(scope["method"], route, ctx)
+
+    @staticmethod
+    def check_repeats(method: str, route: str, ctx: RequestContext) -> None:
+        """Count and log repeated shapes, including any run while streaming the body."""
+        hits = ctx.repeated()
+        if not hits:
+            return
+        metrics.count_n_plus_one(method, route)
+        for n, shape in hits:
+            log.warning("possible N+1: %s %s ran %d x %s", method, route, n, shape[:300])
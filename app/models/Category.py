@@ -2,11 +2,15 @@ from app.db import Base
 import os
 from typing import Optional
 
-from sqlalchemy import Float, ForeignKey, String
+from sqlalchemy import Float, ForeignKey, Index, String
 from sqlalchemy.orm import Mapped, mapped_column
 
 class Category(Base):
     __tablename__ = "categories"
+    __table_args__ = (
+        # subtree CTE joins on parent_id alone; children lookups add user_id
+        Index("ix_categories_parent_user", "parent_id", "user_id"),
+    )
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String, nullable=False)
     parent_id: Mapped[Optional[int]] = mapped_column(ForeignKey("categories.id"), nullable=True)
@@ -0,0 +1,60 @@
+from app.db import Base
+
+from sqlalchemy import ForeignKey, Index, event, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class CategoryClosure(Base):
+    """Every (ancestor, descendant) pair of the category tree, self-pairs at depth 0.
+
+    Kept in sync by the triggers below, so subtree and ancestor lookups are one indexed join.
+    """
+    __tablename__ = "category_closure"
+    __table_args__ = (
+        Index("ix_category_closure_descendant", "descendant_id", "depth"),
+    )
+    ancestor_id: Mapped[int] = mapped_column(ForeignKey("categories.id"), primary_key=True)
+    descendant_id: Mapped[int] = mapped_column(ForeignKey("categories.id"), primary_key=True)
+    depth: Mapped[int] = mapped_column(nullable=False)
+
+
+TRIGGERS = [
+    # new node: itself, plus one more level below each of its parent's ancestors
+    "CREATE TRIGGER IF NOT EXISTS trg_category_closure_insert AFTER INSERT ON categories BEGIN "
+    "INSERT INTO category_closure (ancestor_id, descendant_id, depth) "
+    "SELECT ancestor_id, NEW.id, depth + 1 FROM category_closure WHERE descendant_id = NEW.parent_id "
+    "UNION ALL SELECT NEW.id, NEW.id, 0; END",
+    # reparent: cut the subtree loose from its old ancestors, then hang it under the new parent's
+    "CREATE TRIGGER IF NOT EXISTS trg_category_closure_reparent AFTER UPDATE OF parent_id ON categories "
+    "WHEN OLD.parent_id IS NOT NEW.parent_id BEGIN "
+    "DELETE FROM category_closure "
+    "WHERE descendant_id IN (SELECT descendant_id FROM category_closure WHERE ancestor_id = NEW.id) "
+    "AND ancestor_id NOT IN (SELECT descendant_id FROM category_closure WHERE ancestor_id = NEW.id); "
+    "INSERT INTO category_closure (ancestor_id, descendant_id, depth) "
+    "SELECT up.ancestor_id, down.descendant_id, up.depth + down.depth + 1 "
+    "FROM category_closure up, category_closure down "
+    "WHERE up.descendant_id = NEW.parent_id AND down.ancestor_id = NEW.id; END",
+    "CREATE TRIGGER IF NOT EXISTS trg_category_closure_delete AFTER DELETE ON categories BEGIN "
+    "DELETE FROM category_closure WHERE descendant_id = OLD.id OR ancestor_id = OLD.id; END",
+]
+
+
+def rebuild_category_closure(connection) -> None:
+    """Recompute the closure from categories.parent_id (depth-capped against corrupt cycles)."""
+    connection.execute(text("DELETE FROM category_closure"))
+    connection.execute(text(
+        "INSERT INTO category_closure (ancestor_id, descendant_id, depth) "
+        "WITH RECURSIVE t(ancestor_id, descendant_id, depth) AS ("
+        " SELECT id, id, 0 FROM categories"
+        " UNION ALL SELECT t.ancestor_id, c.id, t.depth + 1 FROM t JOIN categories c ON c.parent_id = t.descendant_id"
+        " WHERE t.depth < 64) "
+        "SELECT ancestor_id, descendant_id, MIN(depth) FROM t GROUP BY ancestor_id, descendant_id"
+    ))
+
+
+@event.listens_for(Base.metadata, "after_create")
+def install_triggers(target, connection, tables=(), **kw):
+    for ddl in TRIGGERS:
+        connection.exec_driver_sql(ddl)
+    if CategoryClosure.__table__ in tables:  # table is new: backfill the existing tree
+        rebuild_category_closure(connection)
@@ -3,11 +3,14 @@ import os
 from datetime import datetime, date
 from typing import Optional
 
-from sqlalchemy import Boolean, Date, DateTime, ForeignKey, String, func, create_engine
+from sqlalchemy import Boolean, Date, DateTime, ForeignKey, Index, String, func, create_engine
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, sessionmaker
 
 class Cycle(Base):
     __tablename__ = "budget_cycles"
+    __table_args__ = (
+        Index("ix_budget_cycles_user_start", "user_id", "start_date"),  # history, newest first
+    )
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
     start_date: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -0,0 +1,61 @@
+from datetime import datetime
+
+from app.db import Base
+from sqlalchemy import DateTime, ForeignKey, Index, String, Text, event, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class CycleSnapshot(Base):
+    """A closed cycle's analysis / top-categories / timeline payload, as JSON.
+
+    The triggers below delete a snapshot whenever something it was computed from
+    changes; the next read rebuilds it.
+    """
+    __tablename__ = "cycle_snapshots"
+    __table_args__ = (Index("ix_cycle_snapshots_user", "user_id"),)
+    cycle_id: Mapped[int] = mapped_column(ForeignKey("budget_cycles.id", ondelete="CASCADE"), primary_key=True)
+    kind: Mapped[str] = mapped_column(String(32), primary_key=True)  # analysis | top_categories | timeline
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    payload: Mapped[str] = mapped_column(Text, nullable=False)
+    built_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+
+# snapshots of closed cycles whose date range holds {r}'s invoice
+_IN_RANGE = (
+    "DELETE FROM cycle_snapshots WHERE cycle_id IN (SELECT id FROM budget_cycles WHERE user_id = {r}.user_id "
+    "AND start_date <= {r}.created_at AND end_date >= {r}.created_at);"
+)
+_USER = "DELETE FROM cycle_snapshots WHERE user_id = {r}.user_id;"
+# WHEN clause: skip the range lookup for users with nothing frozen (bulk imports, most SMS)
+_HAS = "WHEN EXISTS (SELECT 1 FROM cycle_snapshots WHERE user_id = {r}.user_id)"
+
+TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS trg_cycle_snapshot_invoice_insert AFTER INSERT ON invoices "
+    f"{_HAS.format(r='NEW')} BEGIN {_IN_RANGE.format(r='NEW')} END",
+    "CREATE TRIGGER IF NOT EXISTS trg_cycle_snapshot_invoice_delete AFTER DELETE ON invoices "
+    f"{_HAS.format(r='OLD')} BEGIN {_IN_RANGE.format(r='OLD')} END",
+    "CREATE TRIGGER IF NOT EXISTS trg_cycle_snapshot_invoice_update AFTER UPDATE ON invoices "
+    f"{_HAS.format(r='OLD')} BEGIN {_IN_RANGE.format(r='OLD')} {_IN_RANGE.format(r='NEW')} END",
+    # renames, moves and deletes change bucket names / membership; rules carry the limits
+    "CREATE TRIGGER IF NOT EXISTS trg_cycle_snapshot_category_update AFTER UPDATE ON categories "
+    f"BEGIN {_USER.format(r='OLD')} END",
+    "CREATE TRIGGER IF NOT EXISTS trg_cycle_snapshot_category_delete AFTER DELETE ON categories "
+    f"BEGIN {_USER.format(r='OLD')} END",
+    "CREATE TRIGGER IF NOT EXISTS trg_cycle_snapshot_rule_insert AFTER INSERT ON category_rules "
+    f"BEGIN {_USER.format(r='NEW')} END",
+    "CREATE TRIGGER IF NOT EXISTS trg_cycle_snapshot_rule_update AFTER UPDATE ON category_rules "
+    f"BEGIN {_USER.format(r='OLD')} END",
+    "CREATE TRIGGER IF NOT EXISTS trg_cycle_snapshot_rule_delete AFTER DELETE ON category_rules "
+    f"BEGIN {_USER.format(r='OLD')} END",
+    # reopened, re-dated or deleted cycles (SQLite only cascades with PRAGMA foreign_keys)
+    "CREATE TRIGGER IF NOT EXISTS trg_cycle_snapshot_cycle_update AFTER UPDATE ON budget_cycles "
+    "BEGIN DELETE FROM cycle_snapshots WHERE cycle_id = OLD.id; END",
+    "CREATE TRIGGER IF NOT EXISTS trg_cycle_snapshot_cycle_delete AFTER DELETE ON budget_cycles "
+    "BEGIN DELETE FROM cycle_snapshots WHERE cycle_id = OLD.id; END",
+]
+
+
+@event.listens_for(Base.metadata, "after_create")
+def install_triggers(target, connection, tables=(), **kw):
+    for ddl in TRIGGERS:
+        connection.exec_driver_sql(ddl)
@@ -0,0 +1,126 @@
+from app.db import Base
+from typing import Optional
+
+from sqlalchemy import Float, ForeignKey, Index, event, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class CycleSpend(Base):
+    """Successful spend per (active cycle, category subtree). Kept in sync by the triggers below.
+
+    An invoice counts towards its category and every ancestor of it, so a
+    category's row is its whole subtree's spend: "remaining in Coffee" is one
+    row. NULL category = uncategorized.
+    """
+    __tablename__ = "cycle_spend"
+    __table_args__ = (
+        Index("ux_cycle_spend_key", "cycle_id", text("ifnull(category_id, 0)"), unique=True),
+    )
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    cycle_id: Mapped[int] = mapped_column(ForeignKey("budget_cycles.id"), nullable=False)
+    category_id: Mapped[Optional[int]] = mapped_column(ForeignKey("categories.id"), nullable=True)
+    total: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+    count: Mapped[int] = mapped_column(nullable=False, default=0)
+
+
+# the user's active cycle(s) whose range holds {r}'s invoice
+_CYCLES = (
+    "SELECT id FROM budget_cycles WHERE user_id = {r}.user_id AND is_active = 1 "
+    "AND start_date <= {r}.created_at AND (end_date IS NULL OR end_date >= {r}.created_at)"
+)
+# the rows {r} counts towards: its category's ancestors (self included), or the NULL row
+_NODES = (
+    "SELECT ancestor_id AS category_id FROM category_closure WHERE descendant_id = {r}.category_id "
+    "UNION ALL SELECT NULL WHERE {r}.category_id IS NULL"
+)
+_ADD = (
+    "INSERT INTO cycle_spend (cycle_id, category_id, total, count) "
+    f"SELECT c.id, n.category_id, ifnull(NEW.amount, 0), 1 FROM ({_CYCLES.format(r='NEW')}) c, "
+    f"({_NODES.format(r='NEW')}) n WHERE 1 "
+    "ON CONFLICT (cycle_id, ifnull(category_id, 0)) "
+    "DO UPDATE SET total = total + excluded.total, count = count + 1;"
+)
+_SUB = (
+    "UPDATE cycle_spend SET total = total - ifnull(OLD.amount, 0), count = count - 1 "
+    f"WHERE cycle_id IN ({_CYCLES.format(r='OLD')}) "
+    f"AND ifnull(category_id, 0) IN (SELECT ifnull(category_id, 0) FROM ({_NODES.format(r='OLD')})); "
+    f"DELETE FROM cycle_spend WHERE count <= 0 AND cycle_id IN ({_CYCLES.format(r='OLD')});"
+)
+_WATCHED = "user_id, amount, category_id, created_at, extraction_status"
+
+# (cycle_id, category_id, total, count) from invoices, for the cycles matching {cycles} (over budget_cycles c)
+_EXPECTED = (
+    "SELECT c.id, cc.ancestor_id, SUM(ifnull(i.amount, 0)), COUNT(*) FROM budget_cycles c "
+    "JOIN invoices i ON i.user_id = c.user_id AND i.extraction_status = 'success' "
+    "AND i.created_at >= c.start_date AND (c.end_date IS NULL OR i.created_at <= c.end_date) "
+    "JOIN category_closure cc ON cc.descendant_id = i.category_id "
+    "WHERE c.is_active = 1 AND {cycles} GROUP BY c.id, cc.ancestor_id "
+    "UNION ALL "
+    "SELECT c.id, NULL, SUM(ifnull(i.amount, 0)), COUNT(*) FROM budget_cycles c "
+    "JOIN invoices i ON i.user_id = c.user_id AND i.extraction_status = 'success' "
+    "AND i.created_at >= c.start_date AND (c.end_date IS NULL OR i.created_at <= c.end_date) "
+    "WHERE c.is_active = 1 AND i.category_id IS NULL AND {cycles} GROUP BY c.id"
+)
+_FILL = "INSERT INTO cycle_spend (cycle_id, category_id, total, count) " + _EXPECTED
+
+TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS trg_cycle_spend_insert AFTER INSERT ON invoices "
+    f"WHEN NEW.extraction_status = 'success' BEGIN {_ADD} END",
+    "CREATE TRIGGER IF NOT EXISTS trg_cycle_spend_delete AFTER DELETE ON invoices "
+    f"WHEN OLD.extraction_status = 'success' BEGIN {_SUB} END",
+    f"CREATE TRIGGER IF NOT EXISTS trg_cycle_spend_update_old AFTER UPDATE OF {_WATCHED} ON invoices "
+    f"WHEN OLD.extraction_status = 'success' BEGIN {_SUB} END",
+    f"CREATE TRIGGER IF NOT EXISTS trg_cycle_spend_update_new AFTER UPDATE OF {_WATCHED} ON invoices "
+    f"WHEN NEW.extraction_status = 'success' BEGIN {_ADD} END",
+    # a cycle that starts (possibly backdated) or changes range starts from the invoices it covers
+    "CREATE TRIGGER IF NOT EXISTS trg_cycle_spend_cycle_insert AFTER INSERT ON budget_cycles "
+    f"WHEN NEW.is_active = 1 BEGIN {_FILL.format(cycles='c.id = NEW.id')}; END",
+    "CREATE TRIGGER IF NOT EXISTS trg_cycle_spend_cycle_update AFTER UPDATE OF "
+    "user_id, start_date, end_date, is_active ON budget_cycles BEGIN "
+    "DELETE FROM cycle_spend WHERE cycle_id = OLD.id; "
+    f"{_FILL.format(cycles='c.id = NEW.id')}; END",
+    "CREATE TRIGGER IF NOT EXISTS trg_cycle_spend_cycle_delete AFTER DELETE ON budget_cycles "
+    "BEGIN DELETE FROM cycle_spend WHERE cycle_id = OLD.id; END",
+]
+# Category moves and deletes change which ancestors an invoice counts towards; the
+# category_closure triggers rewrite the tree on the same statement and SQLite leaves
+# trigger order unspecified, so those routes call rebuild_cycle_spend() instead.
+
+
+def _user_filter(user_id: int | None) -> str:
+    return "1 = 1" if user_id is None else "c.user_id = :user_id"
+
+
+def rebuild_cycle_spend(connection, user_id: int | None = None) -> None:
+    """Recompute the active cycles' counters from invoices (all users, or one)."""
+    params = {"user_id": user_id}
+    connection.execute(text(
+        "DELETE FROM cycle_spend WHERE cycle_id IN (SELECT c.id FROM budget_cycles c WHERE "
+        + _user_filter(user_id) + ")"
+    ), params)
+    connection.execute(text(_FILL.format(cycles=_user_filter(user_id))), params)
+
+
+def cycle_spend_drift(connection, user_id: int | None = None) -> list[tuple]:
+    """[(cycle_id, category_id, stored (total, count), expected (total, count))] that disagree."""
+    params = {"user_id": user_id}
+    stored = {(c, cat): (total, count) for c, cat, total, count in connection.execute(text(
+        "SELECT s.cycle_id, s.category_id, s.total, s.count FROM cycle_spend s JOIN budget_cycles c "
+        "ON c.id = s.cycle_id WHERE " + _user_filter(user_id)
+    ), params)}
+    expected = {(c, cat): (total, count) for c, cat, total, count in connection.execute(text(
+        _EXPECTED.format(cycles=_user_filter(user_id))), params)}
+    drift = []
+    for key in stored.keys() | expected.keys():
+        have, want = stored.get(key, (0, 0)), expected.get(key, (0, 0))
+        if have[1] != want[1] or abs(have[0] - want[0]) > 0.005:
+            drift.append((*key, have, want))
+    return sorted(drift, key=lambda d: (d[0], d[1] or 0))
+
+
+@event.listens_for(Base.metadata, "after_create")
+def install_triggers(target, connection, tables=(), **kw):
+    for ddl in TRIGGERS:
+        connection.exec_driver_sql(ddl)
+    if CycleSpend.__table__ in tables:  # table is new: backfill the active cycles
+        rebuild_cycle_spend(connection)
@@ -0,0 +1,67 @@
+from app.db import Base
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import Date, Float, ForeignKey, Index, event, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class DailySpend(Base):
+    """Successful spend per (user, day, category). Kept in sync by the triggers below."""
+    __tablename__ = "daily_spend"
+    __table_args__ = (
+        # NULL category = uncategorized; ifnull() so those rows still collide on upsert
+        Index("ux_daily_spend_key", "user_id", "day", text("ifnull(category_id, 0)"), unique=True),
+    )
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    day: Mapped[date] = mapped_column(Date, nullable=False)  # date(invoices.created_at)
+    category_id: Mapped[Optional[int]] = mapped_column(ForeignKey("categories.id"), nullable=True)
+    total: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+    count: Mapped[int] = mapped_column(nullable=False, default=0)
+
+
+_KEY = "user_id = {r}.user_id AND day = date({r}.created_at) AND ifnull(category_id, 0) = ifnull({r}.category_id, 0)"
+_ADD = (
+    "INSERT INTO daily_spend (user_id, day, category_id, total, count) "
+    "VALUES (NEW.user_id, date(NEW.created_at), NEW.category_id, ifnull(NEW.amount, 0), 1) "
+    "ON CONFLICT (user_id, day, ifnull(category_id, 0)) "
+    "DO UPDATE SET total = total + excluded.total, count = count + 1;"
+)
+_SUB = (
+    "UPDATE daily_spend SET total = total - ifnull(OLD.amount, 0), count = count - 1 WHERE " + _KEY.format(r="OLD") + "; "
+    "DELETE FROM daily_spend WHERE count <= 0 AND " + _KEY.format(r="OLD") + ";"
+)
+_WATCHED = "user_id, amount, category_id, created_at, extraction_status"
+
+# Every write path (ORM, bulk INSERT/UPDATE, raw SQL) goes through these, so the rollup never drifts.
+TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS trg_daily_spend_insert AFTER INSERT ON invoices "
+    f"WHEN NEW.extraction_status = 'success' BEGIN {_ADD} END",
+    "CREATE TRIGGER IF NOT EXISTS trg_daily_spend_delete AFTER DELETE ON invoices "
+    f"WHEN OLD.extraction_status = 'success' BEGIN {_SUB} END",
+    f"CREATE TRIGGER IF NOT EXISTS trg_daily_spend_update_old AFTER UPDATE OF {_WATCHED} ON invoices "
+    f"WHEN OLD.extraction_status = 'success' BEGIN {_SUB} END",
+    f"CREATE TRIGGER IF NOT EXISTS trg_daily_spend_update_new AFTER UPDATE OF {_WATCHED} ON invoices "
+    f"WHEN NEW.extraction_status = 'success' BEGIN {_ADD} END",
+]
+
+
+def rebuild_daily_spend(connection, user_id: int | None = None) -> None:
+    """Recompute the rollup from invoices (all users, or one)."""
+    where = "" if user_id is None else " AND user_id = :user_id"
+    params = {"user_id": user_id}
+    connection.execute(text("DELETE FROM daily_spend WHERE 1 = 1" + where), params)
+    connection.execute(text(
+        "INSERT INTO daily_spend (user_id, day, category_id, total, count) "
+        "SELECT user_id, date(created_at), category_id, SUM(ifnull(amount, 0)), COUNT(*) FROM invoices "
+        "WHERE extraction_status = 'success'" + where + " GROUP BY user_id, date(created_at), category_id"
+    ), params)
+
+
+@event.listens_for(Base.metadata, "after_create")
+def install_triggers(target, connection, tables=(), **kw):
+    for ddl in TRIGGERS:
+        connection.exec_driver_sql(ddl)
+    if DailySpend.__table__ in tables:  # table is new: backfill whatever invoices already exist
+        rebuild_daily_spend(connection)
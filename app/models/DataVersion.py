@@ -0,0 +1,42 @@
+from app.db import Base
+from sqlalchemy import ForeignKey, event
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class DataVersion(Base):
+    """Per-user counter bumped on every write to the user's dashboard data; the ETag of cached reads."""
+    __tablename__ = "data_versions"
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    version: Mapped[int] = mapped_column(nullable=False, default=0)
+
+
+_BUMP = (
+    "INSERT INTO data_versions (user_id, version) SELECT {r}.user_id, 1 WHERE {when} "
+    "ON CONFLICT (user_id) DO UPDATE SET version = version + 1;"
+)
+# Everything the dashboard reads hangs off one of these tables.
+WATCHED_TABLES = ("invoices", "category_rules", "categories", "budget_cycles")
+
+
+def _triggers(table: str) -> list[str]:
+    name = f"trg_data_version_{table}"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {name}_insert AFTER INSERT ON {table} "
+        f"BEGIN {_BUMP.format(r='NEW', when='1')} END",
+        f"CREATE TRIGGER IF NOT EXISTS {name}_delete AFTER DELETE ON {table} "
+        f"BEGIN {_BUMP.format(r='OLD', when='1')} END",
+        # a row moved to another user changes both users' data
+        f"CREATE TRIGGER IF NOT EXISTS {name}_update AFTER UPDATE ON {table} "
+        f"BEGIN {_BUMP.format(r='NEW', when='1')} "
+        f"{_BUMP.format(r='OLD', when='OLD.user_id IS NOT NEW.user_id')} END",
+    ]
+
+
+# Triggers rather than route code, so bulk imports, the ingest queue and raw SQL bump it too.
+TRIGGERS = [ddl for table in WATCHED_TABLES for ddl in _triggers(table)]
+
+
+@event.listens_for(Base.metadata, "after_create")
+def install_triggers(target, connection, tables=(), **kw):
+    for ddl in TRIGGERS:
+        connection.exec_driver_sql(ddl)
@@ -0,0 +1,33 @@
+from app.db import Base
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, ForeignKey, Index, String, Text, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class ImportJob(Base):
+    """One bulk statement import. records_done is committed with each chunk, so a rerun resumes after it."""
+    __tablename__ = "import_jobs"
+    __table_args__ = (
+        Index("ix_import_jobs_user_sha256", "user_id", "sha256"),
+    )
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    filename: Mapped[str] = mapped_column(String, nullable=False)
+    path: Mapped[str] = mapped_column(Text, nullable=False)  # where the file is read from on (re)run
+    sha256: Mapped[str] = mapped_column(String, nullable=False)
+    format: Mapped[str] = mapped_column(String, nullable=False)  # sms | ndjson | csv
+    status: Mapped[str] = mapped_column(String, default="pending", nullable=False)  # pending | running | done | failed
+    size: Mapped[int] = mapped_column(nullable=False, default=0)
+    bytes_read: Mapped[int] = mapped_column(nullable=False, default=0)
+    records_done: Mapped[int] = mapped_column(nullable=False, default=0)
+    inserted: Mapped[int] = mapped_column(nullable=False, default=0)
+    extraction_failed: Mapped[int] = mapped_column(nullable=False, default=0)
+    duplicates: Mapped[int] = mapped_column(nullable=False, default=0)  # already stored, skipped
+    malformed: Mapped[int] = mapped_column(nullable=False, default=0)  # unreadable records, skipped
+    malformed_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # the first one's error
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(),
+                                                 onupdate=func.now(), nullable=False)
@@ -3,11 +3,24 @@ import os
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import DateTime, Float, ForeignKey, String, Text, func, create_engine
+from sqlalchemy import DateTime, Float, ForeignKey, Index, String, Text, func, create_engine, text
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, sessionmaker
 
 class Invoice(Base):
     __tablename__ = "invoices"
+    __table_args__ = (
+        # cycle / timeline / analytics scans: only successful rows, covering so SQLite never visits the table
+        Index("ix_invoices_success_user_created", "user_id", "created_at", "category_id", "amount", "merchant",
+              "extraction_status", sqlite_where=text("extraction_status = 'success'")),
+        # category spend: category_id IN (subtree) per user
+        Index("ix_invoices_success_user_category", "user_id", "category_id", "amount", "extraction_status",
+              sqlite_where=text("extraction_status = 'success'")),
+        # GET /invoices lists every status, newest first
+        Index("ix_invoices_user_created", "user_id", "created_at"),
+        Index("ix_invoices_category", "category_id"),
+        # resend detection: one probe per incoming SMS (user, hash, time window)
+        Index("ix_invoices_user_hash_created", "user_id", "content_hash", "created_at"),
+    )
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
     raw_invoice: Mapped[str] = mapped_column(Text, nullable=False)
@@ -17,4 +30,5 @@ class Invoice(Base):
     classification: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     category_id: Mapped[Optional[int]] = mapped_column(ForeignKey("categories.id"), nullable=True)
     note: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    content_hash: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)  # services.sms.content_hash
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -0,0 +1,74 @@
+from app.db import Base
+
+from sqlalchemy import column, event, table, text
+
+# FTS5 index over invoices.merchant / note / raw_invoice, rowid = invoices.id.
+# unicode61 folds case and Latin accents but keeps Arabic harakat inside tokens and
+# treats hamza/taa-marbuta spellings as different letters, so both the indexed text
+# (in the triggers) and the query (app.services.search) go through the same folding.
+ARABIC_FOLD = [
+    *[(chr(c), "") for c in range(0x064B, 0x0653)],  # tanween, harakat, shadda, sukun
+    ("ٰ", ""),  # superscript alef
+    ("ـ", ""),  # tatweel
+    ("أ", "ا"), ("إ", "ا"), ("آ", "ا"), ("ٱ", "ا"),
+    ("ى", "ي"),
+    ("ة", "ه"),
+]
+COLUMNS = ("merchant", "note", "raw_invoice")
+
+# for select() / join(): FROM invoice_fts ... WHERE invoice_fts MATCH :q
+invoice_fts = table("invoice_fts", column("rowid"), column("invoice_fts"), *(column(c) for c in COLUMNS))
+
+
+def fold_sql(expr: str) -> str:
+    """SQL expression applying ARABIC_FOLD to `expr` (nested replace(); NULL stays NULL)."""
+    for src, dst in ARABIC_FOLD:
+        expr = f"replace({expr}, '{src}', '{dst}')"
+    return expr
+
+
+def _values(r: str) -> str:
+    return ", ".join(fold_sql(f"{r}.{c}") for c in COLUMNS)
+
+
+CREATE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS invoice_fts USING fts5("
+    f"{', '.join(COLUMNS)}, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+
+TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS trg_invoice_fts_insert AFTER INSERT ON invoices BEGIN "
+    f"INSERT INTO invoice_fts (rowid, {', '.join(COLUMNS)}) VALUES (NEW.id, {_values('NEW')}); END",
+    "CREATE TRIGGER IF NOT EXISTS trg_invoice_fts_delete AFTER DELETE ON invoices BEGIN "
+    "DELETE FROM invoice_fts WHERE rowid = OLD.id; END",
+    f"CREATE TRIGGER IF NOT EXISTS trg_invoice_fts_update AFTER UPDATE OF {', '.join(COLUMNS)} ON invoices BEGIN "
+    f"DELETE FROM invoice_fts WHERE rowid = OLD.id; "
+    f"INSERT INTO invoice_fts (rowid, {', '.join(COLUMNS)}) VALUES (NEW.id, {_values('NEW')}); END",
+]
+
+
+def rebuild_invoice_search(connection) -> None:
+    """Re-index every invoice, then merge the index b-trees."""
+    connection.execute(text("DELETE FROM invoice_fts"))
+    connection.execute(text(
+        f"INSERT INTO invoice_fts (rowid, {', '.join(COLUMNS)}) SELECT id, {_values('invoices')} FROM invoices"
+    ))
+    connection.execute(text("INSERT INTO invoice_fts (invoice_fts) VALUES ('optimize')"))
+
+
+@event.listens_for(Base.metadata, "after_create")
+def install_triggers(target, connection, tables=(), **kw):
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'invoice_fts'"
+    ).first()
+    connection.exec_driver_sql(CREATE)
+    for ddl in TRIGGERS:
+        connection.exec_driver_sql(ddl)
+    if not exists:  # index is new: backfill whatever invoices already exist
+        rebuild_invoice_search(connection)
+
+
+@event.listens_for(Base.metadata, "after_drop")
+def drop_index(target, connection, **kw):
+    # not in the metadata, so drop_all() would leave it behind, full of ids that no longer exist
+    connection.exec_driver_sql("DROP TABLE IF EXISTS invoice_fts")
@@ -6,5 +6,12 @@ from app.models.CycleModel import Cycle
 from app.models.Sms import Sms
 from app.models.TransferLimit import TransferLimit
 from app.models.Category import Category
+from app.models.DailySpend import DailySpend
+from app.models.CategoryClosure import CategoryClosure
+from app.models.ImportJob import ImportJob
+from app.models.DataVersion import DataVersion
+from app.models.CycleSnapshot import CycleSnapshot
+from app.models.CycleSpend import CycleSpend
+from app.models.InvoiceSearch import invoice_fts  # not a model: importing installs the FTS index + triggers
 
-__all__ = ["User", "APIKey", "Invoice", "Rule", "Cycle", "Sms", "TransferLimit","Category"]
+__all__ = ["User", "APIKey", "Invoice", "Rule", "Cycle", "Sms", "TransferLimit","Category", "DailySpend", "CategoryClosure", "ImportJob", "DataVersion", "CycleSnapshot", "CycleSpend"]
@@ -0,0 +1,41 @@
+import orjson
+from fastapi import HTTPException, Response
+from fastapi.responses import JSONResponse
+
+from app.models.Invoice import Invoice
+from schema import InvoiceOut
+
+# InvoiceOut field -> column; list endpoints select only what the projection asks for
+INVOICE_FIELDS = {name: getattr(Invoice, name) for name in InvoiceOut.model_fields}
+# default projection: everything but raw_invoice (the full SMS is most of each row's bytes)
+COMPACT_FIELDS = tuple(name for name in INVOICE_FIELDS if name != "raw_invoice")
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON encoded by orjson: datetimes, floats and Arabic text natively, no jsonable_encoder pass."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def invoice_columns(fields: str | None) -> list:
+    """Columns for a `fields=` projection (comma-separated InvoiceOut names, id always included)."""
+    if not fields:
+        return [INVOICE_FIELDS[name] for name in COMPACT_FIELDS]
+    names = dict.fromkeys(["id", *(f.strip() for f in fields.split(",") if f.strip())])
+    unknown = [name for name in names if name not in INVOICE_FIELDS]
+    if unknown:
+        raise HTTPException(400, f"Unknown field(s) {', '.join(unknown)}; choose from {', '.join(INVOICE_FIELDS)}")
+    return [INVOICE_FIELDS[name] for name in names]
+
+
+def json_rows(rows, response: Response | None = None) -> ORJSONResponse:
+    """select(*columns) rows as a JSON array of objects.
+
+    Returned as a Response, so FastAPI skips response_model validation and
+    encoding: the route's response_model documents the shape, orjson does the
+    work. Headers a dependency set on the injected `response` (ETag) are kept.
+    """
+    keys = rows[0]._fields if rows else ()
+    headers = dict(response.headers) if response is not None else None
+    return ORJSONResponse([dict(zip(keys, row)) for row in rows], headers=headers)
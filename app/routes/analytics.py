@@ -4,8 +4,9 @@ from fastapi import APIRouter, Depends, HTTPException
 from typing import Literal
 from app.deps import get_current_user_or_apikey
 from app.db import get_db_session
-from app.models import Invoice, Category
+from app.models import Invoice, Category, CategoryClosure
 from app.models.CycleModel import Cycle
+from app.services.daily_spend import spend_by_day
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
@@ -32,13 +33,6 @@ def aggregate(
     cycle_start = naive(cycle.start_date)
     cycle_end = naive(cycle.end_date) or datetime.datetime.now()
 
-    rows = db.query(Invoice).filter(
-        Invoice.user_id == user.id,
-        Invoice.extraction_status == "success",
-        Invoice.created_at >= cycle_start,
-        Invoice.created_at <= cycle_end,
-    ).all()
-
     # ALL my categories as {id: node}, so we can climb parents
     cats = {
         cat.id: cat
@@ -48,27 +42,38 @@ def aggregate(
     if scope is not None:
         if scope not in cats:
             raise HTTPException(status_code=404, detail="Category not found")
-        family = {scope}
-        changed = True
-        while changed:
-            changed = False
-            for id, node in cats.items():
-                if node.parent_id in family and id not in family:
-                    family.add(id)
-                    changed = True
-        # NULL tags fail this check automatically -> excluded when scoped
-        rows = [r for r in rows if r.category_id in family]
+        family = {cid for (cid,) in db.query(CategoryClosure.descendant_id).filter(
+            CategoryClosure.ancestor_id == scope
+        )}
 
     # --- 5. the pile loop -----------------------------------------------------
     piles = {}      # label -> {"total": x, "count": n}
     pile_ids = {}   # label -> category id of the bucket (bucket mode only)
 
+    if group_by == "day":
+        # already pre-summed per (day, category) by the daily_spend rollup
+        for day, category_id, total, count in spend_by_day(db, user.id, cycle_start, cycle_end):
+            if scope is not None and category_id not in family:
+                continue
+            pile = piles.setdefault(day, {"total": 0.0, "count": 0})
+            pile["total"] += total or 0
+            pile["count"] += count
+        rows = []
+    else:
+        rows = db.query(Invoice).filter(
+            Invoice.user_id == user.id,
+            Invoice.extraction_status == "success",
+            Invoice.created_at >= cycle_start,
+            Invoice.created_at <= cycle_end,
+        ).all()
+        if scope is not None:
+            # NULL tags fail this check automatically -> excluded when scoped
+            rows = [r for r in rows if r.category_id in family]
+
     for inv in rows:
         # 1) decide which pile this invoice belongs to
         if group_by == "merchant":
             label = inv.merchant or "Unknown"
-        elif group_by == "day":
-            label = str(inv.created_at.date())
         else:  # bucket: climb up the tree to the right level
             node = cats.get(inv.category_id)
             if node is None:
@@ -2,9 +2,9 @@ import hashlib
 import secrets
 
 from fastapi import APIRouter, Depends, HTTPException
-from user_session import get_db_session
-from app.deps import get_current_user_or_apikey
-from models import APIKey
+from app.db import get_db_session
+from app.deps import forget_user, get_current_user_or_apikey
+from app.models import APIKey
 
 router = APIRouter(tags=["api_keys"])
 
@@ -16,10 +16,12 @@ def create_api_key(current_user=Depends(get_current_user_or_apikey), db=Depends(
     db.query(APIKey).filter(APIKey.user_id == current_user.id).delete()
     db.add(APIKey(key_hash=key_hash, user_id=current_user.id))
     db.commit()
+    forget_user(current_user.id)  # the replaced key must stop working now, not at TTL
     return {"api_key": raw}  # shown once
 
 @router.delete("/api-keys")
 def revoke_api_key(current_user=Depends(get_current_user_or_apikey), db=Depends(get_db_session)):
     db.query(APIKey).filter(APIKey.user_id == current_user.id).update({"revoked": True})
     db.commit()
+    forget_user(current_user.id)
     return {"status": "revoked"}
@@ -1,9 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import func, text
+from sqlalchemy import func
 
-from app.deps import get_current_user_or_apikey
+from app.classify import invalidate_rules
+from app.deps import data_etag, get_current_user_or_apikey
 from app.db import get_db_session
 from app.models.Category import Category
+from app.models.CategoryClosure import CategoryClosure
+from app.models.CycleModel import Cycle
+from app.models.CycleSpend import CycleSpend, rebuild_cycle_spend
 from app.models.Invoice import Invoice
 from app.models.Rule import Rule as CategoryRule
 from schema import CategoryCreateReq
@@ -27,12 +31,10 @@ def get_node(db, category_id: int, user_id: int) -> Category:
 
 
 def subtree_ids(db, category_id: int) -> list[int]:
-    """This category plus all descendants, in one recursive query."""
-    return db.execute(text(
-        "WITH RECURSIVE t(id) AS (SELECT :id "
-        "UNION ALL SELECT c.id FROM categories c JOIN t ON c.parent_id = t.id) "
-        "SELECT id FROM t"
-    ), {"id": category_id}).scalars().all()
+    """This category plus all descendants, from the closure table."""
+    return [cid for (cid,) in db.query(CategoryClosure.descendant_id).filter(
+        CategoryClosure.ancestor_id == category_id
+    )]
 
 
 def spent(db, user_id: int, ids) -> tuple[float, int]:
@@ -45,7 +47,19 @@ def spent(db, user_id: int, ids) -> tuple[float, int]:
     return round(total or 0, 2), count or 0
 
 
-@router.get("/")
+def subtree_spent(db, user_id: int, ancestor_ids) -> dict[int, tuple[float, int]]:
+    """{ancestor_id: (total, count)} of successful invoices anywhere under each ancestor, one join."""
+    rows = db.query(CategoryClosure.ancestor_id, func.sum(Invoice.amount), func.count(Invoice.id)).join(
+        Invoice, Invoice.category_id == CategoryClosure.descendant_id
+    ).filter(
+        CategoryClosure.ancestor_id.in_(ancestor_ids),
+        Invoice.extraction_status == "success",
+        Invoice.user_id == user_id,
+    ).group_by(CategoryClosure.ancestor_id)
+    return {a: (round(total or 0, 2), count) for a, total, count in rows}
+
+
+@router.get("/", dependencies=[Depends(data_etag())])
 def category_tree(user=Depends(get_current_user_or_apikey), db=Depends(get_db_session)):
     nodes = db.query(Category).filter_by(user_id=user.id).order_by(Category.name).all()
     by_id = {n.id: node_dict(n, []) for n in nodes}
@@ -62,6 +76,43 @@ def root_categories(user=Depends(get_current_user_or_apikey), db=Depends(get_db_
             db.query(Category).filter_by(user_id=user.id, level=1).order_by(Category.name)]
 
 
+@router.get("/limits", dependencies=[Depends(data_etag())])  # must stay above /{category_id}
+def category_limits(name: str | None = None, user=Depends(get_current_user_or_apikey), db=Depends(get_db_session)):
+    """Limit, spent and remaining in the active cycle for every category (or those called `name`).
+
+    Spent is read from the cycle_spend counters, so this is a handful of indexed
+    lookups however many invoices the cycle holds. A category's limit is its own
+    category_limit, else the sum of rule limits anywhere in its subtree.
+    """
+    cycle = db.query(Cycle).filter(Cycle.user_id == user.id, Cycle.is_active == True).first()
+    if not cycle:
+        return {"status": "no_active_cycle"}
+    spend = {category_id: (total, count) for category_id, total, count in db.query(
+        CycleSpend.category_id, CycleSpend.total, CycleSpend.count
+    ).filter(CycleSpend.cycle_id == cycle.id)}
+    rule_limits = dict(db.query(CategoryClosure.ancestor_id, func.sum(CategoryRule.category_limit)).join(
+        CategoryRule, CategoryRule.category_id == CategoryClosure.descendant_id
+    ).filter(CategoryRule.user_id == user.id, CategoryRule.category_limit != 0).group_by(CategoryClosure.ancestor_id))
+    nodes = db.query(Category).filter_by(user_id=user.id)
+    if name is not None:
+        nodes = nodes.filter(func.lower(Category.name) == name.strip().lower())
+
+    categories = []
+    for n in nodes.order_by(Category.level, Category.name):
+        total, count = spend.get(n.id, (0, 0))
+        limit = n.category_limit or rule_limits.get(n.id) or None
+        categories.append({**node_dict(n), "limit": limit, "spent": round(total, 2), "count": count,
+                           "remaining": round(limit - total, 2) if limit else None})
+    uncategorized_total, uncategorized_count = spend.get(None, (0, 0))
+    return {
+        "cycle_id": cycle.id,
+        "start_date": cycle.start_date.isoformat(),
+        "end_date": cycle.end_date.isoformat() if cycle.end_date else None,
+        "categories": categories,
+        "uncategorized": {"spent": round(uncategorized_total, 2), "count": uncategorized_count},
+    }
+
+
 @router.get("/{category_id}")
 def get_category(category_id: int, user=Depends(get_current_user_or_apikey), db=Depends(get_db_session)):
     node = get_node(db, category_id, user.id)
@@ -71,17 +122,17 @@ def get_category(category_id: int, user=Depends(get_current_user_or_apikey), db=
 
 @router.get("/{category_id}/ancestors")
 def category_ancestors(category_id: int, user=Depends(get_current_user_or_apikey), db=Depends(get_db_session)):
-    path, node = [], get_node(db, category_id, user.id)
-    while node:
-        path.append({"id": node.id, "name": node.name, "level": node.level})
-        node = db.get(Category, node.parent_id) if node.parent_id else None
-    return path[::-1]
+    get_node(db, category_id, user.id)
+    path = db.query(Category.id, Category.name, Category.level).join(
+        CategoryClosure, CategoryClosure.ancestor_id == Category.id
+    ).filter(CategoryClosure.descendant_id == category_id).order_by(CategoryClosure.depth.desc())
+    return [{"id": id, "name": name, "level": level} for id, name, level in path]
 
 
 @router.get("/{category_id}/analysis")
 def category_analysis(category_id: int, user=Depends(get_current_user_or_apikey), db=Depends(get_db_session)):
     node = get_node(db, category_id, user.id)
-    total, count = spent(db, user.id, subtree_ids(db, category_id))
+    total, count = subtree_spent(db, user.id, [node.id]).get(node.id, (0, 0))
     return {
         "category_id": node.id,
         "name": node.name,
@@ -96,9 +147,11 @@ def category_analysis(category_id: int, user=Depends(get_current_user_or_apikey)
 def category_breakdown(category_id: int, user=Depends(get_current_user_or_apikey), db=Depends(get_db_session)):
     node = get_node(db, category_id, user.id)
     direct_spent, _ = spent(db, user.id, [node.id])
+    kids = db.query(Category).filter_by(parent_id=node.id, user_id=user.id).order_by(Category.name).all()
+    totals = subtree_spent(db, user.id, [c.id for c in kids])
     children = []
-    for c in db.query(Category).filter_by(parent_id=node.id, user_id=user.id).order_by(Category.name):
-        total, count = spent(db, user.id, subtree_ids(db, c.id))
+    for c in kids:
+        total, count = totals.get(c.id, (0, 0))
         children.append({**node_dict(c), "spent": total, "count": count})
     return {"category_id": node.id, "name": node.name, "direct_spent": direct_spent, "children": children}
 
@@ -122,13 +175,19 @@ def create_category(req: CategoryCreateReq, user=Depends(get_current_user_or_api
 def update_category(category_id: int, req: CategoryCreateReq, user=Depends(get_current_user_or_apikey), db=Depends(get_db_session)):
     node = get_node(db, category_id, user.id)
     parent = get_node(db, req.parent_id, user.id) if req.parent_id is not None else None
+    if parent and parent.id in subtree_ids(db, node.id):
+        raise HTTPException(409, "Cannot move a category under itself or its descendants")
     dup = db.query(Category).filter_by(parent_id=req.parent_id, name=req.name, user_id=user.id).first()
     if dup and dup.id != node.id:
         raise HTTPException(409, "Name already exists under this parent")
+    old_parent_id = node.parent_id
     node.name = req.name
     node.parent_id = req.parent_id
     node.category_limit = req.category_limit
     node.level = parent.level + 1 if parent else 0
+    if node.parent_id != old_parent_id:  # the subtree now counts towards other ancestors
+        db.flush()
+        rebuild_cycle_spend(db.connection(), user.id)
     db.commit()
     db.refresh(node)
     return node_dict(node)
@@ -141,5 +200,8 @@ def delete_category(category_id: int, user=Depends(get_current_user_or_apikey),
     db.query(Invoice).filter_by(category_id=node.id).update({Invoice.category_id: None})
     db.query(CategoryRule).filter_by(category_id=node.id).update({CategoryRule.category_id: None})
     db.delete(node)
+    db.flush()
+    rebuild_cycle_spend(db.connection(), user.id)  # children moved up, the node's counter row is orphaned
     db.commit()
+    invalidate_rules(user.id)  # rules pointing at the node now classify to None
     return {"status": f"Category '{node.name}' deleted"}
@@ -1,16 +1,23 @@
 from datetime import datetime, timedelta
+from functools import partial
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import and_, func, literal, select
 
-from app.deps import get_current_user_or_apikey
+from app.deps import data_etag, get_current_user_or_apikey
 from app.db import SessionLocal
 from app.models.CycleModel import Cycle as BudgetCycle
 from app.models.Category import Category
+from app.models.CategoryClosure import CategoryClosure
 from app.models.Invoice import Invoice
 from app.models.Rule import Rule as CategoryRule
+from app.responses import ORJSONResponse, invoice_columns, json_rows
+from app.services.cycles import freeze, snapshot
+from app.services.daily_spend import spend_by_category, spend_by_day
 from typing import Optional
 
+from schema import InvoiceOut
+
 router = APIRouter(prefix="/cycles", tags=["cycles"])
 
 
@@ -32,19 +39,17 @@ def cycle_invoices(db, cycle: BudgetCycle, user_id: int) -> list[Invoice]:
     ).all()
 
 
-def bucket_by_main(db, user_id: int):
-    """Map every category node to its level-1 ancestor name (its 'main' bucket)."""
-    cats = {c.id: c for c in db.query(Category).filter_by(user_id=user_id)}
-
-    def main_name(cid):
-        node, top = cats.get(cid), None
-        while node:
-            if node.level == 1:
-                top = node.name
-            node = cats.get(node.parent_id) if node.parent_id else None
-        return top
+def main_buckets(db, user_id: int) -> dict[int, str]:
+    """{category_id: name of its level-1 ancestor}, one join over the closure table.
 
-    return cats, main_name
+    Same answer as walking up the parents: the highest level-1 node on the way.
+    """
+    rows = db.query(CategoryClosure.descendant_id, Category.name, func.max(CategoryClosure.depth)).join(
+        Category, Category.id == CategoryClosure.ancestor_id
+    ).filter(
+        Category.user_id == user_id, Category.level == 1
+    ).group_by(CategoryClosure.descendant_id)
+    return {category_id: name for category_id, name, _ in rows}
 
 
 @router.post("/start")
@@ -66,9 +71,10 @@ def start_new_cycle(start_date: Optional[str] = None, end_date: Optional[str] =
             db.close()
             return {"status": "error", "message": "A cycle with the same start date already exists"}
         print("No duplication detected, proceeding to end current cycle and create new one.")
-    for active in db.query(BudgetCycle).filter(
+    closed = db.query(BudgetCycle).filter(
         BudgetCycle.is_active == True, BudgetCycle.user_id == current_user.id
-    ).all():
+    ).all()
+    for active in closed:
         active.is_active = False
         active.end_date = datetime.now()
 
@@ -79,6 +85,7 @@ def start_new_cycle(start_date: Optional[str] = None, end_date: Optional[str] =
     db.refresh(new_cycle)
     result = {"status": "success", "message": "New budget cycle started",
               "cycle_id": new_cycle.id, "start_date": new_cycle.start_date.isoformat()}
+    freeze_cycles(db, closed, current_user.id)
     db.close()
     return result
 
@@ -97,11 +104,12 @@ def end_current_cycle(current_user=Depends(get_current_user_or_apikey)):
         cycle.is_active = False
         cycle.end_date = datetime.now()
     db.commit()
+    freeze_cycles(db, active_cycles, current_user.id)
     db.close()
     return {"status": "success", "message": "Current budget cycle ended"}
 
 
-@router.get("/current")
+@router.get("/current", dependencies=[Depends(data_etag(hourly=True))])
 def get_current_cycle(current_user=Depends(get_current_user_or_apikey)):
     """Get the current active budget cycle."""
     db = SessionLocal()
@@ -135,30 +143,32 @@ def get_current_cycle(current_user=Depends(get_current_user_or_apikey)):
 
 @router.get("/history")
 def get_cycle_history(limit: int = 12, current_user=Depends(get_current_user_or_apikey)):
-    """Get past budget cycles with their totals."""
+    """Get past budget cycles with their totals (limit=0 for the full history)."""
     db = SessionLocal()
     try:
-        cycles = db.query(BudgetCycle).filter(
+        # one statement: every cycle joined to its invoices by date range, summed per cycle
+        end = func.coalesce(BudgetCycle.end_date, literal(datetime.now(), BudgetCycle.end_date.type))
+        query = db.query(BudgetCycle, func.sum(Invoice.amount)).outerjoin(Invoice, and_(
+            Invoice.user_id == BudgetCycle.user_id,
+            Invoice.extraction_status == "success",
+            Invoice.created_at >= BudgetCycle.start_date,
+            Invoice.created_at <= end,
+        )).filter(
             BudgetCycle.user_id == current_user.id
-        ).order_by(BudgetCycle.start_date.desc()).limit(limit).all()
-
-        result = []
-        for cycle in cycles:
-            end = cycle.end_date or datetime.now()
-            total_spent = db.query(func.sum(Invoice.amount)).filter(
-                Invoice.created_at >= cycle.start_date,
-                Invoice.created_at <= end,
-                Invoice.extraction_status == "success",
-                Invoice.user_id == current_user.id,
-            ).scalar() or 0
-            result.append({
+        ).group_by(BudgetCycle.id).order_by(BudgetCycle.start_date.desc())
+        if limit > 0:
+            query = query.limit(limit)
+
+        return [
+            {
                 "id": cycle.id,
                 "start_date": cycle.start_date.isoformat(),
                 "end_date": cycle.end_date.isoformat() if cycle.end_date else None,
                 "is_active": cycle.is_active,
-                "total_spent": round(total_spent, 2),
-            })
-        return result
+                "total_spent": round(total_spent or 0, 2),
+            }
+            for cycle, total_spent in query
+        ]
     finally:
         db.close()
 
@@ -179,26 +189,24 @@ def delete_cycle(cycle_id: int, current_user=Depends(get_current_user_or_apikey)
     return {"status": f"Cycle {cycle_id} deleted successfully"}
 
 
-@router.get("/{cycle_id}/invoices")
-def get_cycle_invoices(cycle_id: int, current_user=Depends(get_current_user_or_apikey)):
+@router.get("/{cycle_id}/invoices", response_model=list[InvoiceOut], response_class=ORJSONResponse)
+def get_cycle_invoices(cycle_id: int, fields: Optional[str] = Query(None, description="Comma-separated InvoiceOut "
+                                                                   "fields; default all but raw_invoice"),
+                       current_user=Depends(get_current_user_or_apikey)):
     """All successful invoices in a cycle."""
+    columns = invoice_columns(fields)
     db = SessionLocal()
-    cycle = get_cycle_or_404(db, cycle_id, current_user.id)
-    invoices = cycle_invoices(db, cycle, current_user.id)
-    db.close()
-    return [
-        {
-            "id": inv.id,
-            "amount": inv.amount,
-            "merchant": inv.merchant,
-            "category_id": inv.category_id,
-            "classification": inv.classification,
-            "note": inv.note,
-            "extraction_status": inv.extraction_status,
-            "created_at": inv.created_at.isoformat() if inv.created_at else None,
-        }
-        for inv in invoices
-    ]
+    try:
+        cycle = get_cycle_or_404(db, cycle_id, current_user.id)
+        rows = db.execute(select(*columns).where(
+            Invoice.created_at >= cycle.start_date,
+            Invoice.created_at <= (cycle.end_date or datetime.now()),
+            Invoice.extraction_status == "success",
+            Invoice.user_id == current_user.id,
+        )).all()
+    finally:
+        db.close()
+    return json_rows(rows)
 
 
 def pace_of(spent, limit, time_elapsed_pct):
@@ -214,211 +222,232 @@ def pace_of(spent, limit, time_elapsed_pct):
     return "on_track"
 
 
-@router.get("/{cycle_id}/analysis")
-def cycle_analysis(cycle_id: int, current_user=Depends(get_current_user_or_apikey)):
+def build_analysis(db, cycle: BudgetCycle, user_id: int) -> dict:
     """Full cycle analysis: totals, budget pace, per-main-category breakdown, top merchants."""
+    by_category = spend_by_category(db, user_id, cycle.start_date, cycle.end_date or datetime.now())
+
+    # Cycle time elapsed — pace baseline (0..100)
+    start = cycle.start_date.replace(tzinfo=None) if cycle.start_date.tzinfo else cycle.start_date
+    end = cycle.end_date or datetime.now()
+    end = end.replace(tzinfo=None) if end.tzinfo else end
+    now = datetime.now()
+    elapsed_days = max((min(now, end) - start).days, 0)
+    planned_days = (end - start).days
+    cycle_days = max(planned_days if planned_days > 0 else 30, 1)
+    time_elapsed_pct = round(min(elapsed_days / cycle_days, 1.0) * 100, 1)
+
+    total_spent = sum(total for total, _ in by_category.values())
+    transaction_count = sum(count for _, count in by_category.values())
+    average_transaction = total_spent / transaction_count if transaction_count else 0
+
+    total_budget = db.query(func.sum(CategoryRule.category_limit)).filter(
+        CategoryRule.user_id == user_id
+    ).scalar() or 0
+
+    # Bucket spend by each invoice's level-1 ancestor; bucket limit = sum of
+    # rule limits on any node inside that subtree.
+    buckets = main_buckets(db, user_id)
+    rule_limits: dict[str, float] = {}
+    for category_id, limit in db.query(CategoryRule.category_id, func.sum(CategoryRule.category_limit)).filter(
+        CategoryRule.user_id == user_id,
+        CategoryRule.category_id.is_not(None),
+        CategoryRule.category_limit != 0,
+    ).group_by(CategoryRule.category_id):
+        bucket = buckets.get(category_id)
+        if bucket:
+            rule_limits[bucket] = rule_limits.get(bucket, 0) + limit
+
+    spent_by_main: dict[str, float] = {}
+    categorized = 0.0
+    for category_id, (total, _) in by_category.items():
+        bucket = buckets.get(category_id)
+        if not bucket:
+            continue
+        spent_by_main[bucket] = spent_by_main.get(bucket, 0) + total
+        categorized += total
+
+    category_breakdown = []
+    for bucket, spent in sorted(spent_by_main.items(), key=lambda x: x[1], reverse=True):
+        limit = rule_limits.get(bucket)
+        category_breakdown.append({
+            "category": bucket,
+            "spent": round(spent, 2),
+            "limit": limit,
+            "percentage_of_total": round((spent / total_spent * 100), 1) if total_spent > 0 else 0,
+            "percentage_of_limit": round((spent / limit * 100), 1) if limit else None,
+            "pace": pace_of(spent, limit, time_elapsed_pct),
+        })
+
+    uncategorized = total_spent - categorized
+    if uncategorized > 0.005:
+        category_breakdown.append({
+            "category": "Uncategorized",
+            "spent": round(uncategorized, 2),
+            "limit": None,
+            "percentage_of_total": round((uncategorized / total_spent * 100), 1) if total_spent > 0 else 0,
+            "percentage_of_limit": None,
+            "pace": None,
+        })
+
+    spent_col = func.sum(Invoice.amount)
+    merchant_spending = db.query(Invoice.merchant, spent_col).filter(
+        Invoice.created_at >= cycle.start_date,
+        Invoice.created_at <= end,
+        Invoice.extraction_status == "success",
+        Invoice.user_id == user_id,
+        Invoice.merchant.is_not(None),
+        Invoice.merchant != "",
+    ).group_by(Invoice.merchant).order_by(spent_col.desc(), func.min(Invoice.id)).limit(5)
+    top_merchants = [{"merchant": m, "spent": round(s or 0, 2)} for m, s in merchant_spending]
+
+    return {
+        "cycle_id": cycle.id,
+        "start_date": cycle.start_date.isoformat(),
+        "end_date": cycle.end_date.isoformat() if cycle.end_date else None,
+        "is_active": cycle.is_active,
+        "total_spent": round(total_spent, 2),
+        "total_budget": round(total_budget, 2),
+        "remaining_budget": round(total_budget - total_spent, 2),
+        "budget_percentage_used": round((total_spent / total_budget * 100), 1) if total_budget > 0 else 0,
+        "transaction_count": transaction_count,
+        "average_transaction": round(average_transaction, 2),
+        "time_elapsed_pct": time_elapsed_pct,
+        "cycle_days": cycle_days,
+        "overall_pace": pace_of(total_spent, total_budget, time_elapsed_pct),
+        "category_breakdown": category_breakdown,
+        "top_merchants": top_merchants,
+    }
+
+
+@router.get("/{cycle_id}/analysis", dependencies=[Depends(data_etag(hourly=True))])
+def cycle_analysis(cycle_id: int, current_user=Depends(get_current_user_or_apikey)):
+    """build_analysis(); a closed cycle's is served from its snapshot."""
     db = SessionLocal()
     try:
         cycle = get_cycle_or_404(db, cycle_id, current_user.id)
-        invoices = cycle_invoices(db, cycle, current_user.id)
-
-        # Cycle time elapsed — pace baseline (0..100)
-        start = cycle.start_date.replace(tzinfo=None) if cycle.start_date.tzinfo else cycle.start_date
-        end = cycle.end_date or datetime.now()
-        end = end.replace(tzinfo=None) if end.tzinfo else end
-        now = datetime.now()
-        elapsed_days = max((min(now, end) - start).days, 0)
-        planned_days = (end - start).days
-        cycle_days = max(planned_days if planned_days > 0 else 30, 1)
-        time_elapsed_pct = round(min(elapsed_days / cycle_days, 1.0) * 100, 1)
-
-        total_spent = sum((inv.amount or 0) for inv in invoices)
-        transaction_count = len(invoices)
-        average_transaction = total_spent / transaction_count if transaction_count else 0
-
-        total_budget = db.query(func.sum(CategoryRule.category_limit)).filter(
-            CategoryRule.user_id == current_user.id
-        ).scalar() or 0
-
-        # Bucket spend by each invoice's level-1 ancestor; bucket limit = sum of
-        # rule limits on any node inside that subtree.
-        cats, main_name = bucket_by_main(db, current_user.id)
-        rule_limits: dict[str, float] = {}
-        for rule in db.query(CategoryRule).filter_by(user_id=current_user.id).all():
-            if rule.category_limit and rule.category_id:
-                bucket = main_name(rule.category_id)
-                if bucket:
-                    rule_limits[bucket] = rule_limits.get(bucket, 0) + rule.category_limit
-
-        spent_by_main: dict[str, float] = {}
-        categorized = 0.0
-        for inv in invoices:
-            if not inv.category_id:
-                continue
-            bucket = main_name(inv.category_id)
-            if not bucket:
-                continue
-            spent_by_main[bucket] = spent_by_main.get(bucket, 0) + (inv.amount or 0)
-            categorized += inv.amount or 0
-
-        category_breakdown = []
-        for bucket, spent in sorted(spent_by_main.items(), key=lambda x: x[1], reverse=True):
-            limit = rule_limits.get(bucket)
-            category_breakdown.append({
-                "category": bucket,
-                "spent": round(spent, 2),
-                "limit": limit,
-                "percentage_of_total": round((spent / total_spent * 100), 1) if total_spent > 0 else 0,
-                "percentage_of_limit": round((spent / limit * 100), 1) if limit else None,
-                "pace": pace_of(spent, limit, time_elapsed_pct),
-            })
-
-        uncategorized = total_spent - categorized
-        if uncategorized > 0.005:
-            category_breakdown.append({
-                "category": "Uncategorized",
-                "spent": round(uncategorized, 2),
-                "limit": None,
-                "percentage_of_total": round((uncategorized / total_spent * 100), 1) if total_spent > 0 else 0,
-                "percentage_of_limit": None,
-                "pace": None,
-            })
-
-        merchant_spending = {}
-        for inv in invoices:
-            if inv.merchant:
-                merchant_spending[inv.merchant] = merchant_spending.get(inv.merchant, 0) + (inv.amount or 0)
-        top_merchants = [
-            {"merchant": m, "spent": round(s, 2)}
-            for m, s in sorted(merchant_spending.items(), key=lambda x: x[1], reverse=True)[:5]
-        ]
-
-        return {
-            "cycle_id": cycle.id,
-            "start_date": cycle.start_date.isoformat(),
-            "end_date": cycle.end_date.isoformat() if cycle.end_date else None,
-            "is_active": cycle.is_active,
-            "total_spent": round(total_spent, 2),
-            "total_budget": round(total_budget, 2),
-            "remaining_budget": round(total_budget - total_spent, 2),
-            "budget_percentage_used": round((total_spent / total_budget * 100), 1) if total_budget > 0 else 0,
-            "transaction_count": transaction_count,
-            "average_transaction": round(average_transaction, 2),
-            "time_elapsed_pct": time_elapsed_pct,
-            "cycle_days": cycle_days,
-            "overall_pace": pace_of(total_spent, total_budget, time_elapsed_pct),
-            "category_breakdown": category_breakdown,
-            "top_merchants": top_merchants,
-        }
+        return snapshot(db, cycle, "analysis", lambda: build_analysis(db, cycle, current_user.id))
     finally:
         db.close()
 
 
-@router.get("/{cycle_id}/top-categories")
-def cycle_top_categories(cycle_id: int, current_user=Depends(get_current_user_or_apikey)):
+def build_top_categories(db, cycle: BudgetCycle, user_id: int) -> dict:
     """Ranked spending by main category for a cycle, with sub-category breakdown."""
+    invoices = cycle_invoices(db, cycle, user_id)
+
+    total_spent = sum((inv.amount or 0) for inv in invoices)
+
+    # Uncategorized spend so parts sum to the whole
+    uncategorized = sum((inv.amount or 0) for inv in invoices if not inv.category_id)
+    uncategorized_count = sum(1 for inv in invoices if not inv.category_id)
+
+    cats = {c.id: c for c in db.query(Category).filter_by(user_id=user_id)}
+    buckets = main_buckets(db, user_id)
+
+    def names_of(cid):
+        """(main bucket, tagged node name if deeper than level 1)."""
+        bucket = buckets.get(cid)
+        node = cats.get(cid)
+        sub = node.name if node and node.level >= 2 else "Uncategorized"
+        return bucket, sub
+
+    main_agg = {}
+    sub_agg = {}
+    for inv in invoices:
+        if not inv.category_id:
+            continue
+        cat, sub = names_of(inv.category_id)
+        amount = inv.amount or 0
+        entry = main_agg.setdefault(cat, {"spent": 0.0, "count": 0})
+        entry["spent"] += amount
+        entry["count"] += 1
+
+        subs = sub_agg.setdefault(cat, {})
+        sub_entry = subs.setdefault(sub, {"spent": 0.0, "count": 0})
+        sub_entry["spent"] += amount
+        sub_entry["count"] += 1
+
+    categories = []
+    for cat, agg in sorted(main_agg.items(), key=lambda x: x[1]["spent"], reverse=True):
+        sub_categories = [
+            {"name": sub, "spent": round(s["spent"], 2), "count": s["count"]}
+            for sub, s in sorted(sub_agg.get(cat, {}).items(), key=lambda x: x[1]["spent"], reverse=True)
+        ]
+        categories.append({
+            "category": cat,
+            "spent": round(agg["spent"], 2),
+            "count": agg["count"],
+            "percentage_of_total": round((agg["spent"] / total_spent * 100), 1) if total_spent > 0 else 0,
+            "sub_categories": sub_categories,
+        })
+
+    if uncategorized > 0.005:
+        categories.append({
+            "category": "Uncategorized",
+            "spent": round(uncategorized, 2),
+            "count": uncategorized_count,
+            "percentage_of_total": round((uncategorized / total_spent * 100), 1) if total_spent > 0 else 0,
+            "sub_categories": [],
+        })
+
+    return {
+        "cycle_id": cycle.id,
+        "total_spent": round(total_spent, 2),
+        "categories": categories,
+    }
+
+
+@router.get("/{cycle_id}/top-categories", dependencies=[Depends(data_etag(hourly=True))])
+def cycle_top_categories(cycle_id: int, current_user=Depends(get_current_user_or_apikey)):
+    """build_top_categories(); a closed cycle's is served from its snapshot."""
     db = SessionLocal()
     try:
         cycle = get_cycle_or_404(db, cycle_id, current_user.id)
-        invoices = cycle_invoices(db, cycle, current_user.id)
-
-        total_spent = sum((inv.amount or 0) for inv in invoices)
-
-        # Uncategorized spend so parts sum to the whole
-        uncategorized = sum((inv.amount or 0) for inv in invoices if not inv.category_id)
-        uncategorized_count = sum(1 for inv in invoices if not inv.category_id)
-
-        cats, main_name = bucket_by_main(db, current_user.id)
-
-        def names_of(cid):
-            """(main bucket, tagged node name if deeper than level 1)."""
-            bucket = main_name(cid)
-            node = cats.get(cid)
-            sub = node.name if node and node.level >= 2 else "Uncategorized"
-            return bucket, sub
-
-        main_agg = {}
-        sub_agg = {}
-        for inv in invoices:
-            if not inv.category_id:
-                continue
-            cat, sub = names_of(inv.category_id)
-            amount = inv.amount or 0
-            entry = main_agg.setdefault(cat, {"spent": 0.0, "count": 0})
-            entry["spent"] += amount
-            entry["count"] += 1
-
-            subs = sub_agg.setdefault(cat, {})
-            sub_entry = subs.setdefault(sub, {"spent": 0.0, "count": 0})
-            sub_entry["spent"] += amount
-            sub_entry["count"] += 1
-
-        categories = []
-        for cat, agg in sorted(main_agg.items(), key=lambda x: x[1]["spent"], reverse=True):
-            sub_categories = [
-                {"name": sub, "spent": round(s["spent"], 2), "count": s["count"]}
-                for sub, s in sorted(sub_agg.get(cat, {}).items(), key=lambda x: x[1]["spent"], reverse=True)
-            ]
-            categories.append({
-                "category": cat,
-                "spent": round(agg["spent"], 2),
-                "count": agg["count"],
-                "percentage_of_total": round((agg["spent"] / total_spent * 100), 1) if total_spent > 0 else 0,
-                "sub_categories": sub_categories,
-            })
-
-        if uncategorized > 0.005:
-            categories.append({
-                "category": "Uncategorized",
-                "spent": round(uncategorized, 2),
-                "count": uncategorized_count,
-                "percentage_of_total": round((uncategorized / total_spent * 100), 1) if total_spent > 0 else 0,
-                "sub_categories": [],
-            })
-
-        return {
-            "cycle_id": cycle.id,
-            "total_spent": round(total_spent, 2),
-            "categories": categories,
-        }
+        return snapshot(db, cycle, "top_categories", lambda: build_top_categories(db, cycle, current_user.id))
     finally:
         db.close()
 
 
-@router.get("/{cycle_id}/spending-timeline")
-def cycle_spending_timeline(cycle_id: int, current_user=Depends(get_current_user_or_apikey)):
+def build_timeline(db, cycle: BudgetCycle, user_id: int) -> dict:
     """Daily spending data for a cycle, filling in zero-spend days."""
+    end = cycle.end_date or datetime.now()
+    start = cycle.start_date.replace(tzinfo=None)
+    end_clean = end.replace(tzinfo=None) if hasattr(end, 'replace') else end
+
+    daily_map = {}
+    for day, _, spent, count in spend_by_day(db, user_id, cycle.start_date, end):
+        entry = daily_map.setdefault(day, {"spent": 0.0, "count": 0})
+        entry["spent"] += spent or 0
+        entry["count"] += count
+    for entry in daily_map.values():
+        entry["spent"] = round(entry["spent"], 2)
+
+    data = []
+    current = start.date() if hasattr(start, 'date') else start
+    end_date = end_clean.date() if hasattr(end_clean, 'date') else end_clean
+    while current <= end_date:
+        key = str(current)
+        entry = daily_map.get(key, {"spent": 0, "count": 0})
+        data.append({"date": key, "spent": entry["spent"], "count": entry["count"]})
+        current += timedelta(days=1)
+
+    return {"data": data}
+
+
+@router.get("/{cycle_id}/spending-timeline", dependencies=[Depends(data_etag(hourly=True))])
+def cycle_spending_timeline(cycle_id: int, current_user=Depends(get_current_user_or_apikey)):
+    """build_timeline(); a closed cycle's is served from its snapshot."""
     db = SessionLocal()
     try:
         cycle = get_cycle_or_404(db, cycle_id, current_user.id)
-        end = cycle.end_date or datetime.now()
-        start = cycle.start_date.replace(tzinfo=None)
-        end_clean = end.replace(tzinfo=None) if hasattr(end, 'replace') else end
-
-        daily = db.query(
-            func.date(Invoice.created_at).label("day"),
-            func.sum(Invoice.amount).label("spent"),
-            func.count(Invoice.id).label("count")
-        ).filter(
-            Invoice.created_at >= cycle.start_date,
-            Invoice.created_at <= end,
-            Invoice.extraction_status == "success",
-            Invoice.user_id == current_user.id
-        ).group_by(func.date(Invoice.created_at)).all()
-
-        daily_map = {}
-        for row in daily:
-            daily_map[str(row.day)] = {"spent": round(row.spent or 0, 2), "count": row.count}
-
-        data = []
-        current = start.date() if hasattr(start, 'date') else start
-        end_date = end_clean.date() if hasattr(end_clean, 'date') else end_clean
-        while current <= end_date:
-            key = str(current)
-            entry = daily_map.get(key, {"spent": 0, "count": 0})
-            data.append({"date": key, "spent": entry["spent"], "count": entry["count"]})
-            current += timedelta(days=1)
-
-        return {"data": data}
+        return snapshot(db, cycle, "timeline", lambda: build_timeline(db, cycle, current_user.id))
     finally:
         db.close()
+
+
+SNAPSHOTS = {"analysis": build_analysis, "top_categories": build_top_categories, "timeline": build_timeline}
+
+
+def freeze_cycles(db, cycles: list[BudgetCycle], user_id: int) -> None:
+    """Snapshot cycles that were just closed."""
+    for cycle in cycles:
+        freeze(db, cycle, {kind: partial(build, db, cycle, user_id) for kind, build in SNAPSHOTS.items()})
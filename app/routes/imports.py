@@ -0,0 +1,87 @@
+import logging
+import os
+import shutil
+import uuid
+from datetime import datetime, timedelta
+from typing import Literal
+
+from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, UploadFile
+
+from app.config import IMPORT_DIR
+from app.db import get_db_session
+from app.deps import get_current_user_or_apikey
+from app.models.ImportJob import ImportJob
+from app.services.importer import create_job, job_dict, run_import
+
+log = logging.getLogger(__name__)
+router = APIRouter(prefix="/imports", tags=["imports"])
+
+STALE_AFTER = timedelta(minutes=5)  # a "running" job with no chunk committed for this long died with its worker
+
+
+def run_in_background(job_id: int) -> None:
+    """run_import, then drop our copy of the upload; a failed job keeps it for /resume."""
+    try:
+        job = run_import(job_id)
+    except Exception:
+        log.exception("import %s failed", job_id)
+        return
+    if os.path.dirname(os.path.abspath(job.path)) == os.path.abspath(IMPORT_DIR):
+        os.remove(job.path)
+
+
+def get_job(db, job_id: int, user_id: int) -> ImportJob:
+    job = db.query(ImportJob).filter_by(id=job_id, user_id=user_id).first()
+    if not job:
+        raise HTTPException(404, "Import not found")
+    return job
+
+
+@router.post("/", status_code=202)
+def start_import(background: BackgroundTasks, file: UploadFile = File(...),
+                 format: Literal["sms", "ndjson", "csv"] | None = None,
+                 current_user=Depends(get_current_user_or_apikey), db=Depends(get_db_session)):
+    """Upload raw SMS (blank-line separated), NDJSON or a CSV statement; poll GET /imports/{id} for progress.
+
+    Re-uploading a file already imported for this user returns that job instead of importing it twice.
+    """
+    os.makedirs(IMPORT_DIR, exist_ok=True)
+    name = os.path.basename(file.filename or "statement")
+    path = os.path.join(IMPORT_DIR, f"{uuid.uuid4().hex}-{name}")
+    with open(path, "wb") as out:
+        shutil.copyfileobj(file.file, out, 1 << 20)
+    try:
+        job, created = create_job(db, current_user.id, path, name, format)
+    except ValueError as exc:
+        os.remove(path)
+        raise HTTPException(400, str(exc))
+    if not created:
+        if job.status in ("done", "running") or os.path.exists(job.path):
+            os.remove(path)
+        else:  # same bytes as the unfinished job's lost file: resume from this copy
+            job.path = path
+            db.commit()
+        if job.status in ("done", "running"):
+            return job_dict(job)
+    background.add_task(run_in_background, job.id)
+    return job_dict(job)
+
+
+@router.get("/{job_id}")
+def import_status(job_id: int, current_user=Depends(get_current_user_or_apikey), db=Depends(get_db_session)):
+    return job_dict(get_job(db, job_id, current_user.id))
+
+
+@router.post("/{job_id}/resume", status_code=202)
+def resume_import(job_id: int, background: BackgroundTasks,
+                  current_user=Depends(get_current_user_or_apikey), db=Depends(get_db_session)):
+    """Continue a failed or interrupted import after its last committed chunk."""
+    job = get_job(db, job_id, current_user.id)
+    if job.status == "done":
+        raise HTTPException(409, "Import already finished")
+    if job.status == "running" and datetime.utcnow() - job.updated_at < STALE_AFTER:
+        raise HTTPException(409, "Import is still running")
+    if not os.path.exists(job.path):
+        raise HTTPException(410, "Uploaded file is gone; upload it again")
+    background.add_task(run_in_background, job.id)
+    return job_dict(job)
@@ -1,34 +1,175 @@
-from fastapi import APIRouter, Depends
+import base64
+import json
+from datetime import datetime
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import String, and_, case, func, or_, select, type_coerce
 from app.deps import get_current_user_or_apikey
 from app.db import SessionLocal
 from app.models.Invoice import Invoice
 from typing import Optional
 
-from app.classify import classify_merchant
-from schema import UpdateInvoiceReq
+from app.classify import get_matcher
+from app.models.CycleModel import Cycle
+from app.responses import ORJSONResponse, invoice_columns, json_rows
+from app.services.export import export_query, stream_csv, stream_ndjson
+from app.services.search import fts_query, ranked_search, search_filter
+from schema import InvoiceOut, UpdateInvoiceReq
 
 router = APIRouter(prefix="/invoices", tags=["invoices"])
-@router.get("/")
-def get_invoices(skip: int = 0, limit: int = 100, search: Optional[str] = None,
-                 category_id: Optional[int] = None, min_amount: Optional[float] = None,
-                 max_amount: Optional[float] = None, current_user = Depends(get_current_user_or_apikey)):
-    db = SessionLocal()
-    query = db.query(Invoice).filter(Invoice.user_id == current_user.id)
 
-    if search:
-        query = query.filter(Invoice.merchant.ilike(f"%{search}%"))
+CATEGORIZE_CHUNK = 500  # merchants per UPDATE (~5 bound params each), well under SQLite's cap
+
+# created_at as SQLite stores it: cursors compare the exact text the index is sorted by,
+# not a re-rendered datetime (rows written by server_default have no fractional part)
+CREATED_KEY = type_coerce(Invoice.created_at, String)
+
+# GET /invoices/page rows: everything the list renders, minus raw_invoice
+LIST_COLUMNS = (Invoice.id, Invoice.amount, Invoice.merchant, Invoice.extraction_status,
+                Invoice.classification, Invoice.category_id, Invoice.note, Invoice.created_at)
+
+
+def _filters(db, user_id: int, search, category_id, min_amount, max_amount) -> list:
+    conds = [Invoice.user_id == user_id]
+    matched = search_filter(db, search, ("merchant", "note"), user_id)
+    if matched is not None:
+        clause, few = matched
+        if few:  # `+ 0` so SQLite fetches the few ids by key instead of walking the user index
+            conds = [Invoice.user_id + 0 == user_id]
+        conds.append(clause)
     if category_id is not None:
-        query = query.filter(Invoice.category_id == category_id)
+        conds.append(Invoice.category_id == category_id)
     if min_amount is not None:
-        query = query.filter(Invoice.amount >= min_amount)
+        conds.append(Invoice.amount >= min_amount)
     if max_amount is not None:
-        query = query.filter(Invoice.amount <= max_amount)
+        conds.append(Invoice.amount <= max_amount)
+    return conds
 
-    invoices = query.order_by(Invoice.created_at.desc()).offset(skip).limit(limit).all()
-    db.close()
-    return invoices
+
+def encode_cursor(created_at: str, invoice_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([created_at, invoice_id]).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    try:  # binascii.Error and UnicodeDecodeError are ValueErrors
+        decoded = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not (isinstance(decoded, list) and len(decoded) == 2):
+            raise ValueError
+        created_at, invoice_id = decoded
+        if not isinstance(created_at, str) or not isinstance(invoice_id, int):
+            raise ValueError
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Invalid cursor")
+    return created_at, invoice_id
+
+
+@router.get("/", response_model=list[InvoiceOut], response_class=ORJSONResponse)
+def get_invoices(skip: int = 0, limit: int = 100, search: Optional[str] = None,
+                 category_id: Optional[int] = None, min_amount: Optional[float] = None,
+                 max_amount: Optional[float] = None,
+                 fields: Optional[str] = Query(None, description="Comma-separated InvoiceOut fields; "
+                                               "default all but raw_invoice"),
+                 current_user = Depends(get_current_user_or_apikey)):
+    columns = invoice_columns(fields)
+    db = SessionLocal()
+    try:
+        stmt = select(*columns).where(*_filters(db, current_user.id, search, category_id, min_amount, max_amount))
+        rows = db.execute(stmt.order_by(Invoice.created_at.desc()).offset(skip).limit(limit)).all()
+    finally:
+        db.close()
+    return json_rows(rows)
 
 
+@router.get("/page")
+def get_invoice_page(cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=500),
+                     search: Optional[str] = None, category_id: Optional[int] = None,
+                     min_amount: Optional[float] = None, max_amount: Optional[float] = None,
+                     with_total: bool = False, current_user = Depends(get_current_user_or_apikey)):
+    """Newest first, keyset-paginated on (created_at, id): every page costs the same.
+
+    Pass the returned next_cursor back to continue (null on the last page). with_total adds
+    the filtered count as a scalar subquery of the same statement.
+    """
+    db = SessionLocal()
+    try:
+        conds = _filters(db, current_user.id, search, category_id, min_amount, max_amount)
+        columns = [*LIST_COLUMNS, CREATED_KEY.label("created_key")]
+        if with_total:
+            columns.append(select(func.count()).select_from(Invoice).where(*conds).scalar_subquery().label("total"))
+        stmt = select(*columns).where(*conds)
+        if cursor:
+            created_at, invoice_id = decode_cursor(cursor)
+            stmt = stmt.where(or_(CREATED_KEY < created_at, and_(CREATED_KEY == created_at, Invoice.id < invoice_id)))
+        # user_id + (created_at, id) walks ix_invoices_user_created backwards; id is the rowid, so it rides along
+        stmt = stmt.order_by(CREATED_KEY.desc(), Invoice.id.desc()).limit(limit + 1)
+
+        rows = db.execute(stmt).all()
+        total = None
+        if with_total:
+            total = rows[0].total if rows else db.execute(
+                select(func.count()).select_from(Invoice).where(*conds)).scalar()
+    finally:
+        db.close()
+
+    page = rows[:limit]
+    next_cursor = encode_cursor(page[-1].created_key, page[-1].id) if len(rows) > limit else None
+    items = [{c.key: getattr(r, c.key) for c in LIST_COLUMNS} for r in page]
+    return {"items": items, "next_cursor": next_cursor, "total": total}
+
+
+@router.get("/search")
+def search_invoices(q: str, limit: int = Query(50, ge=1, le=200), offset: int = Query(0, ge=0),
+                    include_raw: bool = False, current_user = Depends(get_current_user_or_apikey)):
+    """Full-text search over merchant and note (plus the raw SMS with include_raw), best match first.
+
+    Every word must match as a word prefix; case, Latin accents and Arabic diacritics are ignored.
+    """
+    query = fts_query(q, None if include_raw else ("merchant", "note"))
+    if not query:
+        return {"items": [], "has_more": False}
+    stmt = ranked_search(query, current_user.id, LIST_COLUMNS).offset(offset).limit(limit + 1)
+    db = SessionLocal()
+    try:
+        rows = db.execute(stmt).all()
+    finally:
+        db.close()
+    items = [{**{c.key: getattr(r, c.key) for c in LIST_COLUMNS}, "score": r.score} for r in rows[:limit]]
+    return {"items": items, "has_more": len(rows) > limit}
+
+
+@router.get("/export")
+def export_invoices(format: Literal["csv", "ndjson"] = "csv", cycle_id: Optional[int] = None,
+                    start: Optional[datetime] = None, end: Optional[datetime] = None,
+                    include_failed: bool = False, include_raw: bool = False,
+                    current_user = Depends(get_current_user_or_apikey)):
+    """Stream invoices oldest first, for one cycle or a start/end range (default: everything).
+
+    Rows are fetched and written in chunks while the client reads, so a multi-year
+    export costs the same memory as a one-day one.
+    """
+    if cycle_id is not None:
+        db = SessionLocal()
+        try:
+            cycle = db.query(Cycle).filter_by(id=cycle_id, user_id=current_user.id).first()
+        finally:
+            db.close()
+        if not cycle:
+            raise HTTPException(404, "Cycle not found")
+        start, end = cycle.start_date, cycle.end_date or datetime.now()
+    # created_at is stored naive
+    start, end = (d.replace(tzinfo=None) if d and d.tzinfo else d for d in (start, end))
+
+    stmt = export_query(current_user.id, start, end, include_failed, include_raw)
+    span = "-".join(f"{d:%Y%m%d}" for d in (start, end) if d) or "all"
+    if format == "csv":
+        body, media_type = stream_csv(stmt), "text/csv; charset=utf-8"
+    else:
+        body, media_type = stream_ndjson(stmt), "application/x-ndjson"
+    return StreamingResponse(body, media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="invoices-{span}.{format}"'})
+
 
 @router.get("/{invoice_id}")
 def get_invoice(invoice_id:int, current_user = Depends(get_current_user_or_apikey)):
@@ -78,13 +219,27 @@ def delete_invoice(invoice_id: int, current_user = Depends(get_current_user_or_a
 def categorize_invoices(current_user = Depends(get_current_user_or_apikey)):
     """Re-categorize all invoices based on current rules"""
     db = SessionLocal()
-    invoices = db.query(Invoice).filter(Invoice.user_id == current_user.id).all()
-    updated_count = 0
-    for invoice in invoices:
-        cid = classify_merchant(invoice.merchant)
-        if invoice.category_id != cid:
-            invoice.category_id = cid
-            updated_count += 1
-    db.commit()
-    db.close()
+    try:
+        matcher = get_matcher(current_user.id)
+        merchants = db.query(Invoice.merchant).filter(Invoice.user_id == current_user.id).distinct()
+
+        # classify each distinct merchant once; no merchant ("" too) means no category
+        targets = [(m, matcher.classify(m)) for (m,) in merchants if m]
+
+        mine = (Invoice.user_id == current_user.id)
+        updated_count = db.query(Invoice).filter(
+            mine, or_(Invoice.merchant.is_(None), Invoice.merchant == ""), Invoice.category_id.is_not(None)
+        ).update({Invoice.category_id: None}, synchronize_session=False)
+        # one UPDATE ... SET category_id = CASE merchant WHEN ... END per chunk, not one per category
+        for i in range(0, len(targets), CATEGORIZE_CHUNK):
+            chunk = dict(targets[i:i + CATEGORIZE_CHUNK])
+            target = case(chunk, value=Invoice.merchant)
+            updated_count += db.query(Invoice).filter(
+                mine,
+                Invoice.merchant.in_(chunk),
+                Invoice.category_id.is_distinct_from(target),
+            ).update({Invoice.category_id: target}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
     return {"status": "success", "updated_invoices": updated_count}
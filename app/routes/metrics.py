@@ -0,0 +1,27 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.deps import auth_cache
+from app.metrics import metrics
+from app.services.ingest_queue import ingest_queue
+
+router = APIRouter(tags=["metrics"])
+
+
+def auth_cache_samples():
+    stats = auth_cache.stats()
+    return [
+        ("auth_cache_hits_total", "counter", "API-key / JWT user lookups served from cache.", [({}, stats["hits"])]),
+        ("auth_cache_misses_total", "counter", "API-key / JWT user lookups that went to the DB.", [({}, stats["misses"])]),
+        ("auth_cache_entries", "gauge", "Users currently cached.", [({}, stats["size"])]),
+    ]
+
+
+metrics.collectors.append(auth_cache_samples)
+metrics.collectors.append(ingest_queue.samples)
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus text exposition; unauthenticated, so keep it off the public interface."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
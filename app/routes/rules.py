@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 
-from app.deps import get_current_user_or_apikey
+from app.classify import invalidate_rules
+from app.deps import data_etag, get_current_user_or_apikey
 from app.db import get_db_session
 from app.models.Rule import Rule as CategoryRule
-from schema import CategoryRuleReq
+from app.responses import ORJSONResponse, json_rows
+from schema import CategoryRuleReq, RuleOut
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 
@@ -17,9 +20,10 @@ def get_rule_or_404(db: Session, rule_id: int, user_id: int) -> CategoryRule:
     return rule
 
 
-@router.get("/")
-def list_rules(user=Depends(get_current_user_or_apikey), db=Depends(get_db_session)):
-    return db.query(CategoryRule).filter_by(user_id=user.id).all()
+@router.get("/", dependencies=[Depends(data_etag())], response_model=list[RuleOut], response_class=ORJSONResponse)
+def list_rules(response: Response, user=Depends(get_current_user_or_apikey), db=Depends(get_db_session)):
+    columns = [getattr(CategoryRule, name) for name in RuleOut.model_fields]
+    return json_rows(db.execute(select(*columns).where(CategoryRule.user_id == user.id)).all(), response)
 
 
 @router.post("/", status_code=201)
@@ -33,6 +37,7 @@ def add_rule(rule: CategoryRuleReq, user=Depends(get_current_user_or_apikey), db
     )
     db.add(node)
     db.commit()
+    invalidate_rules(user.id)
     db.refresh(node)
     return node
 
@@ -45,6 +50,7 @@ def update_rule(rule_id: int, req: CategoryRuleReq, user=Depends(get_current_use
     rule.category_id = req.category_id
     rule.category_limit = req.category_limit
     db.commit()
+    invalidate_rules(user.id)
     db.refresh(rule)
     return rule
 
@@ -54,4 +60,5 @@ def delete_rule(rule_id: int, user=Depends(get_current_user_or_apikey), db=Depen
     rule = get_rule_or_404(db, rule_id, user.id)
     db.delete(rule)
     db.commit()
+    invalidate_rules(user.id)
     return {"status": f"Rule {rule_id} deleted"}
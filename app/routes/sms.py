@@ -1,41 +1,66 @@
-from fastapi import APIRouter, Depends
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import insert
 
-from app.classify import classify_merchant
 from app.deps import get_current_user_or_apikey
 from app.db import SessionLocal
 from app.models.Invoice import Invoice
-from schema import InvoiceReq
+from app.services.ingest_queue import ASYNC_INGEST, QueueFull, ingest_queue
+from app.services.sms import extract_amount, find_duplicates, ingest_sms_async
+from schema import InvoiceBatchReq, InvoiceReq
 
 router = APIRouter(prefix="/sms", tags=["sms"])
 
 
-def extract_amount(sms: str) -> dict:
-    """Parse K,V SMS lines into an invoice dict. Failed extractions are kept too."""
-    data = {"raw_invoice": sms, "amount": None, "merchant": None,
-            "category_id": None, "extraction_status": "failed"}
+@router.post("/")
+async def receive_sms(req: InvoiceReq, response: Response, current_user=Depends(get_current_user_or_apikey)):
+    if ASYNC_INGEST:
+        try:
+            message_id = ingest_queue.put(req.message, current_user.id, req.sender)
+        except QueueFull as exc:
+            raise HTTPException(503, str(exc), headers={"Retry-After": "1"})
+        response.status_code = 202
+        return {"status": "queued", "message_id": message_id}
+    data = await ingest_sms_async(req.message, current_user.id, req.sender)
+    if "duplicate_of" in data:  # a retry of an SMS we already have
+        return {"status": "duplicate", "extraction_status": data["extraction_status"], "data": data}
+    return {"status": "SMS processed", "extraction_status": data["extraction_status"], "data": data}
+
 
-    kv = {}
-    for line in sms.splitlines():
-        if ":" in line:
-            key, value = line.split(":", 1)
-            kv[key.strip()] = value.strip()
+@router.post("/batch")
+def receive_sms_batch(req: InvoiceBatchReq, current_user=Depends(get_current_user_or_apikey)):
+    """Ingest many SMS in one transaction; results come back in input order. Resends are skipped."""
+    rows, results = [], []
+    now = datetime.utcnow()
+    for msg in req.messages:
+        data = extract_amount(msg.message, current_user.id, sender=msg.sender)
+        ts = msg.timestamp  # replayed SMS keep their original time, stored as naive UTC
+        if ts is not None and ts.tzinfo:
+            ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+        rows.append({"user_id": current_user.id, **data, "created_at": ts or now})
+        results.append({k: data[k] for k in ("extraction_status", "amount", "merchant", "category_id")})
 
+    db = SessionLocal()
     try:
-        if "مبلغ" in kv and "لدى" in kv:
-            data["amount"] = float(kv["مبلغ"].replace("SAR", "").strip())
-            data["merchant"] = kv["لدى"]
-            data["extraction_status"] = "success"
-            data["category_id"] = classify_merchant(data["merchant"])
-    except ValueError:
-        print(f"Error converting amount in SMS: {sms}")
-    return data
+        dups = find_duplicates(db, current_user.id, rows,
+                               dated=[i for i, msg in enumerate(req.messages) if msg.timestamp])
+        fresh = [row for i, row in enumerate(rows) if i not in dups]
+        if fresh:
+            db.execute(insert(Invoice), fresh)
+        db.commit()
+    finally:
+        db.close()
+    for i, original in dups.items():
+        results[i]["duplicate_of"] = original  # None: repeats an earlier message of this batch
+    return {"status": "SMS batch processed", "count": len(results), "inserted": len(fresh),
+            "duplicates": len(dups), "results": results}
 
 
-@router.post("/")
-async def receive_sms(req: InvoiceReq, current_user=Depends(get_current_user_or_apikey)):
-    data = extract_amount(req.message)
-    db = SessionLocal()
-    db.add(Invoice(user_id=current_user.id, **data))
-    db.commit()
-    db.close()
-    return {"status": "SMS processed", "extraction_status": data["extraction_status"], "data": data}
+@router.get("/status/{message_id}")
+def queued_sms_status(message_id: str, current_user=Depends(get_current_user_or_apikey)):
+    """What became of a message queued by POST /sms/ (SMS_ASYNC_INGEST=1): queued, stored, duplicate or failed."""
+    status = ingest_queue.status(message_id)
+    if status is None or status["user_id"] != current_user.id:
+        raise HTTPException(404, "Unknown or expired message id")
+    return {"message_id": message_id, **{k: v for k, v in status.items() if k != "user_id"}}
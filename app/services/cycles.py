@@ -0,0 +1,51 @@
+import json
+from datetime import datetime
+
+from sqlalchemy import text
+
+from app.models.CycleModel import Cycle
+from app.models.CycleSnapshot import CycleSnapshot
+from app.models.DataVersion import DataVersion
+
+
+def is_frozen(cycle: Cycle) -> bool:
+    """Closed and fully in the past: its payloads no longer move with the clock."""
+    return not cycle.is_active and cycle.end_date is not None and cycle.end_date <= datetime.now()
+
+
+def data_version(db, user_id: int) -> int:
+    return db.query(DataVersion.version).filter(DataVersion.user_id == user_id).scalar() or 0
+
+
+def store_snapshot(db, cycle: Cycle, kind: str, payload: dict, version: int) -> bool:
+    """Persist `payload` unless the user's data changed since `version` was read (it may be stale then)."""
+    stored = db.execute(text(
+        "INSERT OR REPLACE INTO cycle_snapshots (cycle_id, kind, user_id, payload, built_at) "
+        "SELECT :cycle_id, :kind, :user_id, :payload, :now "
+        "WHERE ifnull((SELECT version FROM data_versions WHERE user_id = :user_id), 0) = :version"
+    ), {"cycle_id": cycle.id, "kind": kind, "user_id": cycle.user_id, "now": datetime.utcnow(),
+        "payload": json.dumps(payload, ensure_ascii=False), "version": version}).rowcount
+    db.commit()
+    return bool(stored)
+
+
+def snapshot(db, cycle: Cycle, kind: str, build) -> dict:
+    """`build()` for open cycles; for frozen ones the stored payload, built and stored on first use."""
+    if not is_frozen(cycle):
+        return build()
+    row = db.get(CycleSnapshot, (cycle.id, kind))
+    if row is not None:
+        return json.loads(row.payload)
+    version = data_version(db, cycle.user_id)  # read before building: a write during build then fails the store
+    payload = build()
+    store_snapshot(db, cycle, kind, payload, version)
+    return payload
+
+
+def freeze(db, cycle: Cycle, builders: dict) -> None:
+    """Build and store every payload of a cycle that was just closed, so the first view is already O(1)."""
+    if not is_frozen(cycle):
+        return
+    version = data_version(db, cycle.user_id)
+    for kind, build in builders.items():
+        store_snapshot(db, cycle, kind, build(), version)
@@ -0,0 +1,69 @@
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import func
+
+from app.models.DailySpend import DailySpend
+from app.models.Invoice import Invoice
+
+
+def _edge_rows(db, user_id: int, start: datetime, end: datetime, day: date):
+    """Exact (day, category_id, total, count) for one boundary day of the range, from invoices."""
+    return db.query(
+        func.date(Invoice.created_at), Invoice.category_id, func.sum(Invoice.amount), func.count(Invoice.id)
+    ).filter(
+        Invoice.user_id == user_id,
+        Invoice.extraction_status == "success",
+        Invoice.created_at >= start,
+        Invoice.created_at <= end,
+        # loose index range around the day, then the exact day test
+        Invoice.created_at >= datetime.combine(day - timedelta(days=1), time()),
+        Invoice.created_at < datetime.combine(day + timedelta(days=2), time()),
+        func.date(Invoice.created_at) == str(day),
+    ).group_by(Invoice.category_id).all()
+
+
+def spend_by_day(db, user_id: int, start: datetime, end: datetime) -> list[tuple[str, int | None, float, int]]:
+    """(day, category_id, total, count) of successful invoices with start <= created_at <= end.
+
+    Whole days are read from the daily_spend rollup. The first and last day are
+    usually partial (cycles start/end mid-day), so those two come from invoices.
+    """
+    first, last = start.date(), end.date()
+    rows = [tuple(r) for r in _edge_rows(db, user_id, start, end, first)]
+    if last > first:
+        rows += [tuple(r) for r in _edge_rows(db, user_id, start, end, last)]
+    if last - first > timedelta(days=1):
+        rows += [
+            (str(r.day), r.category_id, r.total, r.count)
+            for r in db.query(DailySpend).filter(
+                DailySpend.user_id == user_id,
+                DailySpend.day > first,
+                DailySpend.day < last,
+            )
+        ]
+    return sorted(rows, key=lambda r: r[0])
+
+
+def spend_by_category(db, user_id: int, start: datetime, end: datetime) -> dict[int | None, tuple[float, int]]:
+    """{category_id: (total, count)} over the same range as spend_by_day, summed in SQL."""
+    first, last = start.date(), end.date()
+    rows = list(_edge_rows(db, user_id, start, end, first))
+    if last > first:
+        rows += _edge_rows(db, user_id, start, end, last)
+    if last - first > timedelta(days=1):
+        rows += [
+            (None, category_id, total, count)
+            for category_id, total, count in db.query(
+                DailySpend.category_id, func.sum(DailySpend.total), func.sum(DailySpend.count)
+            ).filter(
+                DailySpend.user_id == user_id,
+                DailySpend.day > first,
+                DailySpend.day < last,
+            ).group_by(DailySpend.category_id)
+        ]
+
+    totals: dict[int | None, tuple[float, int]] = {}
+    for _, category_id, total, count in rows:
+        t, c = totals.get(category_id, (0.0, 0))
+        totals[category_id] = (t + (total or 0), c + count)
+    return totals
@@ -0,0 +1,65 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from sqlalchemy import select
+
+from app.db import SessionLocal
+from app.models.Category import Category
+from app.models.Invoice import Invoice
+
+EXPORT_CHUNK = 1000  # rows per fetch and per yielded block
+
+COLUMNS = (Invoice.id, Invoice.created_at, Invoice.amount, Invoice.merchant, Invoice.category_id,
+           Category.name.label("category"), Invoice.extraction_status, Invoice.classification, Invoice.note)
+
+
+def export_query(user_id: int, start: datetime | None, end: datetime | None,
+                 include_failed: bool = False, include_raw: bool = False):
+    columns = (*COLUMNS, Invoice.raw_invoice) if include_raw else COLUMNS
+    stmt = select(*columns).outerjoin(Category, Category.id == Invoice.category_id).where(Invoice.user_id == user_id)
+    if start is not None:
+        stmt = stmt.where(Invoice.created_at >= start)
+    if end is not None:
+        stmt = stmt.where(Invoice.created_at <= end)
+    if not include_failed:
+        stmt = stmt.where(Invoice.extraction_status == "success")
+    return stmt.order_by(Invoice.created_at, Invoice.id)
+
+
+def _chunks(stmt):
+    """Row lists of EXPORT_CHUNK, fetched as the client reads: memory stays flat however long the range.
+
+    The session lives exactly as long as the stream, so a multi-year export reads one
+    consistent snapshot (WAL) without holding every row in memory.
+    """
+    db = SessionLocal()
+    try:
+        result = db.execute(stmt.execution_options(yield_per=EXPORT_CHUNK))
+        for rows in result.partitions():
+            yield rows
+    finally:
+        db.close()
+
+
+def _cell(value):
+    return value.isoformat(sep=" ") if isinstance(value, datetime) else value
+
+
+def stream_csv(stmt):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow([c.key for c in stmt.selected_columns])
+    yield "﻿" + buf.getvalue()  # BOM: Excel otherwise misreads the Arabic as Latin-1
+    for rows in _chunks(stmt):
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows([_cell(v) for v in row] for row in rows)
+        yield buf.getvalue()
+
+
+def stream_ndjson(stmt):
+    header = [c.key for c in stmt.selected_columns]
+    for rows in _chunks(stmt):
+        yield "".join(json.dumps(dict(zip(header, map(_cell, row))), ensure_ascii=False) + "\n" for row in rows)
@@ -0,0 +1,239 @@
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+from datetime import datetime, timezone
+from itertools import islice
+from typing import NamedTuple
+
+from sqlalchemy import insert
+
+from app.classify import load_matcher
+from app.db import SessionLocal
+from app.models.ImportJob import ImportJob
+from app.models.Invoice import Invoice
+from app.services.sms import extract_amount, find_duplicates
+
+IMPORT_CHUNK = 1000  # records per transaction; progress is committed with each chunk
+FORMATS = ("sms", "ndjson", "csv")
+
+# first ISO-looking date (and time) in an SMS body: "في: 2025-03-14 13:45"
+_SMS_DATE = re.compile(r"(\d{4}-\d{2}-\d{2})(?:[ T](\d{2}:\d{2}(?::\d{2})?))?")
+_CSV_TIME = ("timestamp", "date", "time", "created_at")
+_CSV_MERCHANT = ("merchant", "description", "details")
+
+
+def detect_format(filename: str) -> str:
+    ext = os.path.splitext(filename)[1].lower()
+    return {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}.get(ext, "sms")
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(1 << 20):
+            h.update(block)
+    return h.hexdigest()
+
+
+class Malformed(NamedTuple):
+    """Stands in for a record that could not be read; counted and skipped, not fatal to the job."""
+    error: str
+
+
+def _record(read, *args):
+    """read(*args) -> (message, timestamp), or Malformed if the record is bad (bad JSON, missing field, bad date)."""
+    try:
+        return read(*args)
+    except (ValueError, KeyError, TypeError, AttributeError) as exc:
+        return Malformed(f"{type(exc).__name__}: {exc}"[:1000])
+
+
+def _parse_time(value) -> datetime | None:
+    if not value:
+        return None
+    ts = datetime.fromisoformat(str(value).strip())
+    # naive UTC, like POST /sms/batch stores it; naive input is taken as already UTC
+    return ts.astimezone(timezone.utc).replace(tzinfo=None) if ts.tzinfo else ts
+
+
+def _sms_time(message: str) -> datetime | None:
+    m = _SMS_DATE.search(message)
+    if not m:
+        return None
+    try:
+        return _parse_time(f"{m.group(1)} {m.group(2) or '00:00'}")
+    except ValueError:
+        return None
+
+
+def _read_sms(fh):
+    """Raw SMS separated by blank lines (an SMS body itself spans several lines)."""
+    lines = []
+    for line in fh:
+        line = line.rstrip("\r\n")
+        if line.strip():
+            lines.append(line)
+        elif lines:
+            message = "\n".join(lines)
+            yield message, _sms_time(message)
+            lines = []
+    if lines:
+        message = "\n".join(lines)
+        yield message, _sms_time(message)
+
+
+def _ndjson_record(line: str):
+    item = json.loads(line)
+    if not isinstance(item["message"], str):
+        raise TypeError("message must be a string")
+    return item["message"], _parse_time(item.get("timestamp"))
+
+
+def _read_ndjson(fh):
+    """{"message": ..., "timestamp": ...} per line, the POST /sms/batch item shape."""
+    for line in fh:
+        if line.strip():
+            yield _record(_ndjson_record, line)
+
+
+def _csv_columns(fieldnames) -> tuple[dict, str | None, str | None]:
+    """({lowercased name: header}, time column, merchant column); ValueError if nothing to import."""
+    columns = {c.strip().lower(): c for c in fieldnames or ()}
+    time_col = next((columns[c] for c in _CSV_TIME if c in columns), None)
+    merchant_col = next((columns[c] for c in _CSV_MERCHANT if c in columns), None)
+    if "message" not in columns and not ("amount" in columns and merchant_col):
+        raise ValueError("CSV needs a 'message' column, or 'amount' plus 'merchant'/'description'")
+    return columns, time_col, merchant_col
+
+
+def _read_csv(fh):
+    """Either a `message` column of raw SMS, or a bank statement with amount + merchant/description.
+
+    Statement rows are rewritten into the SMS shape extract_amount parses, so both
+    paths go through the same extraction and classification.
+    """
+    reader = csv.DictReader(fh)
+    columns, time_col, merchant_col = _csv_columns(reader.fieldnames)
+
+    def record(row):  # a short row has None for its missing cells
+        ts = _parse_time(row.get(time_col)) if time_col else None
+        if "message" in columns:
+            if row[columns["message"]] is None:
+                raise ValueError("missing message cell")
+            return row[columns["message"]], ts
+        return f"مبلغ: {row[columns['amount']].strip()} SAR\nلدى: {row[merchant_col].strip()}", ts
+
+    for row in reader:
+        yield _record(record, row)
+
+
+READERS = {"sms": _read_sms, "ndjson": _read_ndjson, "csv": _read_csv}
+
+
+def read_records(fh, fmt: str):
+    """Stream (message, timestamp or None) records from a text file handle; Malformed for unreadable ones."""
+    return READERS[fmt](fh)
+
+
+def _chunks(records, size: int):
+    while chunk := list(islice(records, size)):
+        yield chunk
+
+
+def _mark_failed(job_id: int, error: str) -> None:
+    db = SessionLocal()
+    try:
+        db.query(ImportJob).filter_by(id=job_id).update({"status": "failed", "error": error})
+        db.commit()
+    finally:
+        db.close()
+
+
+def run_import(job_id: int, progress=None) -> ImportJob:
+    """Run (or resume) an import job to completion. Returns the finished job, detached.
+
+    Rules are loaded once, so the whole file is classified against one snapshot.
+    Each chunk's invoices and the job's counters commit together: after a crash,
+    rerunning skips exactly the records already stored. Malformed records are
+    counted and skipped rather than failing the job, which would otherwise stop
+    at the same record on every resume. `progress(job)` is called after every chunk.
+    """
+    db = SessionLocal()
+    try:
+        job = db.get(ImportJob, job_id)
+        job.status, job.error = "running", None
+        db.commit()
+        matcher = load_matcher(db, job.user_id)
+        try:
+            with open(job.path, "rb") as raw:
+                fh = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+                records = islice(read_records(fh, job.format), job.records_done, None)
+                for chunk in _chunks(records, IMPORT_CHUNK):
+                    now = datetime.utcnow()  # undated records: what the server default would give
+                    bad = [(i, r) for i, r in enumerate(chunk) if isinstance(r, Malformed)]
+                    if bad and job.malformed_error is None:
+                        i, record = bad[0]
+                        job.malformed_error = f"record {job.records_done + i + 1}: {record.error}"
+                    readable = [r for r in chunk if not isinstance(r, Malformed)]
+                    # every row carries the same keys, so the chunk goes out as one executemany
+                    rows = [{"user_id": job.user_id, **extract_amount(message, job.user_id, matcher),
+                             "created_at": ts or now} for message, ts in readable]
+                    dups = find_duplicates(db, job.user_id, rows,  # overlapping statements, re-sent exports
+                                           dated=[i for i, (_, ts) in enumerate(readable) if ts])
+                    fresh = [row for i, row in enumerate(rows) if i not in dups]
+                    if fresh:
+                        db.execute(insert(Invoice.__table__), fresh)  # Core: one executemany, no ORM per-row grouping
+                    ok = sum(r["extraction_status"] == "success" for r in fresh)
+                    job.records_done += len(chunk)
+                    job.malformed += len(bad)
+                    job.inserted += ok
+                    job.extraction_failed += len(fresh) - ok
+                    job.duplicates += len(dups)
+                    job.bytes_read = raw.tell()  # read-ahead position: good enough for a percentage
+                    db.commit()
+                    if progress:
+                        progress(job)
+        except BaseException as exc:  # Ctrl-C too: the job shows as failed, not forever running
+            # an interrupted executemany can leave this connection holding the write
+            # lock; give it back before recording the failure on a fresh one
+            db.close()
+            _mark_failed(job_id, f"{type(exc).__name__}: {exc}"[:1000])
+            raise
+        job.status, job.bytes_read = "done", job.size
+        db.commit()
+        db.refresh(job)
+        db.expunge(job)
+        return job
+    finally:
+        db.close()
+
+
+def create_job(db, user_id: int, path: str, filename: str, fmt: str | None = None) -> tuple[ImportJob, bool]:
+    """(job, created). The same file for the same user reuses its earlier job, so it resumes or is a no-op."""
+    digest = file_sha256(path)
+    job = db.query(ImportJob).filter_by(user_id=user_id, sha256=digest).order_by(ImportJob.id.desc()).first()
+    if job is not None:
+        return job, False
+    fmt = fmt or detect_format(filename)
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {FORMATS}, got {fmt!r}")
+    if fmt == "csv":  # reject a wrong header now rather than from the background run
+        with open(path, encoding="utf-8-sig", newline="") as fh:
+            _csv_columns(next(csv.reader(fh), None))
+    job = ImportJob(user_id=user_id, filename=filename, path=path, sha256=digest, format=fmt,
+                    size=os.path.getsize(path))
+    db.add(job)
+    db.commit()
+    return job, True
+
+
+def job_dict(job: ImportJob) -> dict:
+    return {"id": job.id, "filename": job.filename, "format": job.format, "status": job.status,
+            "records_done": job.records_done, "inserted": job.inserted,
+            "extraction_failed": job.extraction_failed, "duplicates": job.duplicates,
+            "malformed": job.malformed, "malformed_error": job.malformed_error,
+            "progress": round(job.bytes_read / job.size, 4) if job.size else 1.0,
+            "error": job.error, "created_at": job.created_at, "updated_at": job.updated_at}
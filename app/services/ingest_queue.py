@@ -0,0 +1,179 @@
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from app.cache import TTLCache
+from app.db import SessionLocal
+from app.models.Invoice import Invoice
+from app.services.sms import extract_amount, find_duplicates
+
+log = logging.getLogger(__name__)
+
+# SMS_ASYNC_INGEST=1: POST /sms/ only queues the message (202 + message id) and one
+# worker thread stores queued messages in group commits of up to GROUP_SIZE
+# messages, or whatever arrived within GROUP_WAIT_MS of the first one.
+ASYNC_INGEST = os.environ.get("SMS_ASYNC_INGEST", "0") == "1"
+QUEUE_SIZE = int(os.environ.get("SMS_QUEUE_SIZE", "10000"))
+GROUP_SIZE = int(os.environ.get("SMS_GROUP_COMMIT_SIZE", "200"))
+GROUP_WAIT_MS = float(os.environ.get("SMS_GROUP_COMMIT_MS", "20"))
+# how long GET /sms/status/{id} remembers a message; 0 turns status lookups off (always 404)
+STATUS_TTL = float(os.environ.get("SMS_STATUS_TTL", "3600"))
+
+
+class QueueFull(Exception):
+    """The ingest queue is at SMS_QUEUE_SIZE; the client should retry later."""
+
+
+class IngestQueue:
+    """Bounded in-process SMS queue drained by one writer thread in group commits."""
+
+    def __init__(self, maxsize: int = QUEUE_SIZE, group_size: int = GROUP_SIZE, group_wait_ms: float = GROUP_WAIT_MS):
+        self.group_size = group_size
+        self.group_wait = group_wait_ms / 1000
+        self._queue: queue.Queue = queue.Queue(maxsize)
+        # message id -> status dict; room for a full queue plus recently finished messages
+        self.statuses = TTLCache(max(4 * maxsize, 1024), STATUS_TTL)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.enqueued = self.rejected = self.stored = self.duplicates = self.failed = self.commits = 0
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sms-group-commit", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Stop taking new work once the queue is empty; waits up to `timeout` s for the drain."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                log.warning("sms ingest queue: %d message(s) not stored at shutdown", self._queue.qsize())
+            self._thread = None
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def capacity(self) -> int:
+        return self._queue.maxsize
+
+    def put(self, message: str, user_id: int, sender: str | None = None, timestamp: datetime | None = None) -> str:
+        """Queue one SMS; returns its message id. Raises QueueFull instead of blocking the caller."""
+        if self._stop.is_set():
+            raise QueueFull("ingest queue is shutting down")
+        if self._thread is None:
+            self.start()  # first use without the app's lifespan (scripts, tests)
+        message_id = uuid.uuid4().hex
+        received = timestamp or datetime.utcnow()  # the SMS's time is when we got it, not when it's stored
+        self.statuses.set(message_id, {"status": "queued", "user_id": user_id})
+        try:
+            self._queue.put_nowait((message_id, message, user_id, sender, received))
+        except queue.Full:
+            self.statuses.invalidate(lambda key, _: key == message_id)
+            self.rejected += 1
+            raise QueueFull(f"ingest queue is full ({self.capacity} messages)")
+        self.enqueued += 1
+        return message_id
+
+    def status(self, message_id: str) -> dict | None:
+        return self.statuses.get(message_id)
+
+    def _next_group(self) -> list[tuple]:
+        """Block for the first message, then take more until group_size or group_wait has passed."""
+        try:
+            group = [self._queue.get(timeout=0.25)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.group_wait
+        while len(group) < self.group_size:
+            remaining = deadline - time.monotonic()
+            try:
+                group.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return group
+
+    def _run(self) -> None:
+        # on stop, keep going until the queue is drained: accepted messages are never dropped
+        while not (self._stop.is_set() and self._queue.empty()):
+            group = self._next_group()
+            if not group:
+                continue
+            self._store_or_split(group)
+
+    def _store_or_split(self, group: list[tuple]) -> None:
+        """_store the group; if its commit fails, retry each message alone so one bad row fails only itself."""
+        try:
+            self._store(group)
+            return
+        except Exception as exc:
+            if len(group) == 1:
+                log.exception("sms ingest queue: message %s failed", group[0][0])
+                self.failed += 1
+                message_id, _, user_id, _, _ = group[0]
+                self.statuses.set(message_id, {"status": "failed", "user_id": user_id, "error": str(exc)[:300]})
+                return
+            log.warning("sms ingest queue: group of %d failed (%s), storing one by one", len(group), exc)
+        for item in group:
+            self._store_or_split([item])
+
+    def _store(self, group: list[tuple]) -> None:
+        """Parse + classify the group, drop resends, insert the rest in one transaction (one fsync)."""
+        rows_by_user: dict[int, list[tuple[str, dict]]] = {}
+        for message_id, message, user_id, sender, received in group:
+            data = extract_amount(message, user_id, sender=sender)
+            rows_by_user.setdefault(user_id, []).append(
+                (message_id, {"user_id": user_id, **data, "created_at": received}))
+
+        results: dict[str, dict] = {}
+        db = SessionLocal()
+        try:
+            for user_id, items in rows_by_user.items():
+                rows = [row for _, row in items]
+                dups = find_duplicates(db, user_id, rows)
+                fresh = [(message_id, row) for i, (message_id, row) in enumerate(items) if i not in dups]
+                for i, original in dups.items():
+                    results[items[i][0]] = {"status": "duplicate", "user_id": user_id, "duplicate_of": original}
+                if fresh:
+                    ids = db.scalars(insert(Invoice.__table__).returning(Invoice.id, sort_by_parameter_order=True),
+                                     [row for _, row in fresh]).all()
+                    for (message_id, row), invoice_id in zip(fresh, ids):
+                        results[message_id] = {"status": "stored", "user_id": user_id, "invoice_id": invoice_id,
+                                               "extraction_status": row["extraction_status"]}
+            db.commit()
+        finally:
+            db.close()
+        self.commits += 1
+        for message_id, status in results.items():
+            self.statuses.set(message_id, status)
+            if status["status"] == "duplicate":
+                self.duplicates += 1
+            else:
+                self.stored += 1
+
+    def samples(self):
+        """Prometheus families for app.metrics' collectors."""
+        return [
+            ("sms_queue_depth", "gauge", "SMS waiting for the group-commit writer.", [({}, self.depth)]),
+            ("sms_queue_capacity", "gauge", "SMS_QUEUE_SIZE.", [({}, self.capacity)]),
+            ("sms_queue_enqueued_total", "counter", "SMS accepted into the queue.", [({}, self.enqueued)]),
+            ("sms_queue_rejected_total", "counter", "SMS refused with 503 because the queue was full.",
+             [({}, self.rejected)]),
+            ("sms_queue_processed_total", "counter", "Queued SMS by outcome.",
+             [({"outcome": "stored"}, self.stored), ({"outcome": "duplicate"}, self.duplicates),
+              ({"outcome": "failed"}, self.failed)]),
+            ("sms_queue_commits_total", "counter", "Group commits; processed / commits is the mean group size.",
+             [({}, self.commits)]),
+        ]
+
+
+ingest_queue = IngestQueue()
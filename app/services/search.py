@@ -0,0 +1,72 @@
+import re
+
+from sqlalchemy import bindparam, false, func, literal_column, select
+
+from app.models.Invoice import Invoice
+from app.models.InvoiceSearch import ARABIC_FOLD, invoice_fts
+
+_FOLD = str.maketrans({src: dst for src, dst in ARABIC_FOLD})
+_TOKEN = re.compile(r"\w+")
+
+# a search matching at most this many invoices (all users) is resolved to ids up front
+FTS_DRIVE_MAX = 2000
+
+# bm25 column weights, in InvoiceSearch.COLUMNS order: a merchant hit outranks a note, a note the raw SMS
+WEIGHTS = (10.0, 4.0, 1.0)
+
+
+def fts_query(term: str | None, columns: tuple[str, ...] | None = None) -> str | None:
+    """User text -> FTS5 MATCH expression: every word must appear, each as a prefix.
+
+    Words are quoted, so FTS operators typed by the user are matched literally.
+    None when there is nothing searchable in `term`.
+    """
+    words = _TOKEN.findall((term or "").translate(_FOLD))
+    if not words:
+        return None
+    expr = " ".join(f'"{w}"*' for w in words)
+    return f"{{{' '.join(columns)}}} : ({expr})" if columns else expr
+
+
+def matching_ids(query: str, user_id: int | None = None):
+    """Subquery of invoice ids matching an fts_query() expression (one user's, if given), for Invoice.id.in_()."""
+    stmt = select(invoice_fts.c.rowid).where(invoice_fts.c.invoice_fts.match(query))
+    if user_id is not None:
+        stmt = stmt.join(Invoice, Invoice.id == invoice_fts.c.rowid).where(Invoice.user_id == user_id)
+    return stmt
+
+
+def search_filter(db, term: str | None, columns: tuple[str, ...] | None = None, user_id: int | None = None):
+    """(clause, few) restricting invoices to those matching `term`, or None if `term` is blank.
+
+    A term with no searchable words ("!!!") matches nothing, not everything.
+
+    SQLite can't estimate how selective a MATCH is. For a rare term, ORDER BY created_at
+    would still walk the user's whole created_at index, probing membership row by row.
+    So fetch up to FTS_DRIVE_MAX of `user_id`'s ids first (other users' hits on a common
+    merchant must not fill the cap). If that is all of them, `few` is True and the clause
+    is a plain id list: keep SQLite off the user index and look them up by key. The ids
+    are inlined as literals, so the list is not bound by SQLite's variable limit.
+    Otherwise matches are dense, and the index walk hits LIMIT quickly.
+    """
+    if not (term or "").strip():
+        return None
+    query = fts_query(term, columns)
+    if not query:
+        return false(), True
+    ids = [i for (i,) in db.execute(matching_ids(query, user_id).limit(FTS_DRIVE_MAX + 1))]
+    if len(ids) <= FTS_DRIVE_MAX:
+        return Invoice.id.in_(bindparam("fts_ids", ids, expanding=True, literal_execute=True)), True
+    return Invoice.id.in_(matching_ids(query)), False
+
+
+def ranked_search(query: str, user_id: int, columns):
+    """select(*columns, score) over one user's invoices matching `query`, best first."""
+    score = func.bm25(literal_column("invoice_fts"), *WEIGHTS).label("score")
+    return (
+        select(*columns, score)
+        .select_from(invoice_fts)
+        .join(Invoice, Invoice.id == invoice_fts.c.rowid)
+        .where(invoice_fts.c.invoice_fts.match(query), Invoice.user_id == user_id)
+        .order_by(score, Invoice.id.desc())
+    )
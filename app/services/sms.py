@@ -0,0 +1,122 @@
+import asyncio
+import contextvars
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, exists, insert, literal, select
+
+from app.classify import KeywordMatcher, classify_merchant
+from app.db import SessionLocal
+from app.models.Invoice import Invoice
+from app.sms_parser import parse_sms
+
+# SQLite takes one writer at a time, so a few threads are enough to keep the
+# event loop free without piling up connections waiting on the write lock.
+INGEST_WORKERS = int(os.environ.get("SMS_INGEST_WORKERS", "4"))
+ingest_executor = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="sms-ingest")
+
+# The same SMS text (whitespace-normalized) for the same user within this many seconds
+# of an earlier copy is a resend: reported as a duplicate, not stored. 0 disables.
+# Kept short: many bank formats carry no time, so two equal purchases on one day have
+# equal text, while Shortcut retries arrive seconds to minutes after the original.
+DEDUP_WINDOW = timedelta(seconds=float(os.environ.get("SMS_DEDUP_WINDOW", "300")))
+
+
+def content_hash(message: str) -> str:
+    """128-bit fingerprint of the SMS text with whitespace runs collapsed (re-wrapped copies match)."""
+    return hashlib.blake2b(" ".join(message.split()).encode(), digest_size=16).hexdigest()
+
+
+def extract_amount(sms: str, user_id: int, matcher: KeywordMatcher | None = None, sender: str | None = None) -> dict:
+    """Parse a bank SMS (app.sms_parser templates) into an invoice dict. Failed extractions are kept too.
+
+    Bulk callers pass one `matcher` (classify.load_matcher) so every record is
+    classified against the same rule snapshot.
+    """
+    data = {"raw_invoice": sms, "amount": None, "merchant": None,
+            "category_id": None, "extraction_status": "failed", "content_hash": content_hash(sms)}
+    parsed = parse_sms(sms, sender)
+    if parsed is not None:
+        data["amount"] = parsed.amount
+        data["merchant"] = parsed.merchant
+        data["extraction_status"] = "success"
+        data["category_id"] = (matcher.classify(parsed.merchant) if matcher is not None
+                               else classify_merchant(parsed.merchant, user_id))
+    return data
+
+
+def _same_message(user_id: int, digest: str, lo: datetime, hi: datetime):
+    return and_(Invoice.user_id == user_id, Invoice.content_hash == digest,
+                Invoice.created_at >= lo, Invoice.created_at <= hi)
+
+
+def find_duplicates(db, user_id: int, rows: list[dict], window: timedelta = DEDUP_WINDOW,
+                    dated=()) -> dict[int, int | None]:
+    """{row index: id of the invoice it repeats} for rows that are resends; not-yet-stored repeats map to None.
+
+    Rows need content_hash and created_at. `dated` holds the indexes of rows whose
+    created_at is the SMS's own time (replays, statements): those only repeat a copy
+    stored at that same time, not anything within the window. One indexed probe per
+    distinct hash, however many invoices the user has.
+    """
+    if not window or not rows:
+        return {}
+    times = [r["created_at"] for r in rows]
+    stored: dict[str, list[tuple[datetime, int]]] = {}
+    for chunk in range(0, len(rows), 500):  # stay under SQLite's bound-parameter limit
+        hashes = {r["content_hash"] for r in rows[chunk:chunk + 500]}
+        for invoice_id, digest, created in db.query(Invoice.id, Invoice.content_hash, Invoice.created_at).filter(
+            Invoice.user_id == user_id, Invoice.content_hash.in_(hashes),
+            Invoice.created_at >= min(times) - window, Invoice.created_at <= max(times) + window,
+        ):
+            stored.setdefault(digest, []).append((created.replace(tzinfo=None), invoice_id))
+
+    dated = set(dated)
+    dups, seen = {}, {}
+    for i, row in enumerate(rows):
+        at, digest = row["created_at"], row["content_hash"]
+        near = timedelta(0) if i in dated else window
+        hit = next((invoice_id for created, invoice_id in stored.get(digest, ()) if abs(created - at) <= near), 0)
+        if not hit and any(abs(t - at) <= near for t in seen.get(digest, ())):
+            hit = None  # repeats an earlier row of this same batch
+        if hit != 0:
+            dups[i] = hit
+        else:
+            seen.setdefault(digest, []).append(at)
+    return dups
+
+
+def ingest_sms(message: str, user_id: int, sender: str | None = None) -> dict:
+    """Parse, classify and store one SMS (blocking). Returns the extracted data.
+
+    A resend within DEDUP_WINDOW is not stored; `duplicate_of` then holds the
+    original invoice's id.
+    """
+    data = extract_amount(message, user_id, sender=sender)
+    row = {"user_id": user_id, **data, "created_at": datetime.utcnow()}
+    db = SessionLocal()
+    try:
+        if DEDUP_WINDOW:
+            # check and insert in one statement, so two concurrent retries can't both get in
+            at = row["created_at"]
+            same = _same_message(user_id, data["content_hash"], at - DEDUP_WINDOW, at + DEDUP_WINDOW)
+            columns = Invoice.__table__.c
+            source = select(*(literal(v, columns[k].type) for k, v in row.items())).where(~exists().where(same))
+            inserted = db.execute(insert(Invoice.__table__).from_select(list(row), source)).rowcount
+            if not inserted:
+                data["duplicate_of"] = db.query(Invoice.id).filter(same).order_by(Invoice.id).limit(1).scalar()
+        else:
+            db.execute(insert(Invoice.__table__), row)
+        db.commit()
+    finally:
+        db.close()
+    return data
+
+
+async def ingest_sms_async(message: str, user_id: int, sender: str | None = None) -> dict:
+    """ingest_sms on the ingest executor, so the event loop never waits on SQLite."""
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()  # keeps the request's metrics context in the worker thread
+    return await loop.run_in_executor(ingest_executor, ctx.run, ingest_sms, message, user_id, sender)
@@ -0,0 +1,172 @@
+import re
+from typing import NamedTuple
+
+# Arabic-Indic digits and separators -> ASCII, so "١٬٢٣٤٫٥٠" parses like "1,234.50"
+_DIGITS = str.maketrans("٠١٢٣٤٥٦٧٨٩٫٬", "0123456789.,")
+_CURRENCY = r"SAR|SR|USD|EUR|AED|GBP|ر\.?\s?س\.?|ريال"
+_NUMBER = r"\d[\d,]*(?:\.\d+)?"
+_AMOUNT = re.compile(_NUMBER)
+_DECIMAL_COMMA = re.compile(r",\d{1,2}$")
+# the currency may sit on either side of the number: "SAR 12.50", "12.50 ر.س"
+CURRENCIES = (("SAR", "SAR"), ("ر.س", "SAR"), ("ر س", "SAR"), ("ريال", "SAR"), ("SR", "SAR"),
+              ("USD", "USD"), ("EUR", "EUR"), ("AED", "AED"), ("GBP", "GBP"))
+
+
+class ParsedSms(NamedTuple):
+    amount: float
+    merchant: str
+    currency: str | None
+    template: str
+
+
+def to_number(raw: str) -> float:
+    """"1,234.50" -> 1234.5. A last comma followed by only 1-2 digits is a decimal comma: "12,50" -> 12.5."""
+    if "." not in raw and _DECIMAL_COMMA.search(raw):
+        whole, _, fraction = raw.rpartition(",")
+        raw = f"{whole}.{fraction}"
+    return float(raw.replace(",", ""))
+
+
+def parse_amount(text: str) -> tuple[float, str | None] | None:
+    """(amount, currency) from the first number in `text`, or None."""
+    text = text.translate(_DIGITS)
+    m = _AMOUNT.search(text)
+    if not m:
+        return None
+    upper = text.upper()
+    currency = next((code for token, code in CURRENCIES if token in upper), None)
+    return to_number(m.group()), currency
+
+
+class Template:
+    """One bank's SMS layout, matched either by a regex or by line labels.
+
+    `pattern` needs named groups `amount` and `merchant` (the amount group may
+    include the currency). Without a pattern, lines are read as `label: value` and
+    the first label found in `amount_keys` / `merchant_keys` wins. `markers` are
+    substrings that route a message to this template, `senders` the SMS sender ids.
+    """
+
+    def __init__(self, name: str, markers=(), senders=(), pattern: str | None = None,
+                 amount_keys=(), merchant_keys=()):
+        self.name = name
+        self.markers = tuple(markers)
+        self.senders = tuple(s.lower() for s in senders)
+        self.pattern = re.compile(pattern, re.IGNORECASE | re.MULTILINE) if pattern else None
+        self.amount_keys = frozenset(amount_keys)
+        self.merchant_keys = frozenset(merchant_keys)
+
+    def parse(self, text: str) -> ParsedSms | None:
+        if self.pattern is not None:
+            m = self.pattern.search(text)
+            if not m:
+                return None
+            raw_amount, merchant = m.group("amount"), m.group("merchant")
+        else:
+            raw_amount = merchant = None
+            for line in text.replace("：", ":").splitlines():
+                key, sep, value = line.partition(":")
+                if not sep:
+                    continue
+                key = key.strip()
+                if raw_amount is None and key in self.amount_keys:
+                    raw_amount = value
+                elif merchant is None and key in self.merchant_keys:
+                    merchant = value
+            if raw_amount is None or merchant is None:
+                return None
+        merchant = merchant.strip().rstrip(".،,")
+        amount = parse_amount(raw_amount)
+        if not merchant or amount is None:
+            return None
+        return ParsedSms(amount[0], merchant, amount[1], self.name)
+
+
+# Not spend: OTPs, incoming transfers, refunds, declines. Looked for in everything but the
+# parsed merchant ("Hotpot House" is a purchase), Latin ones as whole words only.
+REJECT_MARKERS = ("رمز التحقق", "كلمة المرور لمرة واحدة", "OTP", "واردة", "إيداع", "استرداد", "مرفوضة",
+                  "incoming", "credited", "deposit", "refund", "declined")
+
+TEMPLATES = [
+    # "مبلغ: 25.00 SAR / لدى: X": the format the app was built around (mada POS / online)
+    Template("ar_kv", markers=("لدى", "مبلغ"), senders=("alrajhibank", "al rajhi"),
+             amount_keys=("مبلغ", "المبلغ", "بمبلغ", "مبلغ العملية"), merchant_keys=("لدى", "لدي")),
+    # SNB / AlAhli: "من: STARBUCKS" + "مبلغ: SAR 25.00"
+    Template("ar_kv_from", markers=("شراء", "من:"), senders=("snb-alahli", "alahli"),
+             amount_keys=("مبلغ", "المبلغ", "بمبلغ", "بـ"), merchant_keys=("من", "المتجر", "التاجر")),
+    # Riyad / SAB / ANB English: "Amount: SAR 52.00" + "At: Panda"
+    Template("en_kv", markers=("Amount", "Purchase", "POS"), senders=("riyadbank", "sab", "anb"),
+             amount_keys=("Amount", "Amt", "Purchase Amount", "Transaction Amount"),
+             merchant_keys=("At", "Merchant", "Merchant Name", "Location", "From")),
+    # Alinma / one-liners: "Purchase of SAR 120.50 at JARIR BOOKSTORE with card ..."
+    Template("en_inline", markers=("Purchase", " at "), senders=("alinma", "stcpay"),
+             pattern=rf"(?:purchase|payment|spent|paid)\D{{0,20}}?(?P<amount>(?:(?:{_CURRENCY})\s*)?{_NUMBER}"
+                     rf"(?:\s*(?:{_CURRENCY}))?)\s+(?:at|@|to)\s+(?P<merchant>.+?)"
+                     r"(?=\s+(?:with|using|by|on|via)\b|\.(?:\s|$)|$)"),
+    # "تم خصم 35.00 ر.س من بطاقتك لدى هنقرستيشن" / "شراء بمبلغ 35 ريال من X"
+    Template("ar_inline", markers=("خصم", "بمبلغ", "شراء"), senders=("stc pay", "urpay"),
+             pattern=rf"(?:خصم|بمبلغ|شراء)\s*(?:مبلغ)?\s*(?P<amount>(?:(?:{_CURRENCY})\s*)?{_NUMBER}"
+                     rf"(?:\s*(?:{_CURRENCY}))?).*?\s(?:لدى|لدي|في|من)\s+(?!بطاقت|حساب)"
+                     r"(?P<merchant>[^\n،,]+?)(?=\s+(?:بتاريخ|في\s+\d|عبر|بطاقة)|\.(?:\s|$)|[،,]|$)"),
+]
+# tried when no routed template parses: any bank's amount label with any bank's merchant label
+FALLBACKS = [
+    Template("kv_any",
+             amount_keys={k for t in TEMPLATES for k in t.amount_keys},
+             merchant_keys={k for t in TEMPLATES for k in t.merchant_keys}),
+]
+
+
+class Parser:
+    """Dispatches an SMS to the templates its sender or marker words point at, then the fallbacks."""
+
+    def __init__(self, templates, fallbacks=()):
+        self.templates = list(templates)
+        self.fallbacks = list(fallbacks)
+        self.by_sender: dict[str, list[Template]] = {}
+        by_marker: dict[str, list[int]] = {}
+        for pos, t in enumerate(self.templates):
+            for sender in t.senders:
+                self.by_sender.setdefault(sender, []).append(t)
+            for marker in t.markers:
+                by_marker.setdefault(marker.lower(), []).append(pos)
+        self.by_marker = by_marker
+        # matched against the lowercased text: IGNORECASE is several times slower on Arabic.
+        # Arabic markers stay substrings: prefixes like و / ب attach to the word.
+        self.reject = re.compile("|".join(
+            rf"\b{re.escape(m.lower())}\b" if m.isascii() else re.escape(m) for m in REJECT_MARKERS))
+
+    def candidates(self, text: str, sender: str | None = None) -> list[Template]:
+        """Sender's templates first, then every template with a marker in `text` (lowercased), in registry order."""
+        found = self.by_sender.get(sender.lower(), []) if sender else []
+        # plain substring tests: cheaper than a marker regex for a few dozen markers
+        positions = sorted({pos for marker, hits in self.by_marker.items() if marker in text for pos in hits})
+        return found + [self.templates[p] for p in positions if self.templates[p] not in found]
+
+    def parse(self, text: str, sender: str | None = None) -> ParsedSms | None:
+        low = text.lower()
+        parsed = next((p for t in self.candidates(low, sender) if (p := t.parse(text)) is not None), None)
+        if parsed is None:
+            parsed = next((p for t in self.fallbacks if (p := t.parse(text)) is not None), None)
+        if parsed is None or self.rejected(low, parsed.merchant):
+            return None
+        return parsed
+
+    def rejected(self, low: str, merchant: str) -> bool:
+        """A reject marker outside the merchant name (`low` is the lowercased SMS)."""
+        return self.reject.search(low.replace(merchant.lower(), " ")) is not None
+
+
+parser = Parser(TEMPLATES, FALLBACKS)
+
+
+def register(template: Template, first: bool = False) -> None:
+    """Add a bank template (first=True puts it ahead of the built-ins) and rebuild the dispatch."""
+    global parser
+    templates = [template, *parser.templates] if first else [*parser.templates, template]
+    parser = Parser(templates, parser.fallbacks)
+
+
+def parse_sms(text: str, sender: str | None = None) -> ParsedSms | None:
+    """amount / merchant / currency from a bank SMS, or None if no template matches."""
+    return parser.parse(text, sender)
@@ -0,0 +1,193 @@
+"""Latency percentiles for the hot API endpoints on a synthetic, production-sized DB.
+
+Run from the repo root:  python3 -m benchmarks.api [--users 20] [--invoices 5000] [--requests 200]
+    [--depth 2] [--years 2] [--seed 42] [--db PATH] [--out FILE] [--compare FILE]
+
+Seeds a throwaway DB with seed_db.generate(). With --db, an existing seeded DB
+is reused, so a big one only has to be built once. The FastAPI app is then driven
+in-process through TestClient, rotating over the seeded users, cycles and main
+categories. Each endpoint gets a short warm-up, then --requests timed calls.
+
+Results (p50/p90/p95/p99/max ms and req/s per endpoint, plus the run parameters)
+go to --out, default benchmarks/results/api-<timestamp>.json. --compare prints
+the p50/p95 change against an earlier results file.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+WARMUP = 10
+LOGIN_USERS = 5  # bcrypt makes logins slow; rotate over this many tokens
+
+
+def percentiles(samples: list[float]) -> dict:
+    ms = sorted(s * 1000 for s in samples)
+
+    def pct(p):
+        return round(ms[min(len(ms) - 1, int(len(ms) * p))], 2)
+    return {"n": len(ms), "mean_ms": round(statistics.fmean(ms), 2), "p50_ms": pct(0.50), "p90_ms": pct(0.90),
+            "p95_ms": pct(0.95), "p99_ms": pct(0.99), "max_ms": round(ms[-1], 2),
+            "req_per_s": round(len(ms) / (sum(ms) / 1000), 1)}
+
+
+def git_rev() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def fixtures(db_path: str, limit_users: int) -> list[dict]:
+    """Per user: id, username, cycle ids and main-category ids to aim requests at."""
+    con = sqlite3.connect(db_path)
+    users = con.execute("SELECT id, username FROM users ORDER BY id LIMIT ?", (limit_users,)).fetchall()
+    out = []
+    for uid, name in users:
+        cycles = [r[0] for r in con.execute("SELECT id FROM budget_cycles WHERE user_id = ?", (uid,))]
+        mains = [r[0] for r in con.execute("SELECT id FROM categories WHERE user_id = ? AND level = 1", (uid,))]
+        out.append({"id": uid, "username": name, "cycles": cycles, "mains": mains})
+    con.close()
+    return out
+
+
+def run(args) -> dict:
+    # app.db reads SQLITE_PATH at import time
+    from fastapi.testclient import TestClient
+
+    import seed_db
+    from app.main import app
+
+    if not args.db_existing:
+        t0 = time.perf_counter()
+        print(f"seeding {args.users} user(s) x {args.invoices} invoices into {args.db}")
+        seed_db.generate(args.users, args.invoices, args.depth, args.years, args.seed)
+        con = sqlite3.connect(args.db)
+        con.execute("ANALYZE")  # as seed_db.py / migrate_indexes.py leave a real DB
+        con.close()
+        print(f"seeded in {time.perf_counter() - t0:.1f}s")
+
+    rng = random.Random(args.seed)
+    client = TestClient(app)
+    users = fixtures(args.db, LOGIN_USERS)
+    for u in users:
+        r = client.post("/auth/login", json={"username": u["username"], "password": seed_db.PASSWORD})
+        r.raise_for_status()
+        u["headers"] = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    pick = seed_db.merchant_picker(rng)
+
+    # name -> () -> (method, url, kwargs)
+    def sms():
+        u = rng.choice(users)
+        return "POST", "/sms/", {"headers": u["headers"], "json": {"message": seed_db.make_sms(rng, pick, datetime.now())}}
+
+    def invoices():
+        return "GET", "/invoices/", {"headers": rng.choice(users)["headers"], "params": {"limit": 100}}
+
+    def analysis():
+        u = rng.choice(users)
+        return "GET", f"/cycles/{rng.choice(u['cycles'])}/analysis", {"headers": u["headers"]}
+
+    def analytics():
+        u = rng.choice(users)
+        params = {"cycle_id": rng.choice(u["cycles"]), "group_by": rng.choice(["bucket", "day", "merchant"])}
+        return "GET", "/analytics/", {"headers": u["headers"], "params": params}
+
+    def breakdown():
+        u = rng.choice(users)
+        return "GET", f"/categories/{rng.choice(u['mains'])}/breakdown", {"headers": u["headers"]}
+
+    endpoints = {"POST /sms/": sms, "GET /invoices/": invoices, "GET /cycles/{id}/analysis": analysis,
+                 "GET /analytics/": analytics, "GET /categories/{id}/breakdown": breakdown}
+
+    results = {}
+    for name, make in endpoints.items():
+        samples = []
+        for i in range(WARMUP + args.requests):
+            method, url, kwargs = make()
+            t0 = time.perf_counter()
+            r = client.request(method, url, **kwargs)
+            elapsed = time.perf_counter() - t0
+            r.raise_for_status()
+            if i >= WARMUP:
+                samples.append(elapsed)
+        results[name] = percentiles(samples)
+        s = results[name]
+        print(f"{name:32} p50 {s['p50_ms']:8.2f}  p95 {s['p95_ms']:8.2f}  p99 {s['p99_ms']:8.2f}  "
+              f"max {s['max_ms']:8.2f} ms  {s['req_per_s']:8.1f} req/s")
+
+    con = sqlite3.connect(args.db)
+    invoice_count = con.execute("SELECT COUNT(*) FROM invoices").fetchone()[0]
+    con.close()
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_rev": git_rev(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "sqlite_profile": os.environ.get("SQLITE_PROFILE", "wal"),
+            "db": args.db if args.db_existing else None,
+            "users": args.users, "invoices_per_user": args.invoices, "invoice_rows": invoice_count,
+            "depth": args.depth, "years": args.years, "seed": args.seed, "requests": args.requests,
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, previous_path: str) -> None:
+    with open(previous_path) as f:
+        previous = json.load(f)
+    print(f"\nvs {previous_path} ({previous['meta'].get('git_rev')}, {previous['meta'].get('timestamp')})")
+    for name, now in current["results"].items():
+        before = previous["results"].get(name)
+        if not before:
+            continue
+        deltas = [f"{k[:3]} {before[k]:8.2f} -> {now[k]:8.2f} ({(now[k] - before[k]) / before[k] * 100:+6.1f}%)"
+                  for k in ("p50_ms", "p95_ms") if before[k]]
+        print(f"{name:32} " + "   ".join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--invoices", type=int, default=5000, help="per user")
+    parser.add_argument("--depth", type=int, default=2, help="category levels under Expense")
+    parser.add_argument("--years", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--requests", type=int, default=200, help="timed calls per endpoint")
+    parser.add_argument("--db", help="reuse this seeded DB instead of generating one")
+    parser.add_argument("--out", help="results file (default benchmarks/results/api-<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier results file to diff against")
+    args = parser.parse_args()
+
+    args.db_existing = bool(args.db)
+    tmp = None
+    if not args.db:
+        tmp = tempfile.TemporaryDirectory()
+        args.db = os.path.join(tmp.name, "bench.db")
+    os.environ["SQLITE_PATH"] = args.db
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark-only-secret-key-0123456789abcdef")
+
+    result = run(args)
+    out = args.out or os.path.join(RESULTS_DIR, f"api-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"results: {out}")
+    if args.compare:
+        compare(result, args.compare)
+    if tmp:
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
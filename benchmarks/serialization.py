@@ -0,0 +1,98 @@
+"""Time to fetch and encode a large invoice list: ORM + jsonable_encoder vs. response models vs. orjson rows.
+
+Run from the repo root:  python3 -m benchmarks.serialization [--rows 10000] [--repeat 7] [--seed 42]
+
+Seeds a throwaway DB with one user and --rows invoices, then builds the same
+--rows-long GET /invoices/ body several ways. Each way is timed as fetch (SQL +
+row objects) and encode (Python objects -> JSON bytes), best of --repeat:
+
+  orm + jsonable_encoder   the old route: ORM objects through FastAPI's generic encoder
+  orm + response_model     ORM objects validated into list[InvoiceOut], dumped by pydantic
+  rows + orjson            the current route: projected columns, dicts, ORJSONResponse
+  rows + orjson (raw)      same with fields=...,raw_invoice
+
+Finally GET /invoices/?limit=--rows is timed end to end through TestClient.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark-only-secret-key-0123456789abcdef")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+import seed_db  # noqa: E402
+from app.db import SessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.Invoice import Invoice  # noqa: E402
+from app.responses import INVOICE_FIELDS, invoice_columns, json_rows  # noqa: E402
+from schema import InvoiceOut  # noqa: E402
+
+
+def best(fn, repeat: int) -> tuple[float, object]:
+    times, result = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    seed_db.generate(1, args.rows, 2, 1, args.seed)
+    db = SessionLocal()
+    user_id = db.execute(select(Invoice.user_id).limit(1)).scalar()
+    newest = Invoice.created_at.desc()
+    adapter = TypeAdapter(list[InvoiceOut])
+
+    def orm():
+        return db.query(Invoice).filter(Invoice.user_id == user_id).order_by(newest).limit(args.rows).all()
+
+    def rows(fields=None):
+        return lambda: db.execute(select(*invoice_columns(fields)).where(Invoice.user_id == user_id)
+                                  .order_by(newest).limit(args.rows)).all()
+
+    ways = [
+        ("orm + jsonable_encoder", orm, lambda objs: JSONResponse(jsonable_encoder(objs)).body),
+        ("orm + response_model", orm,
+         lambda objs: adapter.dump_json(adapter.validate_python(objs, from_attributes=True))),
+        ("rows + orjson", rows(), lambda r: json_rows(r).body),
+        ("rows + orjson (raw)", rows(",".join(INVOICE_FIELDS)), lambda r: json_rows(r).body),
+    ]
+    print(f"{args.rows} invoices, best of {args.repeat}")
+    print(f"{'':26} {'fetch ms':>9} {'encode ms':>10} {'total ms':>9} {'bytes':>10}")
+    for name, fetch, encode in ways:
+        fetch_s, objs = best(fetch, args.repeat)
+        encode_s, body = best(lambda: encode(objs), args.repeat)
+        print(f"{name:26} {fetch_s * 1000:9.1f} {encode_s * 1000:10.1f} {(fetch_s + encode_s) * 1000:9.1f} "
+              f"{len(body):10d}")
+    db.close()
+
+    client = TestClient(app)
+    token = client.post("/auth/login", json={"username": "testuser", "password": seed_db.PASSWORD}).json()
+    headers = {"Authorization": f"Bearer {token['access_token']}"}
+    samples = []
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        r = client.get("/invoices/", headers=headers, params={"limit": args.rows})
+        samples.append(time.perf_counter() - t0)
+        r.raise_for_status()
+    print(f"GET /invoices/?limit={args.rows}: median {statistics.median(samples) * 1000:.1f} ms, "
+          f"{len(r.json())} rows, {len(r.content)} bytes")
+
+
+if __name__ == "__main__":
+    main()
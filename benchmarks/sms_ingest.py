@@ -0,0 +1,112 @@
+"""Concurrent POST /sms/ throughput: blocking, offloaded and queued (group commit) ingestion.
+
+Run from the repo root:  python3 -m benchmarks.sms_ingest [--requests 2000] [--concurrency 32]
+    (SQLITE_PROFILE=durable to make every commit an fsync)
+
+Drives the real app in-process (httpx ASGITransport, one event loop) against a
+throwaway DB. "blocking" mounts a copy of the old handler: async def calling
+ingest_sms() inline. "offloaded" is the real /sms/ route with SMS_ASYNC_INGEST off.
+"queued" mounts the SMS_ASYNC_INGEST=1 path: a 202 from the in-process queue, then
+group commits. Its req/s counts until the queue has drained, so it is stored
+throughput, not just accepted. While the load runs, a probe hits a no-op async route
+every 5 ms. Its latency shows how long the event loop was stuck behind SQLite.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark-only-secret-key-0123456789abcdef")
+
+import httpx  # noqa: E402
+
+from app.deps import get_current_user_or_apikey  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.ingest_queue import ingest_queue  # noqa: E402
+from app.services.sms import ingest_sms  # noqa: E402
+from fastapi import Depends  # noqa: E402
+from schema import InvoiceReq  # noqa: E402
+
+SMS = "شراء عبر نقاط البيع\nمبلغ: {amount:.2f} SAR\nلدى: Starbucks {i}\nبطاقة: *1234"
+
+
+@app.post("/bench/sms-blocking")
+async def receive_sms_blocking(req: InvoiceReq, current_user=Depends(get_current_user_or_apikey)):
+    data = ingest_sms(req.message, current_user.id)
+    return {"status": "SMS processed", "extraction_status": data["extraction_status"], "data": data}
+
+
+@app.post("/bench/sms-queued", status_code=202)
+async def receive_sms_queued(req: InvoiceReq, current_user=Depends(get_current_user_or_apikey)):
+    return {"status": "queued", "message_id": ingest_queue.put(req.message, current_user.id, req.sender)}
+
+
+@app.get("/bench/ping")
+async def ping():
+    return {}
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000 if values else 0.0
+
+
+async def run(client, path: str, headers: dict, n: int, concurrency: int, offset: int = 0) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    done = asyncio.Event()
+    probes: list[float] = []
+
+    async def one(i):
+        async with sem:
+            r = await client.post(path, json={"message": SMS.format(amount=10 + i % 50, i=offset + i)}, headers=headers)
+            r.raise_for_status()
+
+    async def probe():
+        while not done.is_set():
+            t0 = time.perf_counter()
+            await client.get("/bench/ping")
+            probes.append(time.perf_counter() - t0)
+            await asyncio.sleep(0.005)
+
+    prober = asyncio.create_task(probe())
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    while ingest_queue.depth or ingest_queue.stored + ingest_queue.duplicates + ingest_queue.failed < ingest_queue.enqueued:
+        await asyncio.sleep(0.001)  # queued mode: wait until everything accepted is stored
+    elapsed = time.perf_counter() - t0
+    done.set()
+    await prober
+    return {"path": path, "req_per_s": round(n / elapsed, 1),
+            "loop_p50_ms": round(statistics.median(probes) * 1000, 2) if probes else 0.0,
+            "loop_p99_ms": round(pct(probes, 0.99), 2), "probes": len(probes)}
+
+
+async def main_async(args):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post("/auth/register", json={"username": "bench", "password": "bench"})
+        token = (await client.post("/auth/login", json={"username": "bench", "password": "bench"})).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        print(f"{args.requests} requests, concurrency {args.concurrency}")
+        print(f"{'mode':10} {'req/s':>8} {'loop p50 ms':>12} {'loop p99 ms':>12} {'probes':>7}")
+        modes = (("blocking", "/bench/sms-blocking"), ("offloaded", "/sms/"), ("queued", "/bench/sms-queued"))
+        for k, (mode, path) in enumerate(modes):
+            # distinct texts per mode, or later modes would only measure resend detection
+            r = await run(client, path, headers, args.requests, args.concurrency, offset=k * args.requests)
+            print(f"{mode:10} {r['req_per_s']:>8} {r['loop_p50_ms']:>12} {r['loop_p99_ms']:>12} {r['probes']:>7}")
+        print(f"queued: {ingest_queue.commits} group commits for {ingest_queue.enqueued} messages")
+        ingest_queue.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
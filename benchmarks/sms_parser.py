@@ -0,0 +1,103 @@
+"""SMS parsing speed and hit rate: the template engine vs. the old `مبلغ:`/`لدى:` splitter.
+
+Run from the repo root:  python3 -m benchmarks.sms_parser [--messages 50000] [--seed 42]
+
+Builds a seeded corpus from CORPUS: one sample layout per bank format we receive,
+plus non-spend messages (OTPs, transfers, refunds) that must not parse. Each
+sample is filled with random merchants and amounts. It is parsed by
+app.sms_parser.parse_sms and by a copy of the old line splitter. For each
+format the script prints messages/s, how many parsed, and how many gave the
+expected amount and merchant.
+"""
+import argparse
+import random
+import time
+from collections import defaultdict
+
+from app.sms_parser import parse_sms
+
+MERCHANTS = ["Starbucks", "البيك", "Panda", "HungerStation", "مكتبة جرير", "Amazon.sa", "Uber", "صيدلية النهدي"]
+
+# (format, expected to parse, template); {a} amount, {m} merchant, {c} card, {d} date
+CORPUS = [
+    ("ar_kv", True, "شراء عبر نقاط البيع\nبطاقة: *{c}\nمبلغ: {a} SAR\nلدى: {m}\nفي: {d}"),
+    ("ar_kv", True, "شراء إنترنت\nبطاقة مدى: {c}\nمبلغ: SAR {a}\nلدى: {m}\nفي: {d}"),
+    ("ar_kv_riyal", True, "شراء\nالمبلغ: {a} ريال\nلدى: {m}\nالبطاقة: *{c}"),
+    ("ar_kv_from", True, "شراء\nبطاقة: مدى *{c}\nمن: {m}\nمبلغ: SAR {a}\nفي: {d}"),
+    ("en_kv", True, "POS Purchase\nCard: *{c}\nAmount: SAR {a}\nAt: {m}\nDate: {d}"),
+    ("en_kv_merchant", True, "Purchase Transaction\nMerchant: {m}\nTransaction Amount: {a} SAR\nCard ending {c}"),
+    ("en_inline", True, "Purchase of SAR {a} at {m} with card ending {c} on {d}."),
+    ("ar_inline", True, "تم خصم {a} ر.س من بطاقتك *{c} لدى {m} بتاريخ {d}"),
+    ("ar_indic_digits", True, "شراء عبر نقاط البيع\nمبلغ: {ai} ر.س\nلدى: {m}"),
+    ("otp", False, "رمز التحقق: {c}\nلا تشاركه مع أحد"),
+    ("incoming", False, "حوالة واردة\nالمبلغ: {a} SAR\nمن: {m}"),
+    ("refund", False, "Refund of SAR {a} from {m} credited to card *{c}"),
+    ("notice", False, "نود تذكيركم بسداد مستحقاتكم قبل نهاية الأسبوع لتجنب إيقاف الخدمة."),
+]
+_INDIC = str.maketrans("0123456789.", "٠١٢٣٤٥٦٧٨٩٫")
+
+
+def legacy_parse(sms: str):
+    """The pre-template extractor: K:V lines, only `مبلغ` + `لدى`, SAR suffix."""
+    kv = {}
+    for line in sms.splitlines():
+        if ":" in line:
+            key, value = line.split(":", 1)
+            kv[key.strip()] = value.strip()
+    if "مبلغ" in kv and "لدى" in kv:
+        try:
+            return float(kv["مبلغ"].replace("SAR", "").strip()), kv["لدى"]
+        except ValueError:
+            return None
+    return None
+
+
+def engine_parse(sms: str):
+    parsed = parse_sms(sms)
+    return None if parsed is None else (parsed.amount, parsed.merchant)
+
+
+def build_corpus(n: int, seed: int) -> list[tuple[str, bool, float, str, str]]:
+    """[(format, should parse, amount, merchant, text)]"""
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        fmt, ok, template = rng.choice(CORPUS)
+        amount = round(rng.uniform(5, 2500), 2)
+        merchant = rng.choice(MERCHANTS)
+        text = template.format(a=f"{amount:.2f}", ai=f"{amount:.2f}".translate(_INDIC), m=merchant,
+                               c=f"{rng.randrange(10000):04d}", d=f"2025-{rng.randint(1, 12):02d}-14 13:45")
+        out.append((fmt, ok, amount, merchant, text))
+    return out
+
+
+def run(name: str, parse, corpus) -> None:
+    stats = defaultdict(lambda: [0, 0, 0])  # format -> [messages, parsed, correct]
+    t0 = time.perf_counter()
+    results = [parse(text) for *_, text in corpus]
+    elapsed = time.perf_counter() - t0
+    for (fmt, ok, amount, merchant, _), got in zip(corpus, results):
+        s = stats[fmt]
+        s[0] += 1
+        s[1] += got is not None
+        s[2] += (got == (amount, merchant)) if ok else (got is None)
+    correct = sum(s[2] for s in stats.values())
+    print(f"\n{name}: {len(corpus) / elapsed:,.0f} msg/s ({elapsed / len(corpus) * 1e6:.1f} us/msg), "
+          f"{correct}/{len(corpus)} correct ({correct / len(corpus):.1%})")
+    for fmt, (n, parsed, good) in sorted(stats.items()):
+        print(f"  {fmt:18} {n:7}  parsed {parsed:7}  correct {good / n:7.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.messages, args.seed)
+    run("legacy splitter", legacy_parse, corpus)
+    run("template engine", engine_parse, corpus)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Concurrency benchmark for the SQLite engine profiles in app.db.
+
+Run from the repo root:  python3 -m benchmarks.sqlite_profiles [--seconds 10] [--writers 4] [--readers 4]
+
+For each profile, a throwaway DB is seeded with --rows invoices. Writer threads
+then ingest one invoice per transaction (like POST /sms/), while reader threads
+run the cycle-window SUM the dashboard issues. The script prints sustained
+ingests/s and reads/s, plus how many operations failed with "database is locked".
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.db import PROFILES, Base, engine_settings, make_engine
+from app.models import Invoice, User
+
+
+def seed(Session, rows: int) -> int:
+    db = Session()
+    user = User(username="bench", password_hash="x")
+    db.add(user)
+    db.commit()
+    now = datetime.now()
+    db.execute(Invoice.__table__.insert(), [
+        {"user_id": user.id, "raw_invoice": "مبلغ: 10 SAR\nلدى: Bench", "amount": random.uniform(1, 300),
+         "merchant": f"m{i % 200}", "extraction_status": "success",
+         "created_at": now - timedelta(minutes=random.randrange(365 * 1440))}
+        for i in range(rows)
+    ])
+    db.commit()
+    uid = user.id
+    db.close()
+    return uid
+
+
+def run_profile(name: str, args) -> dict:
+    _, pool = engine_settings({"SQLITE_PROFILE": name})
+    pragmas = PROFILES[name]
+    with tempfile.TemporaryDirectory() as tmp:
+        eng = make_engine(os.path.join(tmp, "bench.db"), pragmas, pool)
+        Base.metadata.create_all(eng)
+        Session = sessionmaker(bind=eng, autoflush=False, future=True)
+        uid = seed(Session, args.rows)
+
+        stop = threading.Event()
+        counts = {"ingests": 0, "reads": 0, "locked": 0}
+        lock = threading.Lock()
+
+        def bump(key):
+            with lock:
+                counts[key] += 1
+
+        def writer():
+            while not stop.is_set():
+                db = Session()
+                try:
+                    db.add(Invoice(user_id=uid, raw_invoice="مبلغ: 5 SAR\nلدى: Live", amount=5.0,
+                                   merchant="Live", extraction_status="success"))
+                    db.commit()
+                    bump("ingests")
+                except OperationalError:
+                    db.rollback()
+                    bump("locked")
+                finally:
+                    db.close()
+
+        def reader():
+            start = datetime.now() - timedelta(days=30)
+            while not stop.is_set():
+                db = Session()
+                try:
+                    db.query(func.sum(Invoice.amount), func.count(Invoice.id)).filter(
+                        Invoice.user_id == uid,
+                        Invoice.extraction_status == "success",
+                        Invoice.created_at >= start,
+                    ).one()
+                    bump("reads")
+                except OperationalError:
+                    bump("locked")
+                finally:
+                    db.close()
+
+        threads = [threading.Thread(target=writer) for _ in range(args.writers)]
+        threads += [threading.Thread(target=reader) for _ in range(args.readers)]
+        for t in threads:
+            t.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        eng.dispose()
+
+    return {
+        "profile": name,
+        "ingests_per_s": round(counts["ingests"] / args.seconds, 1),
+        "reads_per_s": round(counts["reads"] / args.seconds, 1),
+        "locked_errors": counts["locked"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=sorted(PROFILES), choices=sorted(PROFILES))
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=50000, help="invoices seeded before the run")
+    args = parser.parse_args()
+
+    print(f"{args.writers} writer(s), {args.readers} reader(s), {args.seconds:g}s per profile, {args.rows} seeded rows")
+    print(f"{'profile':10} {'ingests/s':>10} {'reads/s':>10} {'locked':>8}")
+    for name in args.profiles:
+        r = run_profile(name, args)
+        print(f"{r['profile']:10} {r['ingests_per_s']:>10} {r['reads_per_s']:>10} {r['locked_errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@
 import { useState, useEffect, useCallback } from 'react';
 import { Pencil, X, Save, FileText, Trash2, Search, SlidersHorizontal, ArrowDownLeft } from 'lucide-react';
 import { useLanguage } from '../lib/LanguageContext';
-import { updateInvoice, fetchCategories, deleteInvoice, fetchInvoices, getCurrentCycle, getCycleAnalysis, getCycleInvoices } from '../lib/api';
+import { updateInvoice, fetchCategories, deleteInvoice, fetchInvoicePage, getCurrentCycle, getCycleAnalysis, getCycleInvoices } from '../lib/api';
 import { flattenTree, shortPath, buildPathMap } from '../lib/categories';
 import CategorySelect from './CategorySelect';
 
@@ -21,6 +21,8 @@ export default function InvoiceList({ refreshTrigger, onUpdate, selectedCycleId
   const [maxAmount, setMaxAmount] = useState('');
   const [debouncedSearch, setDebouncedSearch] = useState('');
   const [cycleBudget, setCycleBudget] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     const timer = setTimeout(() => setDebouncedSearch(search), 300);
@@ -53,10 +55,18 @@ export default function InvoiceList({ refreshTrigger, onUpdate, selectedCycleId
     fetchBudget();
   }, [refreshTrigger, selectedCycleId]);
 
+  const currentFilters = () => ({
+    search: debouncedSearch || undefined,
+    category_id: filterCategory || undefined,
+    min_amount: minAmount || undefined,
+    max_amount: maxAmount || undefined,
+  });
+
   const loadInvoices = useCallback(async () => {
     setLoading(true);
     try {
       let data;
+      let cursor = null;
       if (selectedCycleId) {
         // Fetch all invoices for the selected cycle, then filter client-side
         data = await getCycleInvoices(selectedCycleId);
@@ -65,17 +75,16 @@ export default function InvoiceList({ refreshTrigger, onUpdate, selectedCycleId
         if (minAmount !== '') data = data.filter(inv => (inv.amount || 0) >= parseFloat(minAmount));
         if (maxAmount !== '') data = data.filter(inv => (inv.amount || 0) <= parseFloat(maxAmount));
       } else {
-        data = await fetchInvoices({
-          search: debouncedSearch || undefined,
-          category_id: filterCategory || undefined,
-          min_amount: minAmount || undefined,
-          max_amount: maxAmount || undefined,
-        });
+        const page = await fetchInvoicePage(currentFilters());
+        data = page.items;
+        cursor = page.next_cursor || null;
       }
       setInvoices(Array.isArray(data) ? data : []);
+      setNextCursor(cursor);
     } catch (err) {
       console.error(err);
       setInvoices([]);
+      setNextCursor(null);
     } finally {
       setLoading(false);
     }
@@ -85,6 +94,20 @@ export default function InvoiceList({ refreshTrigger, onUpdate, selectedCycleId
     loadInvoices();
   }, [loadInvoices]);
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await fetchInvoicePage({ ...currentFilters(), cursor: nextCursor });
+      setInvoices(prev => [...prev, ...(page.items || [])]);
+      setNextCursor(page.next_cursor || null);
+    } catch (err) {
+      console.error(err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const hasActiveFilters = debouncedSearch || filterCategory || minAmount || maxAmount;
 
   const clearFilters = () => {
@@ -360,6 +383,14 @@ export default function InvoiceList({ refreshTrigger, onUpdate, selectedCycleId
             );
           })}
 
+          {nextCursor && (
+            <div className="py-3 text-center">
+              <button onClick={loadMore} disabled={loadingMore} className="text-xs font-medium" style={{ color: 'var(--text-secondary)' }}>
+                {loadingMore ? (isRTL ? 'جارٍ التحميل…' : 'Loading…') : (isRTL ? 'عرض المزيد' : 'Load more')}
+              </button>
+            </div>
+          )}
+
           {/* Ledger footer — total */}
           <div className="ledger-row" style={{ borderTop: '1px solid var(--border-strong)', borderBottom: 'none', background: 'var(--base-subtle)' }}>
             <div />
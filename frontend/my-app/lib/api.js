@@ -58,6 +58,21 @@ export async function fetchInvoices({ search, category_id, min_amount, max_amoun
   return res.json();
 }
 
+// Newest first, one page at a time; pass the previous page's next_cursor to continue.
+export async function fetchInvoicePage({ search, category_id, min_amount, max_amount, cursor, limit } = {}) {
+  const params = new URLSearchParams();
+  if (search) params.set('search', search);
+  if (category_id) params.set('category_id', category_id);
+  if (min_amount !== undefined && min_amount !== '') params.set('min_amount', min_amount);
+  if (max_amount !== undefined && max_amount !== '') params.set('max_amount', max_amount);
+  if (cursor) params.set('cursor', cursor);
+  if (limit) params.set('limit', limit);
+  const res = await fetch(`${API_URL}/invoices/page?${params.toString()}`, {
+    headers: { ...getAuthHeader() },
+  });
+  return res.json();
+}
+
 export async function postSMS(message) {
   const res = await fetch(`${API_URL}/sms/`, {
     method: 'POST',
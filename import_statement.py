@@ -0,0 +1,73 @@
+"""Bulk-import a bank statement or an SMS export for one user.
+
+Run from the repo root:  python3 import_statement.py FILE --user USERNAME|ID [--format sms|ndjson|csv]
+
+FILE is raw SMS separated by blank lines, NDJSON ({"message", "timestamp"} per
+line, like POST /sms/batch) or CSV (a `message` column, or `amount` plus
+`merchant`/`description`, with an optional `date`/`timestamp`). The format is
+guessed from the extension unless --format is given.
+
+Rules are loaded once and invoices are inserted IMPORT_CHUNK records per
+transaction. Interrupted? Run the same command again: the job for this user and
+file (matched by SHA-256) resumes after its last committed chunk. A file that
+was already imported is not imported twice.
+"""
+import os
+import sys
+import time
+
+from app.db import SessionLocal, init_db
+from app.models import User
+from app.services.importer import create_job, run_import
+
+
+def flag(name: str) -> str | None:
+    return sys.argv[sys.argv.index(name) + 1] if name in sys.argv else None
+
+
+def main():
+    user_arg, fmt = flag("--user"), flag("--format")
+    values = {user_arg, fmt}
+    args = [a for a in sys.argv[1:] if not a.startswith("--") and a not in values]
+    if len(args) != 1 or not user_arg:
+        sys.exit(__doc__)
+    path = os.path.abspath(args[0])
+
+    init_db()
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(
+            User.id == int(user_arg) if user_arg.isdigit() else User.username == user_arg
+        ).first()
+        if not user:
+            sys.exit(f"no such user: {user_arg}")
+        job, created = create_job(db, user.id, path, os.path.basename(path), fmt)
+        if job.status == "done":
+            print(f"already imported as job {job.id}: {job.inserted} invoices, {job.extraction_failed} unparsed")
+            return
+        if not created:
+            job.path = path  # the same bytes, wherever they live now
+            db.commit()
+            print(f"resuming job {job.id} after {job.records_done} records")
+        job_id, skipped = job.id, job.records_done
+    finally:
+        db.close()
+
+    t0 = time.perf_counter()
+
+    def progress(job):
+        rate = (job.records_done - skipped) / max(time.perf_counter() - t0, 1e-9)
+        print(f"\r  {job.bytes_read / job.size if job.size else 1:6.1%}  {job.records_done} records  "
+              f"{job.inserted} ok  {job.extraction_failed} unparsed  {job.duplicates} dup  {job.malformed} bad  "
+              f"{rate:,.0f}/s",
+              end="", flush=True)
+
+    job = run_import(job_id, progress)
+    print(f"\ndone in {time.perf_counter() - t0:.1f}s: {job.inserted} invoices, "
+          f"{job.extraction_failed} unparsed (kept as failed), {job.duplicates} already stored")
+    if job.malformed:
+        print(f"skipped {job.malformed} malformed record(s); first: {job.malformed_error}")
+
+
+if __name__ == "__main__":
+    main()
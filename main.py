@@ -11,6 +11,7 @@ from datetime import datetime, timedelta
 from schema import InvoiceReq, InvoiceData, CategoryRuleReq, UpdateInvoiceReq
 from user_session import router as auth_router
 from app.deps import get_current_user_or_apikey
+from app.sms_parser import parse_sms
 app = FastAPI()
 
 app.add_middleware(
@@ -28,9 +29,7 @@ init_db()
 
 def extract_amount(sms: str):
     # STORE EVERY DATA INVOICEDATA EVEN IT FAILED
-    # SMS messges already comes in K,V format so why not extract directly
-    invo_data= {}
-    
+    # bank formats are handled by the shared template engine (app/sms_parser.py)
     #Default state (Assumption: extraction failed)
     extracted_data = {
         "raw_invoice": sms,
@@ -38,29 +37,17 @@ def extract_amount(sms: str):
         "merchant": None,
         "extraction_status": "failed"
     }
-    
-    for line in sms.splitlines():
-            if ":" in line:
-                key,value  = line.split(":",1)
-                invo_data[key.strip()] = value.strip()
-                print(invo_data)
-    
-    try:
-        if "مبلغ" in invo_data and "لدى" in invo_data:
-            raw_amount = float(invo_data["مبلغ"].replace("SAR", "").strip())
-            merchant = invo_data["لدى"]
-            
-            extracted_data["amount"] = raw_amount
-            extracted_data["merchant"] = merchant
-            extracted_data["extraction_status"] = "success"
-            
-            classification, main_cat, sub_cat = classify_sms(merchant)
-            extracted_data['classification'] = classification
-            extracted_data['main_category'] = main_cat
-            extracted_data['sub_category'] = sub_cat
-            
-    except ValueError:
-        print(f"Error converting amount in SMS: {sms}")
+
+    parsed = parse_sms(sms)
+    if parsed is not None:
+        extracted_data["amount"] = parsed.amount
+        extracted_data["merchant"] = parsed.merchant
+        extracted_data["extraction_status"] = "success"
+
+        classification, main_cat, sub_cat = classify_sms(parsed.merchant)
+        extracted_data['classification'] = classification
+        extracted_data['main_category'] = main_cat
+        extracted_data['sub_category'] = sub_cat
     return InvoiceData(**extracted_data)
 
 
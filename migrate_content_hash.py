@@ -0,0 +1,56 @@
+"""Migration: add invoices.content_hash (SMS resend detection) and backfill it.
+
+Run from the repo root:  python3 migrate_content_hash.py
+
+Adds the column and its (user_id, content_hash, created_at) index if missing,
+then hashes every invoice that has no hash yet, BATCH rows per transaction.
+create_all() already builds both on fresh databases; this is for DBs created
+before deduplication existed. Existing duplicates are left alone: only new
+SMS are checked against them.
+
+Safe to re-run, and safe to interrupt: only rows still missing a hash are touched.
+"""
+import os
+import sqlite3
+import time
+
+from sqlalchemy.schema import CreateIndex
+
+from app.db import engine
+from app.models.Invoice import Invoice
+from app.services.sms import content_hash
+
+DB = os.environ.get("SQLITE_PATH", "invoices.db")  # honors the container's /data path
+BATCH = 5000
+
+
+def main():
+    con = sqlite3.connect(DB)
+    columns = {row[1] for row in con.execute("PRAGMA table_info(invoices)")}
+    if "content_hash" not in columns:
+        con.execute("ALTER TABLE invoices ADD COLUMN content_hash VARCHAR(32)")
+        print("added invoices.content_hash")
+    index = next(ix for ix in Invoice.__table__.indexes if ix.name == "ix_invoices_user_hash_created")
+    con.execute(str(CreateIndex(index, if_not_exists=True).compile(dialect=engine.dialect)))
+    con.commit()
+
+    t0, done, last_id = time.perf_counter(), 0, 0
+    while True:
+        rows = con.execute("SELECT id, raw_invoice FROM invoices WHERE id > ? AND content_hash IS NULL "
+                           "ORDER BY id LIMIT ?", (last_id, BATCH)).fetchall()
+        if not rows:
+            break
+        con.executemany("UPDATE invoices SET content_hash = ? WHERE id = ?",
+                        [(content_hash(raw), invoice_id) for invoice_id, raw in rows])
+        con.commit()
+        done += len(rows)
+        last_id = rows[-1][0]
+        print(f"\r  hashed {done} invoices", end="", flush=True)
+    print(f"\nbackfilled {done} invoice(s) in {time.perf_counter() - t0:.1f}s")
+    con.execute("ANALYZE invoices")
+    con.close()
+    print("done.")
+
+
+if __name__ == "__main__":
+    main()
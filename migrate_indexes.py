@@ -0,0 +1,147 @@
+"""Migration: create the hot-path indexes declared on Invoice / Category / Cycle.
+
+Run from the repo root:  python3 migrate_indexes.py
+Add --explain to print the query plan and timing of the cycle / timeline /
+analytics queries before and after the indexes are created.
+Add --bench N to do the same against a throwaway DB filled with N synthetic
+invoices (SQLITE_PATH is not touched).
+
+Safe to re-run: every index is CREATE INDEX IF NOT EXISTS. create_all() already
+builds these on fresh databases; this is for DBs created before they existed.
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from app.db import engine
+from app.models.Category import Category
+from app.models.CycleModel import Cycle
+from app.models.Invoice import Invoice
+
+DB = os.environ.get("SQLITE_PATH", "invoices.db")  # honors the container's /data path
+TABLES = (Invoice.__table__, Category.__table__, Cycle.__table__)
+
+# (label, sql) - raw equivalents of what the routes send; params are filled per DB
+HOT_QUERIES = [
+    ("cycle_invoices",
+     "SELECT * FROM invoices WHERE created_at >= :start AND created_at <= :end "
+     "AND extraction_status = 'success' AND user_id = :user"),
+    ("spending-timeline",
+     "SELECT date(created_at), sum(amount), count(id) FROM invoices "
+     "WHERE created_at >= :start AND created_at <= :end "
+     "AND extraction_status = 'success' AND user_id = :user GROUP BY date(created_at)"),
+    ("/analytics/ (rows)",
+     "SELECT category_id, amount, merchant, created_at FROM invoices "
+     "WHERE user_id = :user AND extraction_status = 'success' "
+     "AND created_at >= :start AND created_at <= :end"),
+    ("/analytics/ (categories)",
+     "SELECT * FROM categories WHERE user_id = :user"),
+    ("category subtree",
+     "WITH RECURSIVE t(id) AS (SELECT :cat UNION ALL "
+     "SELECT c.id FROM categories c JOIN t ON c.parent_id = t.id) SELECT id FROM t"),
+    ("category spent",
+     "SELECT sum(amount), count(id) FROM invoices WHERE category_id IN (SELECT id FROM categories "
+     "WHERE parent_id = :cat OR id = :cat) AND extraction_status = 'success' AND user_id = :user"),
+]
+
+
+def index_ddl() -> list[str]:
+    return [str(CreateIndex(ix, if_not_exists=True).compile(dialect=engine.dialect))
+            for table in TABLES for ix in sorted(table.indexes, key=lambda i: i.name)]
+
+
+def sample_params(con) -> dict:
+    """The busiest user, their latest 30 days (one cycle), and one of their parent categories."""
+    row = con.execute(
+        "SELECT user_id, datetime(MAX(created_at), '-30 days'), MAX(created_at) FROM invoices "
+        "GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1"
+    ).fetchone() or (0, "1970-01-01", "1970-01-01")
+    cat = con.execute(
+        "SELECT parent_id FROM categories WHERE user_id = ? AND parent_id IS NOT NULL LIMIT 1", (row[0],)
+    ).fetchone()
+    return {"user": row[0], "start": row[1], "end": row[2], "cat": cat[0] if cat else 0}
+
+
+def explain(con, title: str, repeat: int = 5) -> None:
+    params = sample_params(con)
+    print(f"--- {title}")
+    for label, sql in HOT_QUERIES:
+        plan = "; ".join(r[3] for r in con.execute("EXPLAIN QUERY PLAN " + sql, params))
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            con.execute(sql, params).fetchall()
+        ms = (time.perf_counter() - t0) / repeat * 1000
+        print(f"{label:26} {ms:9.2f} ms  {plan}")
+
+
+def create_indexes(con) -> None:
+    for ddl in index_ddl():
+        con.execute(ddl)
+    con.execute("ANALYZE")
+    con.commit()
+    print(f"ensured {len(index_ddl())} index(es), statistics refreshed")
+
+
+def build_bench_db(path: str, n: int) -> sqlite3.Connection:
+    """Bare tables (no indexes yet) + n invoices over 3 users and 2 years."""
+    con = sqlite3.connect(path)
+    for table in TABLES:
+        con.execute(str(CreateTable(table).compile(dialect=engine.dialect)))
+    rng = random.Random(42)
+    cats = []
+    for user in (1, 2, 3):
+        for main in range(8):
+            cur = con.execute("INSERT INTO categories (name, parent_id, level, user_id) VALUES (?, NULL, 1, ?)",
+                              (f"main{main}", user))
+            cats.append((user, cur.lastrowid))
+            for sub in range(5):
+                cur = con.execute("INSERT INTO categories (name, parent_id, level, user_id) VALUES (?, ?, 2, ?)",
+                                  (f"sub{sub}", cats[-1][1], user))
+                cats.append((user, cur.lastrowid))
+    by_user = {u: [c for cu, c in cats if cu == u] for u in (1, 2, 3)}
+    start = datetime.now() - timedelta(days=730)
+    rows = []
+    for _ in range(n):
+        user = rng.choice((1, 1, 2, 3))
+        ok = rng.random() < 0.95
+        rows.append((user, "raw sms " * 8, rng.uniform(5, 500) if ok else None,
+                     f"merchant{rng.randrange(300)}" if ok else None,
+                     "success" if ok else "failed", rng.choice(by_user[user]) if ok else None,
+                     (start + timedelta(minutes=rng.randrange(730 * 1440))).strftime("%Y-%m-%d %H:%M:%S")))
+    con.executemany(
+        "INSERT INTO invoices (user_id, raw_invoice, amount, merchant, extraction_status, category_id, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+    con.commit()
+    print(f"bench DB: {n} invoices, {len(cats)} categories at {path}")
+    return con
+
+
+def main():
+    if "--bench" in sys.argv:
+        n = int(sys.argv[sys.argv.index("--bench") + 1])
+        with tempfile.TemporaryDirectory() as tmp:
+            con = build_bench_db(os.path.join(tmp, "bench.db"), n)
+            explain(con, "before")
+            create_indexes(con)
+            explain(con, "after")
+            con.close()
+        return
+
+    con = sqlite3.connect(DB)
+    if "--explain" in sys.argv:
+        explain(con, "before")
+    create_indexes(con)
+    if "--explain" in sys.argv:
+        explain(con, "after")
+    con.close()
+    print("done.")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,9 +11,8 @@ class Base(DeclarativeBase):
 	pass
 
 
-DB_PATH = os.environ.get("SQLITE_PATH", "invoices.db")
-engine = create_engine(f"sqlite+pysqlite:///{DB_PATH}", echo=False, future=True)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+# same engine (and SQLITE_PROFILE pragmas) as the app package
+from app.db import DB_PATH, engine, SessionLocal
 
 class User(Base):
     __tablename__ = "users"
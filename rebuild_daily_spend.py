@@ -0,0 +1,34 @@
+"""Rebuild the daily_spend rollup from invoices.
+
+Run from the repo root:  python3 rebuild_daily_spend.py [--user ID]
+
+The rollup is kept current by triggers on invoices, and is backfilled
+automatically the first time the table is created. Run this if invoices were
+changed with the triggers missing (e.g. a DB restored from an old backup), or
+to check for drift: the row count is printed before and after.
+
+Safe to re-run: the rollup is recomputed from scratch in one transaction.
+"""
+import sys
+
+from sqlalchemy import text
+
+from app.db import engine, init_db
+from app.models.DailySpend import rebuild_daily_spend
+
+
+def main():
+    user_id = int(sys.argv[sys.argv.index("--user") + 1]) if "--user" in sys.argv else None
+
+    init_db()  # creates daily_spend + triggers if this DB predates them
+    with engine.begin() as con:
+        before = con.execute(text("SELECT COUNT(*), ROUND(SUM(total), 2) FROM daily_spend")).one()
+        rebuild_daily_spend(con, user_id)
+        after = con.execute(text("SELECT COUNT(*), ROUND(SUM(total), 2) FROM daily_spend")).one()
+    scope = f"user {user_id}" if user_id is not None else "all users"
+    print(f"rebuilt daily_spend for {scope}: {before[0]} rows / {before[1] or 0} -> {after[0]} rows / {after[1] or 0}")
+    print("done.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Check the cycle_spend counters against invoices and repair any drift.
+
+Run from the repo root:  python3 reconcile_cycle_spend.py [--user ID] [--check]
+
+The counters behind GET /categories/limits are kept current by triggers on
+invoices and budget_cycles, and rebuilt by the category move/delete routes.
+Writes that bypass those (raw SQL with the triggers missing, a DB restored from
+an old backup, category edits made by hand) can leave them off. This lists
+every (cycle, category) whose counter disagrees with a fresh aggregate, then
+recomputes the counters in one transaction. --check only reports, and exits 1
+if anything drifted, so it can run from cron or a health check.
+
+Safe to re-run.
+"""
+import sys
+
+from app.db import engine, init_db
+from app.models.CycleSpend import cycle_spend_drift, rebuild_cycle_spend
+
+
+def main():
+    user_id = int(sys.argv[sys.argv.index("--user") + 1]) if "--user" in sys.argv else None
+    check_only = "--check" in sys.argv
+
+    init_db()  # creates cycle_spend + triggers (and backfills) if this DB predates them
+    with engine.begin() as con:
+        drift = cycle_spend_drift(con, user_id)
+        for cycle_id, category_id, (have_total, have_count), (want_total, want_count) in drift:
+            print(f"  cycle {cycle_id} category {category_id if category_id is not None else '-'}: "
+                  f"{have_total:.2f} / {have_count} stored, {want_total:.2f} / {want_count} from invoices")
+        scope = f"user {user_id}" if user_id is not None else "all users"
+        print(f"{len(drift)} drifted counter(s) for {scope}")
+        if drift and not check_only:
+            rebuild_cycle_spend(con, user_id)
+            print(f"rebuilt; {len(cycle_spend_drift(con, user_id))} left")
+    if check_only and drift:
+        sys.exit(1)
+    print("done.")
+
+
+if __name__ == "__main__":
+    main()
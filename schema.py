@@ -5,6 +5,10 @@ import datetime
 class InvoiceReq(BaseModel):
     message: str = Field(..., description="The SMS message containing the invoice details")
     timestamp: Optional[datetime.datetime] = Field(None, description="The timestamp of when the SMS was received")
+    sender: Optional[str] = Field(None, description="SMS sender id (e.g. AlRajhiBank); picks the bank's template first")
+
+class InvoiceBatchReq(BaseModel):
+    messages: List[InvoiceReq] = Field(..., min_length=1, max_length=1000, description="SMS messages, processed in order")
 
 class UpdateInvoiceReq(BaseModel):
     classification: Optional[str] = None
@@ -22,6 +26,20 @@ class InvoiceData(BaseModel):
     extraction_status: str = Field(..., description="Status of the extraction process, e.g., 'success' or 'failed'")
 
 
+class InvoiceOut(BaseModel):
+    """An invoice in list responses. raw_invoice is left out unless asked for with fields=,
+    which can also narrow the rest (id is always sent)."""
+    id: int
+    amount: Optional[float] = None
+    merchant: Optional[str] = None
+    extraction_status: Optional[str] = None
+    classification: Optional[str] = None
+    category_id: Optional[int] = None
+    note: Optional[str] = None
+    created_at: Optional[datetime.datetime] = None
+    raw_invoice: Optional[str] = Field(None, description="The raw SMS message (fields=...,raw_invoice)")
+
+
 class CategoryCreateReq(BaseModel):
     name: str
     parent_id: Optional[int] = None
@@ -33,6 +51,13 @@ class CategoryRuleReq(BaseModel):
     classification: str = "Expense"
     category_limit: Optional[float] = None
 
+class RuleOut(BaseModel):
+    id: int
+    merchant_keywords: str
+    classification: str
+    category_id: Optional[int] = None
+    category_limit: Optional[float] = None
+
 class LoginRequest(BaseModel):
     username: str
     password: str
@@ -1,301 +1,226 @@
-import os
+"""Seed the DB with synthetic users, category trees, rules, cycles and invoices.
+
+Run from the repo root:  python3 seed_db.py
+    [--users 1] [--invoices 300] [--depth 2] [--years 1] [--seed 42] [--keep]
+
+The first user is testuser / testpassword, the rest testuser2, testuser3, ...
+Each gets an Expense tree --depth levels deep (main > sub > ...), one keyword
+rule per merchant brand, and monthly cycles that start on the 27th (payday)
+over the last --years years, the newest still active. Invoices are realistic
+bank SMS (a few formats, plus OTPs and notices that fail extraction). A
+Zipf-weighted mix of chain brands and one-off local shops is parsed by the
+real SMS extractor, so amounts, merchants and categories match live ingestion.
+
+Drops and recreates every table in SQLITE_PATH first; --keep appends instead.
+Same --seed, same data. benchmarks/api.py builds its DBs with generate().
+"""
+import random
 import sys
+import time
 from datetime import datetime, timedelta
-from models import init_db, SessionLocal, Invoice, CategoryRule, BudgetCycle, Base, engine, User
+
+import bcrypt
+from sqlalchemy import insert, text
+
+from app.db import Base, SessionLocal, engine, init_db
+from app.models import Category, Cycle, Invoice, Rule, User
+from app.services.sms import extract_amount
+
+PASSWORD = "testpassword"
+INSERT_CHUNK = 5000
+
+# main > sub: (amount range SAR, [(brand as it appears in SMS, rule keywords)])
+CATALOG = {
+    "Food & Drink": {
+        "Coffee": ((12, 45), [("Starbucks", "starbucks, ستاربكس"), ("Dunkin", "dunkin"),
+                              ("Barn's", "barn's, بارنز"), ("كافيه دوز", "دوز, dose")]),
+        "Restaurants": ((18, 220), [("البيك", "البيك, albaik"), ("Kudu", "kudu, كودو"),
+                                    ("هرفي", "هرفي, herfy"), ("McDonald's", "mcdonald"),
+                                    ("مطعم الرومانسية", "الرومانسية, romansiah")]),
+        "Delivery": ((25, 180), [("HungerStation", "hungerstation, هنقرستيشن"), ("جاهز", "جاهز, jahez"),
+                                 ("مرسول", "مرسول, mrsool")]),
+    },
+    "Groceries": {
+        "Supermarket": ((20, 900), [("بنده", "بنده, panda"), ("Tamimi Markets", "tamimi, التميمي"),
+                                    ("Danube", "danube, الدانوب"), ("العثيم", "العثيم, othaim"),
+                                    ("LuLu Hypermarket", "lulu, لولو"), ("Carrefour", "carrefour, كارفور")]),
+    },
+    "Transport": {
+        "Ride-hailing": ((14, 95), [("Uber", "uber, اوبر"), ("Careem", "careem, كريم"), ("Bolt", "bolt")]),
+        "Fuel": ((40, 160), [("محطة الدريس", "الدريس, aldrees"), ("Petromin", "petromin, بترومين"),
+                             ("SASCO", "sasco, ساسكو")]),
+    },
+    "Health": {
+        "Pharmacy": ((15, 450), [("صيدلية النهدي", "النهدي, nahdi"), ("صيدليات الدواء", "الدواء, dawaa")]),
+    },
+    "Shopping": {
+        "Apparel": ((80, 900), [("Zara", "zara, زارا"), ("H&M", "h&m"), ("Namshi", "namshi, نمشي")]),
+        "Electronics": ((60, 4500), [("مكتبة جرير", "جرير, jarir"), ("eXtra", "extra, اكسترا"),
+                                     ("Amazon.sa", "amazon, امازون")]),
+    },
+    "Entertainment": {
+        "Subscriptions": ((15, 65), [("Netflix", "netflix, نتفليكس"), ("Spotify", "spotify"),
+                                     ("شاهد", "شاهد, shahid"), ("Apple.com/bill", "apple")]),
+    },
+    "Bills": {
+        "Telecom": ((50, 400), [("STC Pay", "stc"), ("موبايلي", "موبايلي, mobily"), ("Zain", "zain, زين")]),
+        "Utilities": ((90, 700), [("شركة الكهرباء", "الكهرباء, sec"), ("المياه الوطنية", "المياه, nwc")]),
+    },
+}
+CITIES = ["الرياض", "جدة", "الدمام", "Riyadh", "Jeddah", "Khobar", "مكة", ""]
+LOCAL_SHOPS = ["بقالة", "مغسلة", "حلاق", "Mini Market", "كافتيريا", "Shop", "مخبز"]
+
+PURCHASE_SMS = [
+    "شراء عبر نقاط البيع\nبطاقة: *{card}\nمبلغ: {amount:.2f} SAR\nلدى: {merchant}\nفي: {when}",
+    "شراء إنترنت\nبطاقة مدى: {card}\nمبلغ: SAR {amount:.2f}\nلدى: {merchant}\nفي: {when}",
+    "عملية شراء من البنك الأهلي\nمبلغ: {amount:.2f} SAR\nلدى: {merchant}\nبطاقة: *{card}",
+]
+OTHER_SMS = [  # no مبلغ/لدى pair: extraction fails, the row is still stored
+    "رمز التحقق: {card}\nلا تشاركه مع أحد",
+    "حوالة واردة\nالمبلغ: {amount:.2f} SAR\nمن: {merchant}",
+    "نود تذكيركم بسداد مستحقاتكم قبل نهاية الأسبوع لتجنب إيقاف الخدمة.",
+]
+FAILED_RATE = 0.04
+LOCAL_RATE = 0.12  # share of spend at one-off shops no rule matches
+
+
+def flag(name: str, default: int) -> int:
+    return int(sys.argv[sys.argv.index(name) + 1]) if name in sys.argv else default
+
 
 def clear_db():
     print("Clearing existing database...")
-    # Drop all tables and recreate them to ensure a completely clean state
     Base.metadata.drop_all(bind=engine)
     init_db()
 
-def seed_data():
-    db = SessionLocal()
 
-    # 0. Create the seed user first so we can attach user_id to all rows
-    import bcrypt
-    hashed = bcrypt.hashpw("testpassword".encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
-    user = User(username="testuser", password_hash=hashed)
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    uid = user.id
+def build_tree(db, user_id: int, depth: int, rng: random.Random) -> dict[str, int]:
+    """Expense > main > sub > ... --depth levels; returns {sub name: category id rules should target}."""
+    root = Category(name="Expense", parent_id=None, level=0, user_id=user_id)
+    db.add(root)
+    db.flush()
+    targets = {}
+    for main_name, subs in CATALOG.items():
+        main = Category(name=main_name, parent_id=root.id, level=1, user_id=user_id,
+                        category_limit=rng.choice([None, 500.0, 1000.0, 2000.0]))
+        db.add(main)
+        db.flush()
+        if depth < 2:
+            targets.update({sub: main.id for sub in subs})
+            continue
+        for sub_name in subs:
+            node = Category(name=sub_name, parent_id=main.id, level=2, user_id=user_id,
+                            category_limit=rng.choice([None, None, 200.0, 400.0]))
+            db.add(node)
+            db.flush()
+            for level in range(3, depth + 1):  # deeper trees: a chain of refinements under each sub
+                node = Category(name=f"{sub_name} {level - 1}", parent_id=node.id, level=level, user_id=user_id)
+                db.add(node)
+                db.flush()
+            targets[sub_name] = node.id
+    return targets
+
+
+def build_cycles(db, user_id: int, start: datetime, now: datetime) -> None:
+    """Monthly cycles from the 27th on or before `start` up to now; the last one is active."""
+    begin = start.replace(day=27, hour=0, minute=0, second=0, microsecond=0)
+    if begin > start:
+        begin = (begin - timedelta(days=28)).replace(day=27)
+    while True:
+        nxt = (begin + timedelta(days=32)).replace(day=27)
+        active = nxt > now
+        db.add(Cycle(user_id=user_id, start_date=begin, end_date=None if active else nxt, is_active=active))
+        if active:
+            break
+        begin = nxt
+
 
-    # 1. Add Category Rules
-    rules = [
-        CategoryRule(
-            merchant_keywords="Starbucks, Dunkin, Caribou",
-            classification="Expense",
-            main_category="Food & Drink",
-            sub_category="Coffee",
-            category_limit=400.0,
-            user_id=uid
-        ),
-        CategoryRule(
-            merchant_keywords="Al Nahdi, Pharmacy, Dawaa",
-            classification="Expense",
-            main_category="Health",
-            sub_category="Pharmacy",
-            category_limit=600.0,
-            user_id=uid
-        ),
-        CategoryRule(
-            merchant_keywords="Uber, Careem, Bolt",
-            classification="Expense",
-            main_category="Transport",
-            sub_category="Ride-hailing",
-            category_limit=500.0,
-            user_id=uid
-        ),
-        CategoryRule(
-            merchant_keywords="Panda, Carrefour, Lulu, Grocery",
-            classification="Expense",
-            main_category="Groceries",
-            sub_category="Supermarket",
-            category_limit=1800.0,
-            user_id=uid
-        ),
-        CategoryRule(
-            merchant_keywords="Netflix, Spotify, Apple",
-            classification="Expense",
-            main_category="Entertainment",
-            sub_category="Subscriptions",
-            category_limit=200.0,
-            user_id=uid
-        ),
-        CategoryRule(
-            merchant_keywords="Zara, H&M, Namshi",
-            classification="Expense",
-            main_category="Shopping",
-            sub_category="Apparel",
-            category_limit=800.0,
-            user_id=uid
-        )
-    ]
-    
-    print("Adding default category rules...")
-    db.add_all(rules)
-    db.commit()
+def merchant_picker(rng: random.Random):
+    """-> pick() returning (merchant text, amount range). Brands get Zipf weights in a seeded random order."""
+    brands = [(brand, rng_range) for subs in CATALOG.values()
+              for rng_range, entries in subs.values() for brand, _ in entries]
+    rng.shuffle(brands)
+    weights = [1 / (rank + 1) for rank in range(len(brands))]
+    locals_ = [f"{rng.choice(LOCAL_SHOPS)} {n}" for n in range(200)]
 
-    # 2. Add Budget Cycles
-    now = datetime.now()
-    
-    # Past completed cycle (starts 45 days ago, ends 15 days ago)
-    past_start = now - timedelta(days=45)
-    past_end = now - timedelta(days=15)
-    
-    # Current active cycle (starts 15 days ago)
-    current_start = now - timedelta(days=15)
-    
-    past_cycle = BudgetCycle(
-        start_date=past_start,
-        end_date=past_end,
-        is_active=False,
-        user_id=uid
-    )
+    def pick():
+        if rng.random() < LOCAL_RATE:
+            return rng.choice(locals_), (5, 120)
+        brand, amount_range = rng.choices(brands, weights)[0]
+        city = rng.choice(CITIES)
+        return (f"{brand} {city}" if city else brand), amount_range
+    return pick
 
-    current_cycle = BudgetCycle(
-        start_date=current_start,
-        is_active=True,
-        user_id=uid
-    )
-    
-    print("Adding budget cycles...")
-    db.add(past_cycle)
-    db.add(current_cycle)
-    db.commit()
 
-    # 3. Add Invoices
-    # Helper to generate Arabic style bank SMS
-    def create_sms(merchant, amount):
-        return f"عملية شراء من البنك الأهلي\nمبلغ: {amount:.2f} SAR\nلدى: {merchant}\nبطاقة: *1234"
+def make_sms(rng: random.Random, pick, when: datetime) -> str:
+    merchant, (lo, hi) = pick()
+    amount = round(lo + (hi - lo) * rng.betavariate(1.5, 5), 2)  # mostly small tickets, long tail
+    fields = dict(card=f"{rng.randrange(10000):04d}", amount=amount, merchant=merchant,
+                  when=when.strftime("%Y-%m-%d %H:%M"))
+    templates = OTHER_SMS if rng.random() < FAILED_RATE else PURCHASE_SMS
+    return rng.choice(templates).format(**fields)
 
-    # Invoices for the past cycle (30 days to 15 days ago)
-    past_invoices = [
-        # Successful extractions matching category rules
-        {
-            "raw": create_sms("Starbucks", 24.50),
-            "amount": 24.50,
-            "merchant": "Starbucks",
-            "status": "success",
-            "classification": "Expense",
-            "main": "Food & Drink",
-            "sub": "Coffee",
-            "days_offset": 30
-        },
-        {
-            "raw": create_sms("Al Nahdi Pharmacy", 145.00),
-            "amount": 145.00,
-            "merchant": "Al Nahdi Pharmacy",
-            "status": "success",
-            "classification": "Expense",
-            "main": "Health",
-            "sub": "Pharmacy",
-            "days_offset": 28
-        },
-        {
-            "raw": create_sms("Uber Trip", 35.00),
-            "amount": 35.00,
-            "merchant": "Uber Trip",
-            "status": "success",
-            "classification": "Expense",
-            "main": "Transport",
-            "sub": "Ride-hailing",
-            "days_offset": 25
-        },
-        {
-            "raw": create_sms("Panda Supermarket", 620.15),
-            "amount": 620.15,
-            "merchant": "Panda Supermarket",
-            "status": "success",
-            "classification": "Expense",
-            "main": "Groceries",
-            "sub": "Supermarket",
-            "days_offset": 22
-        },
-        {
-            "raw": create_sms("Zara Riyadh", 450.00),
-            "amount": 450.00,
-            "merchant": "Zara Riyadh",
-            "status": "success",
-            "classification": "Expense",
-            "main": "Shopping",
-            "sub": "Apparel",
-            "days_offset": 18
-        },
-        # A failed SMS extraction (unstructured / wrong format)
-        {
-            "raw": "نود تذكيركم بسداد مستحقاتكم قبل نهاية الأسبوع لتجنب إيقاف الخدمة.",
-            "amount": None,
-            "merchant": None,
-            "status": "failed",
-            "classification": None,
-            "main": None,
-            "sub": None,
-            "days_offset": 16
-        }
-    ]
 
-    # Invoices for the current active cycle (last 15 days)
-    current_invoices = [
-        {
-            "raw": create_sms("Starbucks", 32.00),
-            "amount": 32.00,
-            "merchant": "Starbucks",
-            "status": "success",
-            "classification": "Expense",
-            "main": "Food & Drink",
-            "sub": "Coffee",
-            "days_offset": 14
-        },
-        {
-            "raw": create_sms("Dunkin Riyadh", 18.50),
-            "amount": 18.50,
-            "merchant": "Dunkin Riyadh",
-            "status": "success",
-            "classification": "Expense",
-            "main": "Food & Drink",
-            "sub": "Coffee",
-            "days_offset": 12
-        },
-        {
-            "raw": create_sms("Panda", 412.30),
-            "amount": 412.30,
-            "merchant": "Panda",
-            "status": "success",
-            "classification": "Expense",
-            "main": "Groceries",
-            "sub": "Supermarket",
-            "days_offset": 10
-        },
-        {
-            "raw": create_sms("Careem Ride", 42.00),
-            "amount": 42.00,
-            "merchant": "Careem Ride",
-            "status": "success",
-            "classification": "Expense",
-            "main": "Transport",
-            "sub": "Ride-hailing",
-            "days_offset": 8
-        },
-        {
-            "raw": create_sms("Netflix Subscription", 56.00),
-            "amount": 56.00,
-            "merchant": "Netflix Subscription",
-            "status": "success",
-            "classification": "Expense",
-            "main": "Entertainment",
-            "sub": "Subscriptions",
-            "days_offset": 5
-        },
-        {
-            "raw": create_sms("Al Nahdi Pharmacy", 89.20),
-            "amount": 89.20,
-            "merchant": "Al Nahdi Pharmacy",
-            "status": "success",
-            "classification": "Expense",
-            "main": "Health",
-            "sub": "Pharmacy",
-            "days_offset": 3
-        },
-        {
-            "raw": create_sms("H&M Riyadh", 249.00),
-            "amount": 249.00,
-            "merchant": "H&M Riyadh",
-            "status": "success",
-            "classification": "Expense",
-            "main": "Shopping",
-            "sub": "Apparel",
-            "days_offset": 1
-        },
-        # An unclassified successful merchant (does not match rules)
-        {
-            "raw": create_sms("Gas Station", 75.00),
-            "amount": 75.00,
-            "merchant": "Gas Station",
-            "status": "success",
-            "classification": None,
-            "main": None,
-            "sub": None,
-            "days_offset": 2
-        }
-    ]
+def random_time(rng: random.Random, start: datetime, now: datetime) -> datetime:
+    day = start + timedelta(days=rng.randrange(max(1, (now - start).days)))
+    hour = min(23, max(7, int(rng.gauss(16, 4))))  # daytime-heavy
+    return day.replace(hour=hour, minute=rng.randrange(60), second=rng.randrange(60), microsecond=0)
+
+
+def generate(users: int = 1, invoices: int = 300, depth: int = 2, years: int = 1, seed: int = 42) -> list[int]:
+    """Create `users` users with `invoices` invoices each; returns their ids."""
+    rng = random.Random(seed)
+    now = datetime.now().replace(microsecond=0)
+    start = now - timedelta(days=365 * years)
+    hashed = bcrypt.hashpw(PASSWORD.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    pick = merchant_picker(rng)
+    ids = []
+    db = SessionLocal()
+    try:
+        first = db.query(User).count()  # --keep: carry on after the existing testuserN
+        for n in range(first, first + users):
+            t0 = time.perf_counter()
+            user = User(username="testuser" if n == 0 else f"testuser{n + 1}", password_hash=hashed)
+            db.add(user)
+            db.flush()
+            targets = build_tree(db, user.id, depth, rng)
+            for subs in CATALOG.values():
+                for sub_name, (_, entries) in subs.items():
+                    db.add_all(Rule(user_id=user.id, merchant_keywords=kw, classification="Expense",
+                                    category_id=targets[sub_name]) for _, kw in entries)
+            build_cycles(db, user.id, start, now)
+            db.commit()  # rules must be visible to the extractor's classifier
+
+            rows = []
+            for _ in range(invoices):
+                when = random_time(rng, start, now)
+                rows.append({"user_id": user.id, **extract_amount(make_sms(rng, pick, when), user.id),
+                             "created_at": when})
+                if len(rows) == INSERT_CHUNK:
+                    db.execute(insert(Invoice), rows)
+                    rows = []
+            if rows:
+                db.execute(insert(Invoice), rows)
+            db.commit()
+            ids.append(user.id)
+            print(f"  {user.username}: {invoices} invoices in {time.perf_counter() - t0:.1f}s")
+    finally:
+        db.close()
+    return ids
 
-    print("Adding invoices for past and active cycles...")
-    
-    # Store past cycle invoices
-    for inv in past_invoices:
-        invoice = Invoice(
-            raw_invoice=inv["raw"],
-            amount=inv["amount"],
-            merchant=inv["merchant"],
-            extraction_status=inv["status"],
-            classification=inv["classification"],
-            main_category=inv["main"],
-            sub_category=inv["sub"],
-            created_at=now - timedelta(days=inv["days_offset"]),
-            user_id=uid
-        )
-        db.add(invoice)
 
-    # Store current cycle invoices
-    for inv in current_invoices:
-        invoice = Invoice(
-            raw_invoice=inv["raw"],
-            amount=inv["amount"],
-            merchant=inv["merchant"],
-            extraction_status=inv["status"],
-            classification=inv["classification"],
-            main_category=inv["main"],
-            sub_category=inv["sub"],
-            created_at=now - timedelta(days=inv["days_offset"]),
-            user_id=uid
-        )
-        db.add(invoice)
+def main():
+    if "--keep" not in sys.argv:
+        clear_db()
+    else:
+        init_db()
+    users, invoices = flag("--users", 1), flag("--invoices", 300)
+    print(f"Seeding {users} user(s) x {invoices} invoices...")
+    generate(users, invoices, flag("--depth", 2), flag("--years", 1), flag("--seed", 42))
+    with engine.begin() as con:
+        con.execute(text("ANALYZE"))
+    print(f"done. log in as testuser / {PASSWORD}")
 
-    db.commit()
-    db.close()
 
 if __name__ == "__main__":
-    clear_db()
-    seed_data()
+    main()
@@ -0,0 +1,36 @@
+import os
+import tempfile
+
+# app.db and app.config read these at import time: set them before any test imports the app
+os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(), "test.db")
+os.environ.setdefault("JWT_SECRET_KEY", "test-only-secret-key-0123456789abcdef")
+
+import uuid  # noqa: E402
+
+import pytest  # noqa: E402
+
+from app.db import SessionLocal, init_db  # noqa: E402
+from app.models import User  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    init_db()
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def user(db):
+    """A fresh user per test, so tests share one DB without seeing each other's rows."""
+    user = User(username=f"user-{uuid.uuid4().hex[:8]}", password_hash="x")
+    db.add(user)
+    db.commit()
+    return user
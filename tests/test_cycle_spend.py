@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+from app.models import Category, Cycle, Invoice
+from app.models.CycleSpend import CycleSpend, cycle_spend_drift
+from app.routes.categories import delete_category, update_category
+from schema import CategoryCreateReq
+
+
+def add_category(db, user, name, parent=None):
+    node = Category(name=name, parent_id=parent and parent.id, level=parent.level + 1 if parent else 0,
+                    user_id=user.id)
+    db.add(node)
+    db.flush()
+    return node
+
+
+def spend(db, cycle, category):
+    row = db.query(CycleSpend.total, CycleSpend.count).filter_by(cycle_id=cycle.id, category_id=category.id).first()
+    return tuple(row) if row else (0, 0)
+
+
+def test_counters_follow_category_moves_and_deletes(db, user):
+    now = datetime.utcnow()
+    cycle = Cycle(user_id=user.id, start_date=now - timedelta(days=1), end_date=None, is_active=True)
+    db.add(cycle)
+    food = add_category(db, user, "Food")
+    coffee = add_category(db, user, "Coffee", food)
+    espresso = add_category(db, user, "Espresso", coffee)
+    groceries = add_category(db, user, "Groceries")
+    db.execute(insert(Invoice.__table__), [
+        {"user_id": user.id, "amount": amount, "merchant": "m", "raw_invoice": "m", "created_at": now,
+         "extraction_status": "success", "category_id": category_id}
+        for amount, category_id in ((10, espresso.id), (20, coffee.id), (40, groceries.id), (80, None))
+    ])
+    db.commit()
+    con = db.connection()
+    assert cycle_spend_drift(con, user.id) == []
+    assert spend(db, cycle, food) == (30, 2)
+
+    update_category(coffee.id, CategoryCreateReq(name="Coffee", parent_id=groceries.id), user=user, db=db)
+    assert cycle_spend_drift(db.connection(), user.id) == []
+    assert (spend(db, cycle, food), spend(db, cycle, groceries)) == ((0, 0), (70, 3))
+
+    delete_category(coffee.id, user=user, db=db)
+    assert cycle_spend_drift(db.connection(), user.id) == []
+    assert spend(db, cycle, groceries) == (50, 2)  # the coffee invoice is uncategorized now
+
+
+def test_drift_is_reported(db, user):
+    now = datetime.utcnow()
+    db.add(Cycle(user_id=user.id, start_date=now - timedelta(days=1), end_date=None, is_active=True))
+    db.add(Invoice(user_id=user.id, amount=5, merchant="m", raw_invoice="m", created_at=now,
+                   extraction_status="success"))
+    db.commit()
+    db.execute(text("UPDATE cycle_spend SET total = total + 1 WHERE category_id IS NULL "
+                    "AND cycle_id IN (SELECT id FROM budget_cycles WHERE user_id = :u)"), {"u": user.id})
+    [(_, category_id, have, want)] = cycle_spend_drift(db.connection(), user.id)
+    assert (category_id, have, want) == (None, (6, 1), (5, 1))
@@ -0,0 +1,13 @@
+from sqlalchemy import text
+
+from app.db import engine_settings, make_engine
+
+
+def test_in_memory_database_ignores_pool_sizing():
+    pragmas, pool = engine_settings({"SQLITE_POOL_SIZE": "5", "SQLITE_MAX_OVERFLOW": "2"})
+    eng = make_engine(":memory:", pragmas, pool)
+    with eng.begin() as con:
+        con.execute(text("CREATE TABLE t (x)"))
+        con.execute(text("INSERT INTO t VALUES (1)"))
+    with eng.connect() as con:  # same DB on the next checkout
+        assert con.execute(text("SELECT x FROM t")).scalar() == 1
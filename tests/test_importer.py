@@ -0,0 +1,62 @@
+import json
+from datetime import datetime
+
+from app.models.ImportJob import ImportJob
+from app.models.Invoice import Invoice
+from app.services import importer
+from app.services.importer import Malformed, create_job, read_records, run_import
+
+
+def sms(amount: str, merchant: str) -> str:
+    return f"شراء عبر نقاط البيع\nمبلغ: {amount} SAR\nلدى: {merchant}"
+
+
+def test_parse_time_converts_offsets_to_utc():
+    assert importer._parse_time("2025-03-14T13:45:00+03:00") == datetime(2025, 3, 14, 10, 45)
+    assert importer._parse_time("2025-03-14 13:45") == datetime(2025, 3, 14, 13, 45)
+
+
+def test_readers_yield_malformed_instead_of_raising(tmp_path):
+    lines = ['{"message": "a"}', "not json", '{"text": "b"}', '{"message": "c", "timestamp": "yesterday"}', "5"]
+    path = tmp_path / "s.ndjson"
+    path.write_text("\n".join(lines), encoding="utf-8")
+    with open(path, encoding="utf-8") as fh:
+        records = list(read_records(fh, "ndjson"))
+    assert records[0] == ("a", None)
+    assert all(isinstance(r, Malformed) for r in records[1:])
+
+    path = tmp_path / "s.csv"
+    path.write_text("date,amount,merchant\n2025-03-14,12.50,Jarir\n2025-03-15,9\n", encoding="utf-8")
+    with open(path, encoding="utf-8", newline="") as fh:
+        ok, short = read_records(fh, "csv")
+    assert ok[1] == datetime(2025, 3, 14) and isinstance(short, Malformed)
+
+
+def test_resume_skips_malformed_record(db, user, tmp_path, monkeypatch):
+    lines = [json.dumps({"message": sms("10.00", f"Shop {i}"), "timestamp": f"2025-03-{i + 1:02d}T12:00:00"})
+             for i in range(6)]
+    lines[3] = '{"message": "truncated'
+    path = tmp_path / "export.ndjson"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    monkeypatch.setattr(importer, "IMPORT_CHUNK", 2)
+    job, _ = create_job(db, user.id, str(path), path.name)
+
+    calls = []
+
+    def crash_after_first_chunk(job):
+        calls.append(job.records_done)
+        if len(calls) == 1:
+            raise KeyboardInterrupt
+
+    try:
+        run_import(job.id, crash_after_first_chunk)
+    except KeyboardInterrupt:
+        pass
+    db.expire_all()
+    assert db.get(ImportJob, job.id).status == "failed"
+
+    done = run_import(job.id)
+    assert done.status == "done"
+    assert (done.records_done, done.inserted, done.malformed) == (6, 5, 1)
+    assert done.malformed_error.startswith("record 4: ")
+    assert db.query(Invoice).filter(Invoice.user_id == user.id).count() == 5
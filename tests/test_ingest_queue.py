@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from app.models.Invoice import Invoice
+from app.services import ingest_queue as ingest_queue_module
+from app.services.ingest_queue import IngestQueue
+
+
+def test_failed_group_is_retried_message_by_message(db, user, monkeypatch):
+    real = ingest_queue_module.extract_amount
+
+    def extract(message, user_id, **kw):
+        if message == "boom":
+            raise ValueError("bad row")
+        return real(message, user_id, **kw)
+
+    monkeypatch.setattr(ingest_queue_module, "extract_amount", extract)
+    q = IngestQueue(maxsize=10)
+    messages = [f"شراء عبر نقاط البيع\nمبلغ: 10.00 SAR\nلدى: Shop {i}" for i in range(3)]
+    group = [(f"id{i}", message, user.id, None, datetime.utcnow())
+             for i, message in enumerate(messages[:2] + ["boom"] + messages[2:])]
+    q._store_or_split(group)
+
+    assert [q.status(f"id{i}")["status"] for i in range(4)] == ["stored", "stored", "failed", "stored"]
+    assert q.status("id2")["error"] == "bad row"
+    assert (q.stored, q.failed) == (3, 1)
+    assert db.query(Invoice).filter(Invoice.user_id == user.id).count() == 3
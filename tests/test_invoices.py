@@ -0,0 +1,39 @@
+import base64
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import insert
+
+from app.models import Category, Invoice
+from app.routes.invoices import categorize_invoices, decode_cursor, encode_cursor
+
+
+def b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor("2025-03-14 13:45:00.000000", 42)) == ("2025-03-14 13:45:00.000000", 42)
+
+
+@pytest.mark.parametrize("cursor", [
+    "!!", "a", b64(b"\xff\xfe"), b64(b"not json"), b64(b"5"), b64(b"null"), b64(b'"ab"'),
+    b64(b'{"a": 1, "b": 2}'), b64(b'["x", 1, 2]'), b64(b"[1, 2]"), b64(b'["x", "1"]'),
+])
+def test_bad_cursor_is_400(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor)
+    assert exc.value.status_code == 400
+
+
+def test_categorize_clears_invoices_without_merchant(db, user):
+    other = Category(name="Other", parent_id=None, level=0, user_id=user.id)
+    db.add(other)
+    db.flush()
+    db.execute(insert(Invoice.__table__), [
+        {"user_id": user.id, "amount": 1, "merchant": merchant, "raw_invoice": "x", "extraction_status": "failed",
+         "category_id": other.id} for merchant in (None, "")
+    ])
+    db.commit()
+    assert categorize_invoices(current_user=user)["updated_invoices"] == 2
+    assert db.query(Invoice.category_id).filter(Invoice.user_id == user.id).distinct().all() == [(None,)]
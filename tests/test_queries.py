@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app import metrics as metrics_module
+from app.config import N_PLUS_ONE_THRESHOLD
+from app.db import engine
+from app.metrics import MetricsMiddleware, NPlusOneError, metrics, track_queries
+from app.models import Category, Cycle
+from app.routes.categories import category_ancestors
+from app.routes.cycles import get_cycle_history
+
+DEEP = N_PLUS_ONE_THRESHOLD + 5  # more rows than the threshold: a per-row query would trip it
+
+
+def test_cycle_history_is_one_statement(db, user):
+    start = datetime(2024, 1, 1)
+    for i in range(DEEP):
+        db.add(Cycle(user_id=user.id, start_date=start + timedelta(days=30 * i),
+                     end_date=start + timedelta(days=30 * (i + 1)), is_active=False))
+    db.commit()
+    with track_queries() as q:
+        history = get_cycle_history(limit=0, current_user=user)
+    assert len(history) == DEEP
+    q.assert_no_n_plus_one()
+
+
+def test_category_ancestors_is_not_per_level(db, user):
+    parent = None
+    for level in range(DEEP):
+        node = Category(name=f"level {level}", parent_id=parent and parent.id, level=level, user_id=user.id)
+        db.add(node)
+        db.flush()
+        parent = node
+    db.commit()
+    with track_queries() as q:
+        path = category_ancestors(parent.id, user=user, db=db)
+    assert [p["level"] for p in path] == list(range(DEEP))
+    q.assert_no_n_plus_one()
+
+
+def test_track_queries_catches_repeats():
+    with track_queries() as q, engine.connect() as con:
+        for _ in range(DEEP):
+            con.execute(text("SELECT 1"))
+    with pytest.raises(NPlusOneError):
+        q.assert_no_n_plus_one()
+
+
+def test_raise_mode_fails_the_request_before_it_is_sent(monkeypatch):
+    monkeypatch.setattr(metrics_module, "N_PLUS_ONE_RAISE", True)
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/n-plus-one")
+    def n_plus_one():
+        with engine.connect() as con:
+            for _ in range(DEEP):
+                con.execute(text("SELECT 1"))
+        return {"ok": True}
+
+    r = TestClient(app, raise_server_exceptions=False).get("/n-plus-one")
+    assert r.status_code == 500
+    assert 'http_request_n_plus_one_total{method="GET",route="/n-plus-one"} 1' in metrics.render()
@@ -0,0 +1,40 @@
+from sqlalchemy import and_, func, insert, select
+
+from app.models import User
+from app.models.Invoice import Invoice
+from app.services import search
+from app.services.search import search_filter
+
+
+def matching(db, user, term):
+    matched = search_filter(db, term, ("merchant", "note"), user.id)
+    conds = [Invoice.user_id == user.id] + ([matched[0]] if matched is not None else [])
+    return sorted(db.execute(select(Invoice.merchant).where(and_(*conds))).scalars())
+
+
+def test_search_filter(db, user):
+    db.execute(insert(Invoice.__table__), [
+        {"user_id": user.id, "amount": 12.5, "merchant": merchant, "raw_invoice": merchant,
+         "extraction_status": "success"} for merchant in ("Jarir Bookstore", "Starbucks")
+    ])
+    db.commit()
+    assert matching(db, user, None) == matching(db, user, "  ") == ["Jarir Bookstore", "Starbucks"]
+    assert matching(db, user, "jar") == ["Jarir Bookstore"]
+    assert matching(db, user, "!!!") == []
+
+
+def test_other_users_matches_do_not_fill_the_prefetch(db, user, monkeypatch):
+    monkeypatch.setattr(search, "FTS_DRIVE_MAX", 5)
+    other = User(username=f"{user.username}-other", password_hash="x")
+    db.add(other)
+    db.flush()
+    db.execute(insert(Invoice.__table__), [
+        {"user_id": owner, "amount": 1, "merchant": "Starbucks Olaya", "raw_invoice": "x",
+         "extraction_status": "success"} for owner in [other.id] * 20 + [user.id] * 2
+    ])
+    db.commit()
+    clause, few = search_filter(db, "starbucks", ("merchant", "note"), user.id)
+    assert few
+    assert db.execute(select(func.count()).where(clause)).scalar() == 2
+    compiled = select(Invoice.id).where(clause).compile(compile_kwargs={"render_postcompile": True})
+    assert not compiled.params  # ids are inlined, whatever SQLite's variable limit
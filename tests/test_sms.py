@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from app.deps import get_current_user_or_apikey
+from app.main import app
+from app.models.Invoice import Invoice
+from app.services.sms import DEDUP_WINDOW, extract_amount, find_duplicates, ingest_sms
+
+
+def test_batch_timestamps_are_stored_as_utc(db, user):
+    app.dependency_overrides[get_current_user_or_apikey] = lambda: user
+    try:
+        r = TestClient(app).post("/sms/batch", json={"messages": [
+            {"message": f"شراء عبر نقاط البيع\nمبلغ: 10.00 SAR\nلدى: Shop {i}", "timestamp": ts}
+            for i, ts in enumerate(["2025-03-14T13:45:00+03:00", "2025-03-14T13:45:00"])
+        ]})
+    finally:
+        app.dependency_overrides.pop(get_current_user_or_apikey)
+    r.raise_for_status()
+    stored = db.query(Invoice.merchant, Invoice.created_at).filter(Invoice.user_id == user.id).all()
+    assert {m: at.replace(tzinfo=None) for m, at in stored} == {
+        "Shop 0": datetime(2025, 3, 14, 10, 45), "Shop 1": datetime(2025, 3, 14, 13, 45)}
+
+
+PURCHASE = "شراء عبر نقاط البيع\nمبلغ: 25.00 SAR\nلدى: Hungerstation"  # no time in the text
+
+
+def stored_count(db, user):
+    return db.query(Invoice).filter(Invoice.user_id == user.id).count()
+
+
+def test_resend_window(db, user):
+    first = ingest_sms(PURCHASE, user.id)
+    assert "duplicate_of" not in first
+    retry = ingest_sms(PURCHASE, user.id)  # a Shortcut retry seconds later
+    assert retry["duplicate_of"] is not None
+    assert stored_count(db, user) == 1
+
+    # the same purchase again later that day: outside the window, so it is spend, not a resend
+    db.query(Invoice).filter(Invoice.user_id == user.id).update(
+        {Invoice.created_at: datetime.utcnow() - DEDUP_WINDOW - timedelta(minutes=1)})
+    db.commit()
+    again = ingest_sms(PURCHASE, user.id)
+    assert "duplicate_of" not in again
+    assert stored_count(db, user) == 2
+
+
+def test_dated_rows_only_repeat_their_own_time(db, user):
+    at = datetime(2025, 3, 14, 9, 0)
+    rows = [{"user_id": user.id, **extract_amount(PURCHASE, user.id), "created_at": t}
+            for t in (at, at + timedelta(seconds=30), at)]
+    assert find_duplicates(db, user.id, rows, dated=[0, 1, 2]) == {2: None}
+    assert find_duplicates(db, user.id, rows) == {1: None, 2: None}
@@ -0,0 +1,44 @@
+import pytest
+
+from app.sms_parser import parse_amount, parse_sms
+
+
+@pytest.mark.parametrize("message, merchant", [
+    ("شراء\nمبلغ: 25.00 SAR\nلدى: Hotpot House", "Hotpot House"),
+    ("Purchase of SAR 12.00 at Refundable Deposits Cafe with card ending 1234", "Refundable Deposits Cafe"),
+    ("POS Purchase\nAmount: SAR 9.00\nAt: Incoming Burger", "Incoming Burger"),
+    ("POS Purchase\nAmount: SAR 9.00\nAt: Declined Tacos", "Declined Tacos"),
+])
+def test_reject_markers_inside_merchant_do_not_drop_purchase(message, merchant):
+    parsed = parse_sms(message)
+    assert parsed is not None
+    assert parsed.merchant == merchant
+
+
+@pytest.mark.parametrize("message", [
+    "رمز التحقق: 4821\nلا تشاركه مع أحد",
+    "Your OTP is 4821\nAmount: SAR 5.00\nAt: Noon",
+    "حوالة واردة\nالمبلغ: 500 SAR\nمن: محمد",
+    "Refund of SAR 40.00 from Jarir credited to card *1234",
+    "Transaction declined\nPurchase of SAR 40.00 at Jarir.",
+])
+def test_non_spend_messages_are_rejected(message):
+    assert parse_sms(message) is None
+
+
+@pytest.mark.parametrize("raw, amount", [
+    ("SAR 12,50", 12.5),        # decimal comma
+    ("SAR 12,5", 12.5),
+    ("SAR 1,250", 1250.0),      # thousands separator
+    ("SAR 1,234,567", 1234567.0),
+    ("SAR 1,234,50", 1234.5),   # thousands + decimal comma
+    ("SAR 1,234.50", 1234.5),
+    ("١٬٢٣٤٫٥٠ ر.س", 1234.5),  # Arabic-Indic digits and separators
+])
+def test_parse_amount_separators(raw, amount):
+    assert parse_amount(raw)[0] == amount
+
+
+def test_decimal_comma_through_template():
+    parsed = parse_sms("شراء\nمبلغ: SAR 12,50\nلدى: Starbucks")
+    assert (parsed.amount, parsed.merchant, parsed.currency) == (12.5, "Starbucks", "SAR")